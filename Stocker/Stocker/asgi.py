@@ -2,6 +2,12 @@
 ASGI config for Stocker project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Serve it with any ASGI server, for example::
+
+    uvicorn Stocker.asgi:application --workers 4
+
+Under ASGI the dashboard and Reports page use their async views, which run
+their independent queries concurrently (STOCKER_ASYNC_VIEWS=0 to opt out).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -12,5 +18,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Stocker.settings')
+os.environ.setdefault('STOCKER_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
@@ -37,6 +37,60 @@ DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", EMAIL_HOST_USER or "noreply
 MANAGER_EMAIL = os.getenv("STOCKER_MANAGER_EMAIL", EMAIL_HOST_USER or "manager@example.com")
 INVENTORY_EXPIRY_ALERT_DAYS = int(os.getenv("INVENTORY_EXPIRY_ALERT_DAYS", "7"))
 LOW_STOCK_ALERT_COOLDOWN_HOURS = int(os.getenv("LOW_STOCK_ALERT_COOLDOWN_HOURS", "12"))
+STOCK_BATCH_MAX_LINES = int(os.getenv("STOCK_BATCH_MAX_LINES", "1000"))
+INVENTORY_CACHE_TIMEOUT = int(os.getenv("INVENTORY_CACHE_TIMEOUT", "3600"))
+MOVEMENT_ARCHIVE_DAYS = int(os.getenv("MOVEMENT_ARCHIVE_DAYS", "365"))
+REORDER_DEFAULT_LEAD_DAYS = int(os.getenv("REORDER_DEFAULT_LEAD_DAYS", "7"))
+REORDER_HISTORY_DAYS = int(os.getenv("REORDER_HISTORY_DAYS", "180"))
+ALERT_OUTBOX_BATCH_SIZE = int(os.getenv("ALERT_OUTBOX_BATCH_SIZE", "100"))
+ALERT_OUTBOX_MAX_ATTEMPTS = int(os.getenv("ALERT_OUTBOX_MAX_ATTEMPTS", "5"))
+ALERT_OUTBOX_RETRY_SECONDS = int(os.getenv("ALERT_OUTBOX_RETRY_SECONDS", "60"))
+# Sent outbox rows are deleted this many days after sending (0 keeps them).
+ALERT_OUTBOX_KEEP_DAYS = int(os.getenv("ALERT_OUTBOX_KEEP_DAYS", "7"))
+# Dotted path to an inventory.utils.search.SearchBackend; empty = FTS5 on SQLite, icontains elsewhere.
+STOCKER_SEARCH_BACKEND = os.getenv("STOCKER_SEARCH_BACKEND", "")
+# Serve the dashboard and Reports page with their async views (Stocker/asgi.py
+# turns this on); ASYNC_QUERY_WORKERS bounds the threads their queries run on.
+ASYNC_VIEWS = env_bool("STOCKER_ASYNC_VIEWS", False)
+ASYNC_QUERY_WORKERS = int(os.getenv("ASYNC_QUERY_WORKERS", "8"))
+# Request instrumentation (inventory.middleware.RequestMetricsMiddleware): a
+# Server-Timing header on every response, and per-view histograms each worker
+# writes to the shared cache every METRICS_FLUSH_SECONDS for /metrics/ (staff).
+SERVER_TIMING = env_bool("STOCKER_SERVER_TIMING", True)
+METRICS_FLUSH_SECONDS = int(os.getenv("METRICS_FLUSH_SECONDS", "15"))
+# Query log (inventory.utils.querylog, staff page /inventory/query-log/): queries
+# slower than QUERY_LOG_SLOW_MS, and statements a request runs more than
+# QUERY_LOG_REPEAT_THRESHOLD times (N+1), are stored with their plans by a
+# background writer in a table that keeps about the newest QUERY_LOG_SIZE (trimmed
+# every 100 findings). 0 turns the slow or repeat check off.
+QUERY_LOG_SLOW_MS = int(os.getenv("QUERY_LOG_SLOW_MS", "100"))
+QUERY_LOG_REPEAT_THRESHOLD = int(os.getenv("QUERY_LOG_REPEAT_THRESHOLD", "10"))
+QUERY_LOG_SIZE = int(os.getenv("QUERY_LOG_SIZE", "1000"))
+
+# "default" is a small per-process LRU (L1) in front of "shared" (L2), which
+# every worker sees. L2 is a table in the main database unless
+# STOCKER_CACHE_BACKEND/STOCKER_CACHE_LOCATION point it elsewhere, e.g.
+# django.core.cache.backends.redis.RedisCache + redis://cache:6379/0.
+STOCKER_CACHE_BACKEND = os.getenv("STOCKER_CACHE_BACKEND", "django.core.cache.backends.db.DatabaseCache")
+CACHES = {
+    "default": {
+        "BACKEND": "inventory.utils.tiered_cache.TieredCache",
+        "LOCATION": "shared",
+        "OPTIONS": {
+            "L1_TIMEOUT": int(os.getenv("STOCKER_L1_CACHE_TIMEOUT", "5")),
+            "L1_MAX_ENTRIES": int(os.getenv("STOCKER_L1_CACHE_MAX_ENTRIES", "1000")),
+        },
+    },
+    "shared": {
+        "BACKEND": STOCKER_CACHE_BACKEND,
+        "LOCATION": os.getenv("STOCKER_CACHE_LOCATION", "stocker_cache"),
+        # Only the database and file backends take (and need) an entry cap.
+        "OPTIONS": (
+            {"MAX_ENTRIES": int(os.getenv("STOCKER_CACHE_MAX_ENTRIES", "20000"))}
+            if STOCKER_CACHE_BACKEND.endswith(("DatabaseCache", "FileBasedCache")) else {}
+        ),
+    },
+}
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -67,6 +121,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'inventory.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
@@ -81,7 +136,7 @@ ROOT_URLCONF = 'Stocker.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'inventory.utils.metrics.TimedTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -100,10 +155,33 @@ WSGI_APPLICATION = 'Stocker.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# "production" sets SQLite up for several workers: WAL lets readers run while
+# a write is in progress, writers wait up to busy_timeout for the lock
+# instead of failing, and BEGIN IMMEDIATE takes the write lock when a
+# transaction starts, so a read-then-write (StockMovement.apply) can't fail
+# halfway while upgrading its lock. "default" is Django's stock setup, and what
+# you get unless STOCKER_SQLITE_PROFILE=production: WAL changes the database
+# file itself, so local runs (manage.py check, tests) leave it alone.
+SQLITE_PROFILES = {
+    "default": {},
+    "production": {
+        "init_command": ";".join([
+            "PRAGMA journal_mode=WAL",
+            f"PRAGMA busy_timeout={int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '5000'))}",
+            "PRAGMA synchronous=NORMAL",
+            f"PRAGMA mmap_size={int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))}",
+            f"PRAGMA cache_size=-{int(os.getenv('SQLITE_CACHE_SIZE_KB', '65536'))}",
+        ]),
+        "transaction_mode": "IMMEDIATE",
+    },
+}
+SQLITE_PROFILE = os.getenv("STOCKER_SQLITE_PROFILE", "default")
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': dict(SQLITE_PROFILES[SQLITE_PROFILE]),
     }
 }
 
@@ -4,4 +4,9 @@ class InventoryConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "inventory"
     def ready(self):
+        from django.db.backends.signals import connection_created
+
         from . import signals
+        from .utils.metrics import install_query_wrapper
+
+        connection_created.connect(install_query_wrapper, dispatch_uid="stocker_query_metrics")
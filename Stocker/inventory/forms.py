@@ -49,4 +49,16 @@ class CategoryForm(forms.ModelForm):
         for f in self.fields.values():
             existing = f.widget.attrs.get("class", "")
             f.widget.attrs["class"] = (existing + " w-full rounded-lg border px-3 py-2 text-sm").strip()
-        self.fields["description"].widget.attrs.setdefault("rows", 3)
\ No newline at end of file
+        self.fields["description"].widget.attrs.setdefault("rows", 3)
+
+class ProductImportForm(forms.Form):
+    file = forms.FileField(help_text="CSV or XLSX with a header row")
+    replace = forms.BooleanField(
+        required=False, label="Replace existing products",
+        help_text="The file must have every column; blank cells clear the field.",
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["file"].widget.attrs["class"] = "w-full rounded-lg border px-3 py-2 text-sm"
+        self.fields["file"].widget.attrs["accept"] = ".csv,.xlsx"
@@ -0,0 +1,36 @@
+"""Scratch copies of the SQLite database for the benchmark commands.
+
+Not a command itself: Django skips command modules starting with "_".
+"""
+import sqlite3
+from pathlib import Path
+
+from django.core.management.base import CommandError
+from django.db import connections
+
+
+def point_default_at(path, options):
+    """Reconnect every thread's "default" alias to ``path`` with ``options``."""
+    connections.close_all()
+    db = connections.settings["default"]  # the dict every new connection is built from
+    db["NAME"] = str(path)
+    db["OPTIONS"] = dict(options)
+
+
+def remove_db(path):
+    for suffix in ("", "-wal", "-shm", "-journal"):
+        Path(f"{path}{suffix}").unlink(missing_ok=True)
+
+
+def copy_db(source, path, journal_mode=None):
+    """Copy the SQLite database at ``source`` to ``path``, consistently even while it is in use."""
+    if not Path(source).exists():
+        raise CommandError(f"{source} does not exist; run migrate first.")
+    src, dst = sqlite3.connect(source), sqlite3.connect(path)
+    try:
+        src.backup(dst)
+        if journal_mode:
+            dst.execute(f"PRAGMA journal_mode={journal_mode}")
+    finally:
+        src.close()
+        dst.close()
@@ -0,0 +1,33 @@
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from inventory.models import ArchivedMovement
+from inventory.utils.ledger import forget_archive_horizon
+
+
+class Command(BaseCommand):
+    help = "Move stock movements older than the archive horizon out of the live ledger"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.MOVEMENT_ARCHIVE_DAYS,
+                            help="Archive movements older than this many days (default: MOVEMENT_ARCHIVE_DAYS)")
+        parser.add_argument("--owner", type=int, default=None,
+                            help="Only archive this owner's movements (user id)")
+        parser.add_argument("--batch-size", type=int, default=2000,
+                            help="Rows moved per transaction")
+
+    def handle(self, *args, **opts):
+        # Cut at local midnight so a product-day never straddles both tables.
+        day = timezone.localdate() - timedelta(days=opts["days"])
+        cutoff = timezone.make_aware(datetime.combine(day, time.min))
+
+        checkpoints, moved = ArchivedMovement.archive_before(
+            cutoff, owner_id=opts["owner"], batch_size=opts["batch_size"],
+        )
+        forget_archive_horizon()
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived before {cutoff:%Y-%m-%d} • {moved} movements • {checkpoints} checkpoints"
+        ))
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import time
+from datetime import timedelta
+from pathlib import Path
+
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import RequestFactory
+from django.utils import timezone
+
+from inventory.utils import reports
+from inventory.utils.cache import bump_inventory_version
+from inventory.views import ReportsView, reports_async
+from main import views as main_views
+
+
+def _ms(samples):
+    ms = np.array(samples) * 1000
+    return {"p50_ms": round(float(np.percentile(ms, 50)), 2), "p95_ms": round(float(np.percentile(ms, 95)), 2)}
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the sync and async dashboard and Reports views side by side, cold (inventory "
+        "version bumped before every request) and warm, plus each section's queries on their own"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--owner", type=int, default=None,
+                            help="User id to render for (default: the owner with the most products)")
+        parser.add_argument("--iterations", type=int, default=30, help="Requests timed per case")
+        parser.add_argument("--json", default="", help="Also write the results to this file")
+
+    def handle(self, *args, **opts):
+        if opts["owner"] is not None:
+            user = User.objects.filter(pk=opts["owner"]).first()
+        else:
+            user = User.objects.annotate(n=Count("products")).order_by("-n").first()
+        if user is None:
+            raise CommandError("No such owner.")
+        self.user = user
+        self.factory = RequestFactory()
+        n = opts["iterations"]
+
+        cases = [
+            ("dashboard", "/dashboard/", main_views.dashboard, main_views.dashboard_async, self.dashboard_sections()),
+            ("reports", "/inventory/reports/", ReportsView.as_view(), reports_async, self.report_sections()),
+        ]
+        results = {}
+        for name, path, sync_view, async_view, sections in cases:
+            timings = {read: self.time_section(fn, n) for read, fn in sections}
+            slowest = max(t["p50_ms"] for t in timings.values())
+            results[name] = {
+                "sections": timings,
+                "sections_sum_p50_ms": round(sum(t["p50_ms"] for t in timings.values()), 2),
+                "sections_max_p50_ms": slowest,
+            }
+            for mode in ("cold", "warm"):
+                results[name][f"sync_{mode}"] = _ms(self.time_sync(sync_view, path, n, cold=mode == "cold"))
+                results[name][f"async_{mode}"] = _ms(asyncio.run(self.time_async(async_view, path, n, cold=mode == "cold")))
+
+        self.report(results)
+        if opts["json"]:
+            Path(opts["json"]).write_text(json.dumps(results, indent=2))
+        self.stdout.write(self.style.SUCCESS(
+            f"Async view benchmark • owner {user.pk} • {n} requests per case"
+        ))
+
+    def dashboard_sections(self):
+        user = self.user
+        req = self.factory.get("/dashboard/")
+        return [
+            ("stat cards", lambda: main_views._stat_cards(user)),
+            ("30-day chart", lambda: main_views._movement_chart(user)),
+            ("recent movements", lambda: list(main_views._recent_rows(user))),
+            ("product page", lambda: main_views._product_table(req, user, 10)[0].object_list),
+            ("product count", lambda: user.products.count()),
+        ]
+
+    def report_sections(self):
+        end = timezone.localdate()
+        start = end - timedelta(days=29)
+        names = ("categories", "suppliers", "daily series", "recent movements", "low stock")
+        return list(zip(names, reports._sections(self.user, start, end)))
+
+    def request(self, path):
+        req = self.factory.get(path)
+        req.user = self.user
+
+        async def auser():
+            return self.user
+
+        req.auser = auser
+        req.session = SessionStore()
+        return req
+
+    @staticmethod
+    def time_section(fn, n):
+        samples = []
+        for _ in range(n):
+            t0 = time.perf_counter()
+            fn()
+            samples.append(time.perf_counter() - t0)
+        return _ms(samples)
+
+    def time_sync(self, view, path, n, cold):
+        samples = []
+        for _ in range(n + 1):
+            if cold:
+                bump_inventory_version(self.user.pk)
+            t0 = time.perf_counter()
+            response = view(self.request(path))
+            if hasattr(response, "render"):
+                response.render()
+            samples.append(time.perf_counter() - t0)
+        return samples[1:]  # the first request warms connections and templates
+
+    async def time_async(self, view, path, n, cold):
+        samples = []
+        for _ in range(n + 1):
+            if cold:
+                await sync_to_async(bump_inventory_version)(self.user.pk)
+            t0 = time.perf_counter()
+            await view(self.request(path))
+            samples.append(time.perf_counter() - t0)
+        return samples[1:]
+
+    def report(self, results):
+        for name, r in results.items():
+            self.stdout.write(f"{name}")
+            for section, t in r["sections"].items():
+                self.stdout.write(f"  {section:<20}{t['p50_ms']:>9} ms")
+            self.stdout.write(
+                f"  sections alone: sum {r['sections_sum_p50_ms']} ms, slowest {r['sections_max_p50_ms']} ms (p50)"
+            )
+            self.stdout.write(f"  {'':<20}{'sync p50':>10}{'p95':>9}{'async p50':>11}{'p95':>9}")
+            for mode in ("cold", "warm"):
+                s, a = r[f"sync_{mode}"], r[f"async_{mode}"]
+                self.stdout.write(
+                    f"  {mode:<20}{s['p50_ms']:>10}{s['p95_ms']:>9}{a['p50_ms']:>11}{a['p95_ms']:>9}"
+                )
@@ -0,0 +1,65 @@
+import time
+
+import numpy as np
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.utils.cache import cached_for_owner
+
+BENCH_KEY = "cache_bench:{}"
+BENCH_OWNER = 0  # no user has pk 0, so the benchmark can't touch a real owner's entries
+
+
+def _payload(rows):
+    """Roughly the shape of a cached report section."""
+    return [
+        {"pk": i, "name": f"Product {i}", "sku": f"SKU-{i:06d}", "on_hand": i % 97, "value": f"{i * 1.25:.2f}"}
+        for i in range(rows)
+    ]
+
+
+def _timed(fn, iterations, before=None):
+    samples = np.empty(iterations)
+    for i in range(iterations):
+        if before is not None:
+            before()
+        t0 = time.perf_counter_ns()
+        fn()
+        samples[i] = time.perf_counter_ns() - t0
+    return samples / 1000  # µs
+
+
+class Command(BaseCommand):
+    help = "Measure cache hit latency for each tier of the default cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=2000, help="Reads timed per case")
+        parser.add_argument("--rows", type=int, default=100, help="Rows in the cached payload")
+
+    def handle(self, *args, **opts):
+        shared = getattr(cache, "shared", None)
+        if shared is None:
+            raise CommandError("The default cache is not the two-tier backend (inventory.utils.tiered_cache).")
+        n = opts["iterations"]
+        key = BENCH_KEY.format(opts["rows"])
+        cache.set(key, _payload(opts["rows"]), timeout=600)
+        cached_for_owner(BENCH_OWNER, key, lambda: _payload(opts["rows"]))
+
+        cases = [
+            ("L1 hit", _timed(lambda: cache.get(key), n)),
+            ("L2 hit", _timed(lambda: shared.get(key), n)),
+            ("L1 miss, L2 hit", _timed(lambda: cache.get(key), n, before=cache.clear_local)),
+            ("Miss", _timed(lambda: cache.get(key + ":missing"), n)),
+            ("cached_for_owner hit", _timed(
+                lambda: cached_for_owner(BENCH_OWNER, key, lambda: _payload(opts["rows"])), n,
+            )),
+        ]
+        cache.delete(key)
+
+        self.stdout.write(f"{'case':<22}{'p50 µs':>10}{'p95 µs':>10}{'p99 µs':>10}{'mean µs':>10}")
+        for name, us in cases:
+            p50, p95, p99 = np.percentile(us, [50, 95, 99])
+            self.stdout.write(f"{name:<22}{p50:>10.1f}{p95:>10.1f}{p99:>10.1f}{us.mean():>10.1f}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Cache benchmark • L2 {type(shared).__name__} • {opts['rows']} rows • {n} reads per case"
+        ))
@@ -0,0 +1,178 @@
+import json
+import random
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import Permission, User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import RequestFactory
+
+from inventory.models import Product
+from inventory.views import adjust_stock
+from main.views import dashboard
+
+from ._scratch import copy_db, point_default_at, remove_db
+
+BENCH_USER = "sqlite-bench"
+
+
+class Worker(threading.Thread):
+    """Calls one view in a loop until ``deadline``; records latency (ms) and errors."""
+
+    def __init__(self, kind, user_id, product_ids, start, deadline):
+        super().__init__(daemon=True)
+        self.kind = kind
+        self.user_id = user_id
+        self.product_ids = product_ids
+        self.start_barrier = start
+        self.deadline = deadline
+        self.latencies = []
+        self.errors = {}
+
+    def request(self, factory, user):
+        if self.kind == "write":
+            pk = random.choice(self.product_ids)
+            req = factory.post(f"/inventory/products/{pk}/adjust-stock/", {
+                "movement_type": random.choice(("IN", "OUT")), "quantity": 1, "reason": "benchmark",
+            })
+            req.user = user
+            return adjust_stock(req, pk=pk)
+        req = factory.get("/dashboard/")
+        req.user = user
+        req.session = SessionStore()
+        return dashboard(req)
+
+    def run(self):
+        factory = RequestFactory()
+        try:
+            user = User.objects.get(pk=self.user_id)
+            self.start_barrier.wait()
+            while time.perf_counter() < self.deadline[0]:
+                t0 = time.perf_counter()
+                try:
+                    response = self.request(factory, user)
+                    if response.status_code >= 400:
+                        raise RuntimeError(f"HTTP {response.status_code}")
+                except Exception as exc:
+                    name = type(exc).__name__ + (f": {exc}" if str(exc) else "")
+                    self.errors[name] = self.errors.get(name, 0) + 1
+                else:
+                    self.latencies.append((time.perf_counter() - t0) * 1000)
+        finally:
+            connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Hammer adjust_stock and the dashboard from several threads against a scratch copy "
+        "of the database, once per SQLite profile, and compare throughput and latency"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--profiles", nargs="+", default=["default", "production"],
+                            help="Names from settings.SQLITE_PROFILES (default: default production)")
+        parser.add_argument("--writers", type=int, default=4, help="Threads posting stock adjustments")
+        parser.add_argument("--readers", type=int, default=4, help="Threads loading the dashboard")
+        parser.add_argument("--seconds", type=float, default=10.0, help="Run time per profile")
+        parser.add_argument("--products", type=int, default=200, help="Products the writers spread over")
+        parser.add_argument("--json", default="", help="Also write the results to this file")
+
+    def handle(self, *args, **opts):
+        if connection.vendor != "sqlite":
+            raise CommandError("benchmark_sqlite needs the SQLite backend.")
+        unknown = [p for p in opts["profiles"] if p not in settings.SQLITE_PROFILES]
+        if unknown:
+            raise CommandError(f"Unknown profile(s): {', '.join(unknown)}")
+
+        original = dict(connections.settings["default"])
+        workdir = Path(tempfile.mkdtemp(prefix="stocker-sqlite-bench-"))
+        try:
+            template = workdir / "template.sqlite3"
+            user_id, product_ids = self.build_template(original["NAME"], template, opts["products"])
+            results = {}
+            for profile in opts["profiles"]:
+                run_db = workdir / f"{profile}.sqlite3"
+                remove_db(run_db)
+                shutil.copyfile(template, run_db)
+                point_default_at(run_db, settings.SQLITE_PROFILES[profile])
+                results[profile] = self.run_profile(user_id, product_ids, opts)
+        finally:
+            connections.close_all()
+            connections.settings["default"].update(original)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        self.report(results)
+        if opts["json"]:
+            Path(opts["json"]).write_text(json.dumps(results, indent=2))
+        self.stdout.write(self.style.SUCCESS(
+            f"SQLite benchmark • {opts['writers']} writers • {opts['readers']} readers • "
+            f"{opts['seconds']:g}s per profile"
+        ))
+
+    def build_template(self, source, path, products):
+        """Copy of the configured database in rollback-journal mode, plus a benchmark user."""
+        copy_db(source, path, journal_mode="DELETE")
+        point_default_at(path, settings.SQLITE_PROFILES["default"])
+        call_command("createcachetable", verbosity=0)
+        User.objects.filter(username=BENCH_USER).delete()
+        user = User.objects.create_user(BENCH_USER)
+        user.user_permissions.set(Permission.objects.filter(codename="add_stockmovement"))
+        product_ids = [
+            Product.objects.create(owner=user, name=f"Bench {i}", sku=f"BENCH-{i:05d}",
+                                   quantity_on_hand=1_000_000).pk
+            for i in range(products)
+        ]
+        connections.close_all()
+        return user.pk, product_ids
+
+    def run_profile(self, user_id, product_ids, opts):
+        start = threading.Barrier(opts["writers"] + opts["readers"] + 1)
+        deadline = [float("inf")]
+        workers = (
+            [Worker("write", user_id, product_ids, start, deadline) for _ in range(opts["writers"])]
+            + [Worker("read", user_id, product_ids, start, deadline) for _ in range(opts["readers"])]
+        )
+        for w in workers:
+            w.start()
+        deadline[0] = time.perf_counter() + opts["seconds"]
+        start.wait()
+        for w in workers:
+            w.join()
+
+        result = {}
+        for kind in ("write", "read"):
+            group = [w for w in workers if w.kind == kind]
+            ms = np.array([x for w in group for x in w.latencies])
+            errors = {}
+            for w in group:
+                for name, n in w.errors.items():
+                    errors[name] = errors.get(name, 0) + n
+            result[kind] = {
+                "ok": int(ms.size),
+                "per_second": round(ms.size / opts["seconds"], 1),
+                "p50_ms": round(float(np.percentile(ms, 50)), 2) if ms.size else None,
+                "p99_ms": round(float(np.percentile(ms, 99)), 2) if ms.size else None,
+                "errors": errors,
+            }
+        return result
+
+    def report(self, results):
+        self.stdout.write(
+            f"{'profile':<12}{'kind':<7}{'ok/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}"
+        )
+        for profile, result in results.items():
+            for kind, r in result.items():
+                self.stdout.write(
+                    f"{profile:<12}{kind:<7}{r['per_second']:>9}{r['p50_ms'] or '-':>9}"
+                    f"{r['p99_ms'] or '-':>9}{sum(r['errors'].values()):>8}"
+                )
+                for name, n in sorted(r["errors"].items()):
+                    self.stdout.write(f"{'':<19}{n} × {name[:100]}")
@@ -0,0 +1,410 @@
+import json
+import random
+import shutil
+import tempfile
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import timedelta
+from importlib import import_module
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.db.models import Count, F
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from inventory.models import Category, Product
+from suppliers.models import PurchaseOrder, PurchaseOrderItem, Supplier
+
+from ._scratch import copy_db, point_default_at, remove_db
+
+URLCONFS = ("main.urls", "inventory.urls", "suppliers.urls")
+SEARCH_TERMS = ("coffee", "premium", "cable", "organic", "soap", "pro", "acme", "ki")
+
+# (url name, method, requests per 1000, Traffic method returning (url kwargs, data, client kwargs)).
+# Roughly what one busy owner does in a day: mostly dashboard, product pages and
+# stock adjustments, a steady trickle of reports, and the odd edit or import.
+MIX = (
+    ("main:home", "GET", 10, "nothing"),
+    ("main:dashboard", "GET", 140, "dashboard"),
+    ("main:settings", "GET", 5, "nothing"),
+    ("main:settings", "POST", 5, "preferences"),
+    ("main:metrics", "GET", 2, "nothing"),
+    ("inventory:query_log", "GET", 2, "nothing"),  # 403 unless the owner is staff
+    ("inventory:product_list", "GET", 140, "product_list"),
+    ("inventory:product_detail", "GET", 110, "product"),
+    ("inventory:product_create", "GET", 10, "nothing"),
+    ("inventory:product_create", "POST", 10, "new_product"),
+    ("inventory:product_update", "GET", 15, "product"),
+    ("inventory:product_update", "POST", 10, "edit_product"),
+    ("inventory:product_delete", "GET", 5, "product"),
+    ("inventory:product_delete", "POST", 5, "scratch_product"),
+    ("inventory:product_import", "GET", 5, "nothing"),
+    ("inventory:product_import", "POST", 5, "import_file"),
+    ("inventory:product_import_errors", "GET", 5, "import_report"),
+    ("inventory:adjust_stock", "GET", 10, "product"),
+    ("inventory:adjust_stock", "POST", 80, "adjustment"),
+    ("inventory:adjust_stock_batch", "POST", 30, "adjustment_batch"),
+    ("inventory:category_list", "GET", 40, "category_list"),
+    ("inventory:category_create", "GET", 5, "nothing"),
+    ("inventory:category_create", "POST", 5, "new_category"),
+    ("inventory:category_update", "GET", 5, "category"),
+    ("inventory:category_update", "POST", 5, "edit_category"),
+    ("inventory:category_delete", "GET", 5, "category"),
+    ("inventory:category_delete", "POST", 5, "scratch_category"),
+    ("inventory:reports", "GET", 60, "reports"),
+    ("inventory:inventory_report_csv", "GET", 10, "nothing"),
+    ("inventory:supplier_report_csv", "GET", 10, "nothing"),
+    ("inventory:movement_report_csv", "GET", 10, "date_range"),
+    ("inventory:movement_export", "GET", 5, "date_range"),
+    ("inventory:analytics_report", "GET", 20, "date_range"),
+    ("inventory:stock_as_of_report", "GET", 15, "as_of"),
+    ("suppliers:supplier_list", "GET", 50, "supplier_list"),
+    ("suppliers:supplier_detail", "GET", 30, "supplier"),
+    ("suppliers:supplier_create", "GET", 5, "nothing"),
+    ("suppliers:supplier_create", "POST", 5, "new_supplier"),
+    ("suppliers:supplier_update", "GET", 5, "supplier"),
+    ("suppliers:supplier_update", "POST", 5, "edit_supplier"),
+    ("suppliers:supplier_delete", "GET", 5, "supplier"),
+    ("suppliers:supplier_delete", "POST", 5, "scratch_supplier"),
+    ("suppliers:purchaseorder_list", "GET", 40, "order_list"),
+    ("suppliers:purchaseorder_create", "GET", 5, "nothing"),
+    ("suppliers:purchaseorder_create", "POST", 5, "new_order"),
+    ("suppliers:purchaseorder_detail", "GET", 30, "order"),
+    ("suppliers:purchaseorder_detail", "POST", 10, "order_line"),
+    ("suppliers:purchaseorder_receive", "POST", 10, "receipt"),
+    ("suppliers:purchaseorder_receive_all", "POST", 10, "receipt"),
+)
+
+
+def _stored_reports(owner):
+    try:
+        return set(default_storage.listdir(f"import_reports/{owner.pk}")[1])
+    except FileNotFoundError:
+        return set()
+
+
+def _url_names():
+    for module in URLCONFS:
+        urls = import_module(module)
+        for pattern in urls.urlpatterns:
+            if pattern.name:
+                yield f"{urls.app_name}:{pattern.name}"
+
+
+class Traffic:
+    """Request payloads for one owner.
+
+    Rows a request needs to exist first (a product to delete, an open
+    purchase order to receive) are created here, before the clock starts.
+    """
+
+    def __init__(self, owner, rng):
+        self.owner = owner
+        self.rng = rng
+        self.token = uuid.uuid4().hex[:6]
+        self.serial = 0
+        self.products = list(Product.objects.filter(owner=owner).values_list("pk", flat=True))
+        self.categories = list(Category.objects.filter(owner=owner).values_list("pk", flat=True))
+        self.suppliers = list(Supplier.objects.filter(owner=owner).values_list("pk", flat=True))
+        self.orders = list(PurchaseOrder.objects.filter(owner=owner).values_list("pk", flat=True)[:500])
+        if not (self.products and self.categories and self.suppliers):
+            raise CommandError(f"Owner {owner.pk} needs products, categories and suppliers; run seed_stocker first.")
+
+    def name(self, kind):
+        self.serial += 1
+        return f"Bench {kind} {self.token}-{self.serial}"
+
+    def product_fields(self, product):
+        return {
+            "name": product.name, "sku": product.sku, "category": product.category_id or "",
+            "description": product.description or "", "unit": product.unit,
+            "price_cost": product.price_cost, "price_sale": product.price_sale,
+            "reorder_level": product.reorder_level, "quantity_on_hand": product.quantity_on_hand,
+            "expiry_date": product.expiry_date or "",
+            "suppliers": list(product.suppliers.values_list("pk", flat=True)),
+        }
+
+    def open_line(self):
+        """An item with something left to receive, on an order that is still open."""
+        item = (PurchaseOrderItem.objects
+                .filter(po__owner=self.owner, quantity_received__lt=F("quantity_ordered"))
+                .exclude(po__status__in=[PurchaseOrder.STATUS_RECEIVED, PurchaseOrder.STATUS_CANCELLED])
+                .order_by("?").first())
+        if item is None:
+            po = PurchaseOrder.objects.create(owner=self.owner, supplier_id=self.rng.choice(self.suppliers),
+                                              status=PurchaseOrder.STATUS_SUBMITTED)
+            item = PurchaseOrderItem.objects.create(po=po, product_id=self.rng.choice(self.products), quantity_ordered=50)
+        return item
+
+    # Builders ------------------------------------------------------------
+
+    def nothing(self):
+        return {}, None, {}
+
+    def dashboard(self):
+        params = self.rng.choice([{}, {}, {}, {"q": self.rng.choice(SEARCH_TERMS)}, {"o": "name"}])
+        return {}, params, {}
+
+    def preferences(self):
+        return {}, {"save_prefs": "1", "items_per_page": 10}, {}
+
+    def product_list(self):
+        return {}, self.rng.choice([{}, {}, {"q": self.rng.choice(SEARCH_TERMS)}, {"status": "low"}]), {}
+
+    def product(self):
+        return {"pk": self.rng.choice(self.products)}, None, {}
+
+    def new_product(self):
+        name = self.name("product")
+        return {}, {
+            "name": name, "sku": name.rsplit(" ", 1)[1], "category": self.rng.choice(self.categories),
+            "unit": "PCS", "price_cost": "4.20", "price_sale": "6.90", "reorder_level": 5,
+            "quantity_on_hand": 20, "suppliers": [self.rng.choice(self.suppliers)],
+        }, {}
+
+    def edit_product(self):
+        product = Product.objects.get(pk=self.rng.choice(self.products))
+        return {"pk": product.pk}, {**self.product_fields(product), "reorder_level": product.reorder_level + 1}, {}
+
+    def scratch_product(self):
+        name = self.name("product")
+        product = Product.objects.create(owner=self.owner, name=name, sku=name.rsplit(" ", 1)[1])
+        return {"pk": product.pk}, {}, {}
+
+    def import_file(self):
+        rows = Product.objects.filter(pk__in=self.rng.sample(self.products, min(20, len(self.products))))
+        lines = ["sku,name,reorder_level,quantity_on_hand"]
+        lines += [f"{p.sku},{p.name},{p.reorder_level},{p.quantity_on_hand}" for p in rows]
+        lines.append(",missing sku,1,1")  # one bad row, so the import writes an error report
+        upload = SimpleUploadedFile("products.csv", "\n".join(lines).encode(), content_type="text/csv")
+        return {}, {"file": upload}, {}
+
+    def import_report(self):
+        report = uuid.uuid4().hex
+        default_storage.save(f"import_reports/{self.owner.pk}/{report}.csv", ContentFile(b"row,error\n"))
+        return {"report": report}, None, {}
+
+    def adjustment(self):
+        return {"pk": self.rng.choice(self.products)}, {
+            "movement_type": self.rng.choice(["OUT", "OUT", "OUT", "IN"]),
+            "quantity": self.rng.randint(1, 3), "reason": "benchmark",
+        }, {}
+
+    def adjustment_batch(self):
+        lines = [
+            {"product_id": pk, "movement_type": "OUT", "quantity": 1, "reason": "benchmark"}
+            for pk in self.rng.sample(self.products, min(10, len(self.products)))
+        ]
+        return {}, json.dumps({"lines": lines}), {"content_type": "application/json"}
+
+    def category_list(self):
+        return {}, self.rng.choice([{}, {}, {"q": self.rng.choice(SEARCH_TERMS)}]), {}
+
+    def category(self):
+        return {"pk": self.rng.choice(self.categories)}, None, {}
+
+    def new_category(self):
+        return {}, {"name": self.name("category"), "description": ""}, {}
+
+    def edit_category(self):
+        category = Category.objects.get(pk=self.rng.choice(self.categories))
+        return {"pk": category.pk}, {"name": category.name, "description": "benchmark"}, {}
+
+    def scratch_category(self):
+        return {"pk": Category.objects.create(owner=self.owner, name=self.name("category")).pk}, {}, {}
+
+    def reports(self):
+        return {}, self.rng.choice([{}, {}, {}, {"format": "json"}]), {}
+
+    def date_range(self):
+        end = timezone.localdate()
+        return {}, {"start": (end - timedelta(days=29)).isoformat(), "end": end.isoformat()}, {}
+
+    def as_of(self):
+        return {}, {"date": (timezone.localdate() - timedelta(days=self.rng.randint(0, 90))).isoformat()}, {}
+
+    def supplier_list(self):
+        return {}, self.rng.choice([{}, {}, {"q": self.rng.choice(SEARCH_TERMS)}]), {}
+
+    def supplier(self):
+        return {"pk": self.rng.choice(self.suppliers)}, None, {}
+
+    def new_supplier(self):
+        return {}, {"name": self.name("supplier"), "email": "bench@example.com"}, {}
+
+    def edit_supplier(self):
+        supplier = Supplier.objects.get(pk=self.rng.choice(self.suppliers))
+        return {"pk": supplier.pk}, {
+            "name": supplier.name, "email": supplier.email, "phone": supplier.phone,
+            "website": supplier.website, "address": supplier.address, "notes": "benchmark",
+        }, {}
+
+    def scratch_supplier(self):
+        return {"pk": Supplier.objects.create(owner=self.owner, name=self.name("supplier")).pk}, {}, {}
+
+    def order_list(self):
+        return {}, self.rng.choice([{}, {}, {"status": PurchaseOrder.STATUS_RECEIVED}]), {}
+
+    def order(self):
+        pk = self.rng.choice(self.orders) if self.orders else self.open_line().po_id
+        return {"pk": pk}, None, {}
+
+    def new_order(self):
+        return {}, {"supplier": self.rng.choice(self.suppliers), "notes": "benchmark"}, {}
+
+    def order_line(self):
+        item = self.open_line()
+        return {"pk": item.po_id}, {
+            "add_item": "1", "product": self.rng.choice(self.products), "quantity_ordered": 12, "unit_cost": "3.10",
+        }, {}
+
+    def receipt(self):
+        item = self.open_line()
+        return {"pk": item.po_id}, {"item_id": item.pk, "quantity": 1, "receive_all": "1"}, {}
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a weighted mix of requests against every main, inventory and suppliers URL with the "
+        "test client, and write per-view latency percentiles and query counts to a JSON report"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--owner", type=int, default=None,
+                            help="User id to browse as (default: the owner with the most products)")
+        parser.add_argument("--requests", type=int, default=1000, help="Requests in the timed mix")
+        parser.add_argument("--min-per-view", type=int, default=5,
+                            help="Timed requests for every URL/method, however small its share")
+        parser.add_argument("--seed", type=int, default=1, help="Random seed for the request order and payloads")
+        parser.add_argument("--json", default="benchmark_traffic.json", help="Where to write the report")
+        parser.add_argument("--in-place", action="store_true",
+                            help="Run against the configured database and keep the writes (default: a scratch "
+                                 "copy, SQLite only)")
+
+    def handle(self, *args, **opts):
+        original = dict(connections.settings["default"])
+        workdir = None
+        if not opts["in_place"]:
+            if connection.vendor != "sqlite":
+                raise CommandError("Scratch copies need SQLite; pass --in-place to write to the configured database.")
+            workdir = Path(tempfile.mkdtemp(prefix="stocker-traffic-"))
+            copy = workdir / "traffic.sqlite3"
+            copy_db(original["NAME"], copy)
+            point_default_at(copy, original.get("OPTIONS", {}))
+        try:
+            results = self.run(opts)
+        finally:
+            if workdir is not None:
+                connections.close_all()
+                connections.settings["default"].update(original)
+                remove_db(workdir / "traffic.sqlite3")
+                shutil.rmtree(workdir, ignore_errors=True)
+
+        self.report(results)
+        Path(opts["json"]).write_text(json.dumps(results, indent=2))
+        self.stdout.write(self.style.SUCCESS(
+            f"Traffic benchmark • owner {results['owner']} • {results['requests']} requests • "
+            f"{len(results['views'])} URL/method pairs • {opts['json']}"
+        ))
+
+    def run(self, opts):
+        if opts["owner"] is not None:
+            owner = User.objects.filter(pk=opts["owner"]).first()
+        else:
+            owner = User.objects.annotate(n=Count("products")).order_by("-n").first()
+        if owner is None:
+            raise CommandError("No such owner.")
+
+        rng = random.Random(opts["seed"])
+        traffic = Traffic(owner, rng)
+        total = sum(weight for _, _, weight, _ in MIX)
+        schedule = [
+            entry for entry in MIX
+            for _ in range(max(opts["min_per_view"], round(opts["requests"] * entry[2] / total)))
+        ]
+        rng.shuffle(schedule)
+
+        # Import reports land in media storage even on a scratch database.
+        reports = _stored_reports(owner)
+        client = Client()
+        client.force_login(owner)
+        samples = defaultdict(lambda: {"ms": [], "queries": [], "status": Counter()})
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            for name, method, _, builder in MIX:  # one untimed pass to warm templates, caches and connections
+                self.hit(client, traffic, name, method, builder)
+            t0 = time.perf_counter()
+            for name, method, _, builder in schedule:
+                ms, queries, status = self.hit(client, traffic, name, method, builder)
+                sample = samples[f"{name} {method}"]
+                sample["ms"].append(ms)
+                sample["queries"].append(queries)
+                sample["status"][str(status)] += 1
+            wall = time.perf_counter() - t0
+        for name in _stored_reports(owner) - reports:
+            default_storage.delete(f"import_reports/{owner.pk}/{name}")
+
+        covered = {name for name, *_ in MIX}
+        views = {}
+        for key, s in sorted(samples.items()):
+            ms = np.array(s["ms"])
+            views[key] = {
+                "n": int(ms.size),
+                "p50_ms": round(float(np.percentile(ms, 50)), 2),
+                "p95_ms": round(float(np.percentile(ms, 95)), 2),
+                "p99_ms": round(float(np.percentile(ms, 99)), 2),
+                "max_ms": round(float(ms.max()), 2),
+                "queries_mean": round(float(np.mean(s["queries"])), 1),
+                "queries_max": int(max(s["queries"])),
+                "status": dict(s["status"]),
+            }
+        return {
+            "owner": owner.pk,
+            "requests": len(schedule),
+            "seconds": round(wall, 2),
+            "database": "in place" if opts["in_place"] else "scratch copy",
+            "async_views": settings.ASYNC_VIEWS,
+            "uncovered": sorted(set(_url_names()) - covered),
+            "views": views,
+        }
+
+    @staticmethod
+    def hit(client, traffic, name, method, builder):
+        """(ms, queries, status) of one request; streamed bodies are read inside the timing."""
+        kwargs, data, extra = getattr(traffic, builder)()
+        path = reverse(name, kwargs=kwargs or None)
+        send = client.post if method == "POST" else client.get
+        connection.queries_log.clear()  # CaptureQueriesContext slices it; don't let it hit its cap
+        with CaptureQueriesContext(connection) as queries:
+            t0 = time.perf_counter()
+            response = send(path, data, **extra)
+            if response.streaming:
+                for _ in response.streaming_content:
+                    pass
+            ms = (time.perf_counter() - t0) * 1000
+        response.close()
+        return ms, len(queries), response.status_code
+
+    def report(self, results):
+        self.stdout.write(
+            f"{'view':<44}{'n':>5}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}  status"
+        )
+        rows = sorted(results["views"].items(), key=lambda kv: -kv[1]["p95_ms"])
+        for key, v in rows:
+            status = " ".join(f"{code}×{n}" for code, n in sorted(v["status"].items()))
+            self.stdout.write(
+                f"{key:<44}{v['n']:>5}{v['p50_ms']:>9}{v['p95_ms']:>9}{v['p99_ms']:>9}"
+                f"{v['queries_mean']:>9}  {status}"
+            )
+        for name in results["uncovered"]:
+            self.stdout.write(self.style.WARNING(f"No traffic defined for {name}; add it to MIX."))
@@ -0,0 +1,40 @@
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from inventory.models import MovementCheckpoint, Product
+from inventory.utils.ledger import stock_as_of
+
+
+class Command(BaseCommand):
+    help = "Write per-product stock checkpoints at the start of a day, for fast as-of queries"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", default=None,
+                            help="Checkpoint at local midnight starting this day (YYYY-MM-DD, default: today)")
+        parser.add_argument("--owner", type=int, default=None,
+                            help="Only checkpoint this owner's products (user id)")
+
+    def handle(self, *args, **opts):
+        try:
+            day = datetime.fromisoformat(opts["date"]).date() if opts["date"] else timezone.localdate()
+        except ValueError:
+            raise CommandError("--date must be YYYY-MM-DD")
+        if day > timezone.localdate():
+            # Movements made later that day would land before the checkpoint.
+            raise CommandError("--date can't be in the future")
+        at = timezone.make_aware(datetime.combine(day, time.min))
+
+        owners = Product.objects.filter(owner__isnull=False).values_list("owner_id", flat=True).distinct().order_by()
+        if opts["owner"] is not None:
+            owners = [opts["owner"]]
+
+        written = 0
+        for owner_id in owners:
+            rows = stock_as_of(owner_id, at)
+            with transaction.atomic():
+                written += MovementCheckpoint.store(at, [(r["product_id"], r["quantity"]) for r in rows])
+
+        self.stdout.write(self.style.SUCCESS(f"Checkpoints at {at:%Y-%m-%d %H:%M} • {written} products"))
@@ -0,0 +1,44 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from inventory.utils.export import CHUNK_SIZE, FORMATS, export_movements, resolve_format
+
+
+class Command(BaseCommand):
+    help = "Export stock movements to Parquet (or gzip NDJSON when pyarrow is missing)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", default=None, help="First day to include (YYYY-MM-DD)")
+        parser.add_argument("--end", default=None, help="Last day to include (YYYY-MM-DD)")
+        parser.add_argument("--owner", type=int, default=None, help="Only this owner's movements (user id)")
+        parser.add_argument("--format", choices=sorted(FORMATS), default=None,
+                            help="Output format (default: parquet if available)")
+        parser.add_argument("--output", default=None,
+                            help="Output file (default: movements_<today>.<ext> in the current directory)")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Rows read and encoded per chunk")
+
+    def _date(self, value, name):
+        if value is None:
+            return None
+        try:
+            return datetime.fromisoformat(value).date()
+        except ValueError:
+            raise CommandError(f"--{name} must be YYYY-MM-DD")
+
+    def handle(self, *args, **opts):
+        start = self._date(opts["start"], "start")
+        end = self._date(opts["end"], "end")
+        fmt = resolve_format(opts["format"])
+        if opts["format"] and fmt != opts["format"]:
+            self.stderr.write(f"{opts['format']} is not available here, writing {fmt}")
+        path = opts["output"] or f"movements_{timezone.localdate():%Y%m%d}.{FORMATS[fmt][0]}"
+
+        written = 0
+        with open(path, "wb") as f:
+            for data in export_movements(opts["owner"], start, end, fmt, opts["chunk_size"]):
+                f.write(data)
+                written += len(data)
+
+        self.stdout.write(self.style.SUCCESS(f"Movements exported • {path} • {written} bytes ({fmt})"))
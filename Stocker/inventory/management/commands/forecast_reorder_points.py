@@ -0,0 +1,97 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from inventory.models import Product, ReorderSuggestion
+from inventory.utils import forecast
+
+
+def init_worker(params):
+    django.setup()
+    forecast.configure(params)
+
+
+class Command(BaseCommand):
+    help = "Forecast demand from OUT movements and suggest reorder levels and order quantities"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--owner", type=int, default=None,
+                            help="Only forecast this owner's products (user id)")
+        parser.add_argument("--history-days", type=int, default=settings.REORDER_HISTORY_DAYS,
+                            help="Days of demand history to fit (default: REORDER_HISTORY_DAYS)")
+        parser.add_argument("--method", choices=forecast.METHODS, default="ses",
+                            help="ma = moving average, ses = exponential smoothing")
+        parser.add_argument("--alpha", type=float, default=0.3,
+                            help="Smoothing factor for --method ses")
+        parser.add_argument("--window", type=int, default=28,
+                            help="Days averaged by --method ma")
+        parser.add_argument("--seasonal", action="store_true",
+                            help="Model day-of-week seasonality")
+        parser.add_argument("--service-level", type=float, default=0.95,
+                            help="Target probability of not running out during a lead time")
+        parser.add_argument("--cover-days", type=int, default=30,
+                            help="Days of demand a suggested order should cover beyond the reorder level")
+        parser.add_argument("--lead-days", type=int, default=settings.REORDER_DEFAULT_LEAD_DAYS,
+                            help="Lead time for products whose suppliers have no purchase orders")
+        parser.add_argument("--batch-size", type=int, default=forecast.DEFAULT_BATCH_SIZE,
+                            help="Products fitted together in one batch")
+        parser.add_argument("--workers", type=int, default=1,
+                            help="Processes used to fit batches")
+        parser.add_argument("--apply", action="store_true",
+                            help="Also copy the suggested levels onto Product.reorder_level")
+
+    def handle(self, *args, **opts):
+        end = timezone.localdate() - timedelta(days=1)  # last complete day
+        start = end - timedelta(days=opts["history_days"] - 1)
+
+        products = Product.objects.all()
+        if opts["owner"] is not None:
+            products = products.filter(owner_id=opts["owner"])
+        product_ids = list(products.order_by("owner_id", "pk").values_list("pk", flat=True))
+        owner_ids = None if opts["owner"] is None else [opts["owner"]]
+
+        params = {
+            "start": start,
+            "end": end,
+            "method": opts["method"],
+            "alpha": opts["alpha"],
+            "window": opts["window"],
+            "seasonal": opts["seasonal"],
+            "z": forecast.service_factor(opts["service_level"]),
+            "cover_days": opts["cover_days"],
+            "default_lead": opts["lead_days"],
+            "leads": forecast.supplier_lead_times(start, owner_ids),
+        }
+        batches = forecast.batches(product_ids, opts["batch_size"])
+        computed_at = timezone.now()
+        written = 0
+
+        # Workers only read; every write happens here, one upsert per batch.
+        if opts["workers"] > 1:
+            connections.close_all()  # don't share the parent's connection with forked workers
+            with ProcessPoolExecutor(max_workers=opts["workers"], initializer=init_worker,
+                                     initargs=(params,)) as pool:
+                for rows in pool.map(forecast.forecast_batch, batches):
+                    ReorderSuggestion.store(rows, computed_at)
+                    written += len(rows)
+        else:
+            forecast.configure(params)
+            for ids in batches:
+                rows = forecast.forecast_batch(ids)
+                ReorderSuggestion.store(rows, computed_at)
+                written += len(rows)
+
+        applied = 0
+        if opts["apply"]:
+            owners = owner_ids or list(products.values_list("owner_id", flat=True).distinct())
+            applied = ReorderSuggestion.apply(owners)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Reorder points {start:%Y-%m-%d}..{end:%Y-%m-%d} • {written} products • "
+            f"{len(params['leads'])} supplier lead times • {applied} levels applied"
+        ))
@@ -0,0 +1,39 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.utils.importer import DEFAULT_CHUNK_SIZE, ImportFileError, ProductImporter, error_report, read_rows
+
+
+class Command(BaseCommand):
+    help = "Import (upsert by SKU) products for one owner from a CSV or XLSX file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or XLSX file with a header row")
+        parser.add_argument("--owner", required=True, help="Owner username or user id")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                            help="Rows validated and written per transaction")
+        parser.add_argument("--errors", default=None,
+                            help="Write rejected rows to this CSV file")
+        parser.add_argument("--replace", action="store_true",
+                            help="Overwrite every field of existing products; the file must have every column")
+
+    def handle(self, *args, **opts):
+        User = get_user_model()
+        key = opts["owner"]
+        owner = User.objects.filter(pk=int(key)).first() if key.isdigit() else User.objects.filter(username=key).first()
+        if owner is None:
+            raise CommandError(f"No such user: {key}")
+
+        try:
+            with open(opts["path"], "rb") as f:
+                importer = ProductImporter(owner, chunk_size=opts["chunk_size"], replace=opts["replace"])
+                result = importer.run(read_rows(f, opts["path"]))
+        except (OSError, ImportFileError) as e:
+            raise CommandError(str(e))
+
+        if result["errors"] and opts["errors"]:
+            with open(opts["errors"], "w", newline="") as f:
+                f.write(error_report(result["errors"]))
+        self.stdout.write(self.style.SUCCESS(
+            f"Import done • {result['created']} created • {result['updated']} updated • {len(result['errors'])} errors"
+        ))
@@ -0,0 +1,132 @@
+import logging
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from inventory.models import AlertOutbox
+from inventory.utils.notifications import build_low_stock_message
+
+logger = logging.getLogger(__name__)
+
+LEASE = timedelta(minutes=5)
+PURGE_EVERY = 3600  # seconds between purges in --loop mode
+
+
+class Command(BaseCommand):
+    help = "Send queued alert emails from the outbox, with retries and backoff"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=getattr(settings, "ALERT_OUTBOX_BATCH_SIZE", 100),
+                            help="Rows claimed per batch")
+        parser.add_argument("--max-attempts", type=int, default=getattr(settings, "ALERT_OUTBOX_MAX_ATTEMPTS", 5),
+                            help="Give up on a row after this many failed sends")
+        parser.add_argument("--loop", action="store_true",
+                            help="Keep polling instead of exiting once the outbox is drained")
+        parser.add_argument("--interval", type=float, default=5.0,
+                            help="Seconds to sleep between polls in --loop mode")
+        parser.add_argument("--keep-days", type=int, default=getattr(settings, "ALERT_OUTBOX_KEEP_DAYS", 7),
+                            help="Delete sent rows older than this many days (0 keeps them)")
+
+    def handle(self, *args, **opts):
+        totals = [0, 0, 0]
+        purged = self.purge(opts["keep_days"])
+        last_purge = time.monotonic()
+        while True:
+            for i, n in enumerate(self.drain(opts["batch_size"], opts["max_attempts"])):
+                totals[i] += n
+            if not opts["loop"]:
+                break
+            if time.monotonic() - last_purge >= PURGE_EVERY:
+                purged += self.purge(opts["keep_days"])
+                last_purge = time.monotonic()
+            time.sleep(opts["interval"])
+        sent, retrying, failed = totals
+        self.stdout.write(self.style.SUCCESS(
+            f"Outbox drained • sent: {sent}, retrying: {retrying}, failed: {failed} • purged: {purged}"
+        ))
+
+    def purge(self, keep_days):
+        """Delete rows sent more than ``keep_days`` ago; failed rows stay for inspection."""
+        if keep_days <= 0:
+            return 0
+        cutoff = timezone.now() - timedelta(days=keep_days)
+        deleted, _ = AlertOutbox.objects.filter(status=AlertOutbox.STATUS_SENT, sent_at__lt=cutoff).delete()
+        return deleted
+
+    def drain(self, batch_size, max_attempts):
+        totals = [0, 0, 0]
+        while True:
+            rows = self.claim(batch_size)
+            if not rows:
+                return totals
+            for i, n in enumerate(self.send(rows, max_attempts)):
+                totals[i] += n
+
+    def claim(self, batch_size):
+        """Lease a batch of due rows with one conditional UPDATE.
+
+        A claimed row's next_attempt_at becomes its lease expiry, so rows left
+        in SENDING by a crashed worker become due again on their own.
+        """
+        now = timezone.now()
+        claimable = Q(status=AlertOutbox.STATUS_PENDING) | Q(status=AlertOutbox.STATUS_SENDING)
+        due = list(
+            AlertOutbox.objects.filter(claimable, next_attempt_at__lte=now)
+            .order_by("id").values_list("id", flat=True)[:batch_size]
+        )
+        if not due:
+            return []
+        token = uuid.uuid4().hex
+        AlertOutbox.objects.filter(claimable, pk__in=due, next_attempt_at__lte=now).update(
+            status=AlertOutbox.STATUS_SENDING, claim_token=token, next_attempt_at=now + LEASE,
+        )
+        return list(AlertOutbox.objects.filter(claim_token=token).select_related("product"))
+
+    def send(self, rows, max_attempts):
+        retry_seconds = getattr(settings, "ALERT_OUTBOX_RETRY_SECONDS", 60)
+        sent, retry = [], []
+        # One SMTP session for the whole batch.
+        connection = get_connection()
+        try:
+            connection.open()
+        except Exception as exc:
+            logger.warning("Could not open mail connection: %s", exc)
+            for row in rows:
+                row.last_error = str(exc)[:2000]
+            retry = rows
+        else:
+            try:
+                for row in rows:
+                    try:
+                        build_low_stock_message([row.product], connection=connection).send()
+                    except Exception as exc:
+                        logger.warning("Alert %s failed (attempt %s): %s", row.pk, row.attempts + 1, exc)
+                        row.last_error = str(exc)[:2000]
+                        retry.append(row)
+                    else:
+                        sent.append(row.pk)
+            finally:
+                connection.close()
+
+        now = timezone.now()
+        if sent:
+            AlertOutbox.objects.filter(pk__in=sent).update(status=AlertOutbox.STATUS_SENT, sent_at=now, claim_token="")
+        gave_up = 0
+        for row in retry:
+            row.attempts += 1
+            row.claim_token = ""
+            if row.attempts >= max_attempts:
+                row.status = AlertOutbox.STATUS_FAILED
+                gave_up += 1
+            else:
+                row.status = AlertOutbox.STATUS_PENDING
+                row.next_attempt_at = now + timedelta(seconds=retry_seconds * 2 ** (row.attempts - 1))
+        if retry:
+            AlertOutbox.objects.bulk_update(retry, ["attempts", "status", "next_attempt_at", "last_error", "claim_token"])
+        return len(sent), len(retry) - gave_up, gave_up
@@ -0,0 +1,58 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Sum, Case, When, IntegerField, Value
+from django.db.models.functions import Coalesce, TruncDate
+
+from inventory.models import MovementDailyRollup
+from inventory.utils import ledger
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily movement rollup table from the raw movement ledger (live and archived)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--owner", type=int, default=None,
+                            help="Only rebuild rows for this owner (user id)")
+        parser.add_argument("--batch-size", type=int, default=2000,
+                            help="Rows per bulk insert")
+
+    def handle(self, *args, **opts):
+        owner_id = opts["owner"]
+        batch_size = opts["batch_size"]
+
+        existing = MovementDailyRollup.objects.all()
+        if owner_id is not None:
+            existing = existing.filter(owner_id=owner_id)
+
+        # Archives are cut at local midnight, so each product-day lives in
+        # exactly one of the sources and their groups never overlap.
+        grouped = [
+            mvs.annotate(d=TruncDate("created_at"))
+               .values("product_id", "product__owner_id", "d")
+               .annotate(
+                   in_qty=Coalesce(Sum(Case(When(movement_type="IN", then=F("quantity")), output_field=IntegerField())), Value(0)),
+                   out_qty=Coalesce(Sum(Case(When(movement_type="OUT", then=F("quantity")), output_field=IntegerField())), Value(0)),
+                   adj_qty=Coalesce(Sum(Case(When(movement_type="ADJ", then=F("quantity")), output_field=IntegerField())), Value(0)),
+               )
+               .order_by()
+            for mvs in ledger.sources(owner=owner_id)
+        ]
+
+        written = 0
+        with transaction.atomic():
+            existing.delete()
+            batch = []
+            for r in (r for rows in grouped for r in rows.iterator(chunk_size=batch_size)):
+                batch.append(MovementDailyRollup(
+                    owner_id=r["product__owner_id"], product_id=r["product_id"], day=r["d"],
+                    in_qty=r["in_qty"], out_qty=r["out_qty"], adj_qty=r["adj_qty"],
+                ))
+                if len(batch) >= batch_size:
+                    MovementDailyRollup.objects.bulk_create(batch)
+                    written += len(batch)
+                    batch = []
+            if batch:
+                MovementDailyRollup.objects.bulk_create(batch)
+                written += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Rollup rebuilt • {written} product-day rows"))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from inventory.utils.search import get_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the product/supplier/category search index"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--owner", type=int, default=None,
+                            help="Only rebuild entries for this owner (user id)")
+
+    def handle(self, *args, **opts):
+        backend = get_backend()
+        backend.rebuild(owner_id=opts["owner"])
+        self.stdout.write(self.style.SUCCESS(f"Search index rebuilt ({type(backend).__name__})"))
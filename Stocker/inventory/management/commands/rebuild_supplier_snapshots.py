@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from inventory.models import SupplierSnapshot
+
+
+class Command(BaseCommand):
+    help = "Recompute supplier product counts, stock on hand and valuation from the product links"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--owner", type=int, default=None,
+                            help="Only rebuild this owner's suppliers (user id)")
+
+    def handle(self, *args, **opts):
+        before = {
+            s.supplier_id: (s.product_count, s.total_on_hand, s.total_value)
+            for s in SupplierSnapshot.objects.filter(
+                **({} if opts["owner"] is None else {"supplier__owner_id": opts["owner"]})
+            ).iterator()
+        }
+        totals = SupplierSnapshot.rebuild(owner_id=opts["owner"])
+        drifted = sum(1 for pk, row in totals.items() if before.get(pk) != row)
+        self.stdout.write(self.style.SUCCESS(
+            f"Supplier snapshots rebuilt • {len(totals)} suppliers • {drifted} were missing or drifted"
+        ))
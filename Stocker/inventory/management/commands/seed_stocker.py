@@ -0,0 +1,299 @@
+import io
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from datetime import time as dtime
+from decimal import Decimal
+
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Group, User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from inventory.models import Category, InventorySnapshot, Product, StockMovement, SupplierSnapshot
+from inventory.utils.cache import bump_inventory_version
+from inventory.utils.search import get_backend as search_backend
+from suppliers.models import PurchaseOrder, PurchaseOrderItem, Supplier
+
+CATEGORY_NAMES = (
+    "Beverages", "Snacks", "Dairy", "Bakery", "Produce", "Frozen", "Cleaning", "Personal care",
+    "Stationery", "Hardware", "Electrical", "Plumbing", "Garden", "Toys", "Pet supplies",
+    "Pharmacy", "Electronics", "Kitchenware", "Textiles", "Automotive",
+)
+SUPPLIER_NAMES = ("Acme", "Northwind", "Globex", "Initech", "Contoso", "Fabrikam", "Tailspin", "Litware", "Proseware", "Wingtip")
+SUPPLIER_SUFFIXES = ("Trading", "Supplies", "Wholesale", "Distribution", "Imports", "Logistics")
+ADJECTIVES = (
+    "Classic", "Premium", "Organic", "Compact", "Heavy-duty", "Mini", "Family", "Deluxe", "Eco",
+    "Travel", "Pro", "Basic", "Fresh", "Smart", "Rapid", "Soft", "Ultra", "Natural", "Golden", "Silver",
+)
+NOUNS = (
+    "coffee", "tea", "juice", "crackers", "cheese", "bread", "apples", "detergent", "shampoo",
+    "notebook", "pen", "hammer", "screws", "cable", "bulb", "faucet", "hose", "puzzle", "leash",
+    "bandage", "charger", "headphones", "pan", "knife", "towel", "blanket", "wiper", "oil",
+    "batteries", "soap",
+)
+UNITS = ("PCS", "PCS", "PCS", "BOX", "KG", "L")
+
+OUT, ADJ = 0, 1
+MOVEMENT_MIX = (0.93, 0.07)  # drawn OUT / ADJ; restocks (IN) follow from the reorder level
+OUT_REASONS = ("Sale", "Sale", "Sale", "Order fulfilment", "Internal use")
+ADJ_REASONS = ("Stock count", "Damaged", "Expired")
+WEEKDAY_FACTOR = (1.0, 1.0, 1.0, 1.05, 1.15, 0.6, 0.3)  # Monday first
+
+
+@contextmanager
+def _keep_timestamps(*models):
+    """Let bulk_create store the created_at/updated_at values we set instead of now()."""
+    fields = [
+        f for model in models for f in model._meta.concrete_fields
+        if getattr(f, "auto_now", False) or getattr(f, "auto_now_add", False)
+    ]
+    saved = [(f, f.auto_now, f.auto_now_add) for f in fields]
+    for f in fields:
+        f.auto_now = f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, auto_now, auto_now_add in saved:
+            f.auto_now, f.auto_now_add = auto_now, auto_now_add
+
+
+def _names(bases, n, suffixes=("",)):
+    """``n`` distinct names from ``bases`` × ``suffixes``, numbered once those run out."""
+    combos = [f"{b} {s}".strip() for s in suffixes for b in bases]
+    return [combos[i % len(combos)] + (f" {i // len(combos) + 1}" if i >= len(combos) else "") for i in range(n)]
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, dtime.min))
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic owners with categories, suppliers, products, a year of stock movements "
+        "and purchase orders, using bulk inserts, then rebuild the derived tables"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--owners", type=int, default=3, help="Owners (users) to create")
+        parser.add_argument("--categories", type=int, default=20, help="Categories per owner")
+        parser.add_argument("--suppliers", type=int, default=40, help="Suppliers per owner")
+        parser.add_argument("--products", type=int, default=2000, help="Products per owner")
+        parser.add_argument("--movements", type=int, default=100_000,
+                            help="Stock movements per owner, on top of one opening balance per product")
+        parser.add_argument("--orders", type=int, default=300, help="Purchase orders per owner")
+        parser.add_argument("--max-order-lines", type=int, default=8, help="Most lines on one purchase order")
+        parser.add_argument("--days", type=int, default=365, help="Days of history, ending today")
+        parser.add_argument("--prefix", default="seed", help="Usernames are <prefix>-1, <prefix>-2, ...")
+        parser.add_argument("--password", default="stocker", help="Password of every seeded owner")
+        parser.add_argument("--seed", type=int, default=1, help="Random seed; the same seed gives the same data")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows per bulk insert")
+
+    def handle(self, *args, **opts):
+        if min(opts["owners"], opts["categories"], opts["suppliers"], opts["products"], opts["days"]) < 1:
+            raise CommandError("--owners, --categories, --suppliers, --products and --days must be at least 1.")
+        usernames = [f"{opts['prefix']}-{i}" for i in range(1, opts["owners"] + 1)]
+        taken = list(User.objects.filter(username__in=usernames).values_list("username", flat=True))
+        if taken:
+            raise CommandError(f"{', '.join(sorted(taken))} already exist; pick another --prefix.")
+
+        call_command("bootstrap_roles", stdout=io.StringIO())
+        self.group = Group.objects.get(name="Admin")
+        self.password = make_password(opts["password"])  # hashed once: PBKDF2 per owner adds up
+        self.rng = np.random.default_rng(opts["seed"])
+        self.opts = opts
+        self.now = timezone.now()
+        self.first_day = timezone.localdate() - timedelta(days=opts["days"] - 1)
+
+        t0 = time.perf_counter()
+        totals = dict.fromkeys(("products", "movements", "orders", "lines"), 0)
+        for username in usernames:
+            t = time.perf_counter()
+            with transaction.atomic(), _keep_timestamps(Product, Supplier, StockMovement, PurchaseOrder):
+                owner, counts = self.seed_owner(username)
+            self.rebuild_derived(owner)
+            for k, v in counts.items():
+                totals[k] += v
+            self.stdout.write(
+                f"{username} (id {owner.pk}): {counts['products']} products • {counts['movements']} movements • "
+                f"{counts['orders']} orders in {time.perf_counter() - t:.1f}s"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(usernames)} owners • {totals['products']} products • {totals['movements']} movements • "
+            f"{totals['orders']} purchase orders ({totals['lines']} lines) • {time.perf_counter() - t0:.1f}s"
+        ))
+
+    # Generation ----------------------------------------------------------
+
+    def seed_owner(self, username):
+        rng, opts = self.rng, self.opts
+        n_products = opts["products"]
+        batch = opts["batch_size"]
+
+        owner = User.objects.create(username=username, email=f"{username}@example.com", password=self.password)
+        owner.groups.add(self.group)
+
+        categories = Category.objects.bulk_create(
+            [Category(owner=owner, name=name) for name in _names(CATEGORY_NAMES, opts["categories"])]
+        )
+        opened = _day_start(self.first_day - timedelta(days=30))
+        suppliers = Supplier.objects.bulk_create([
+            Supplier(owner=owner, name=name, email=f"orders{i}@example.com", phone=f"+1-555-{i:04d}",
+                     created_at=opened, updated_at=opened)
+            for i, name in enumerate(_names(SUPPLIER_NAMES, opts["suppliers"], SUPPLIER_SUFFIXES))
+        ])
+
+        # A few products (and suppliers) carry most of the volume.
+        popularity = 1.0 / np.arange(1, n_products + 1) ** 1.07
+        popularity = rng.permutation(popularity / popularity.sum())
+        supplier_share = 1.0 / np.arange(1, len(suppliers) + 1) ** 0.8
+        supplier_share /= supplier_share.sum()
+
+        daily_out = popularity * opts["movements"] * MOVEMENT_MIX[OUT] * 2.5 / opts["days"]
+        reorder = np.maximum(1, np.ceil(daily_out * 7)).astype(int)
+        restock = np.maximum(10, np.round(daily_out * 14 / 10) * 10).astype(int)
+        cost = np.clip(np.round(rng.lognormal(2.3, 0.8, n_products), 2), 0.5, 2000)
+        margin = rng.uniform(1.15, 1.9, n_products)
+        balance, plan = self.plan_movements(popularity, reorder, restock)
+
+        names = _names([f"{a} {n}" for n in NOUNS for a in ADJECTIVES], n_products)
+        products = Product.objects.bulk_create([
+            Product(
+                owner=owner, name=names[i], sku=f"SKU-{i + 1:06d}", category=categories[i % len(categories)],
+                unit=UNITS[i % len(UNITS)], price_cost=Decimal(f"{cost[i]:.2f}"),
+                price_sale=Decimal(f"{cost[i] * margin[i]:.2f}"), reorder_level=int(reorder[i]),
+                quantity_on_hand=balance[i],
+                expiry_date=self.first_day + timedelta(days=int(rng.integers(30, 720))) if i % 7 == 0 else None,
+                created_at=opened, updated_at=opened,
+            )
+            for i in range(n_products)
+        ], batch_size=batch)
+
+        links, by_supplier = [], [[] for _ in suppliers]
+        for i, p in enumerate(products):
+            for s in rng.choice(len(suppliers), size=int(rng.integers(1, 4)), replace=False, p=supplier_share):
+                links.append(Product.suppliers.through(product_id=p.pk, supplier_id=suppliers[s].pk))
+                by_supplier[s].append(i)
+        Product.suppliers.through.objects.bulk_create(links, batch_size=batch)
+
+        movements = [
+            StockMovement(product_id=products[i].pk, movement_type=kind, quantity=qty, reason=reason,
+                          resulting_quantity=after, created_by=owner, created_at=at)
+            for i, kind, qty, reason, after, at in plan
+        ]
+        StockMovement.objects.bulk_create(movements, batch_size=batch)
+
+        orders, lines = self.purchase_orders(owner, suppliers, products, by_supplier, supplier_share, restock)
+        return owner, {"products": len(products), "movements": len(movements), "orders": orders, "lines": lines}
+
+    def plan_movements(self, popularity, reorder, restock):
+        """Final balance per product and (product index, type, qty, reason, resulting qty, when) rows.
+
+        Daily volume follows the weekday pattern, a slow upward trend and a
+        yearly season; times cluster around early afternoon. Each product opens
+        with one restock's worth of stock; the event after it drops to its
+        reorder level (or one it can't cover) is a restock, so stock never goes
+        negative and some products end the run low.
+        """
+        rng, opts = self.rng, self.opts
+        n, days = opts["movements"], opts["days"]
+
+        t = np.arange(days)
+        weekday = np.array([WEEKDAY_FACTOR[(self.first_day + timedelta(days=int(d))).weekday()] for d in t])
+        weight = weekday * (0.8 + 0.4 * t / max(days - 1, 1)) * (1 + 0.15 * np.sin(2 * np.pi * t / 365))
+        per_day = rng.multinomial(n, weight / weight.sum())
+        day = np.repeat(t, per_day)
+        seconds = np.clip(rng.normal(13.5 * 3600, 2.5 * 3600, n), 7 * 3600, 21 * 3600).astype(int)
+        product = rng.choice(len(popularity), size=n, p=popularity)
+        kind = rng.choice(len(MOVEMENT_MIX), size=n, p=MOVEMENT_MIX)
+        out_qty = rng.geometric(0.4, n)
+        adj_qty = rng.choice((-3, -2, -1, 1, 2), size=n)
+        reason = rng.integers(0, 60, n)
+        order = np.lexsort((seconds, day, product))
+
+        starts = [_day_start(self.first_day + timedelta(days=int(d))) for d in t]
+        opened = _day_start(self.first_day - timedelta(days=1))
+        balance = restock.tolist()
+        low = [False] * len(balance)
+        plan = [(i, "IN", q, "Opening stock", q, opened) for i, q in enumerate(balance)]
+        cols = (product[order].tolist(), kind[order].tolist(), out_qty[order].tolist(),
+                adj_qty[order].tolist(), reason[order].tolist(), day[order].tolist(), seconds[order].tolist())
+        for i, k, oq, aq, r, d, s in zip(*cols):
+            at = min(starts[d] + timedelta(seconds=s), self.now)
+            have = balance[i]
+            if not low[i] and k == OUT and oq <= have:
+                balance[i] = have - oq
+                plan.append((i, "OUT", oq, OUT_REASONS[r % len(OUT_REASONS)], balance[i], at))
+            elif not low[i] and k == ADJ and have + aq >= 0:
+                balance[i] = have + aq
+                plan.append((i, "ADJ", aq, ADJ_REASONS[r % len(ADJ_REASONS)], balance[i], at))
+            else:
+                balance[i] = have + int(restock[i])
+                plan.append((i, "IN", int(restock[i]), "Restock", balance[i], at))
+            low[i] = balance[i] <= reorder[i]
+        return balance, plan
+
+    def purchase_orders(self, owner, suppliers, products, by_supplier, supplier_share, restock):
+        rng, opts = self.rng, self.opts
+        stocked = np.array([bool(ps) for ps in by_supplier])
+        if not stocked.any() or opts["orders"] < 1:
+            return 0, 0
+        share = np.where(stocked, supplier_share, 0)
+        share /= share.sum()
+
+        orders, order_lines = [], []
+        for _ in range(opts["orders"]):
+            s = int(rng.choice(len(suppliers), p=share))
+            age = int(rng.integers(0, opts["days"]))
+            created = min(_day_start(timezone.localdate() - timedelta(days=age))
+                          + timedelta(seconds=int(rng.integers(8 * 3600, 18 * 3600))), self.now)
+            lead = timedelta(days=max(1.0, float(rng.gamma(4, 2))))
+            if age > 21:
+                status = rng.choice(("RECEIVED", "PARTIAL", "CANCELLED"), p=(0.85, 0.1, 0.05))
+            else:
+                status = rng.choice(("DRAFT", "SUBMITTED", "PARTIAL", "RECEIVED"), p=(0.15, 0.4, 0.15, 0.3))
+            received = created + lead if status == "RECEIVED" and created + lead < self.now else None
+            if status == "RECEIVED" and received is None:
+                status = "SUBMITTED"
+            order_date = timezone.localdate(created)
+            orders.append(PurchaseOrder(
+                owner=owner, supplier=suppliers[s], status=status, order_date=order_date,
+                expected_date=order_date + timedelta(days=int(rng.integers(7, 15))),
+                received_at=received, invoice_number=f"INV-{owner.pk}-{len(orders) + 1:05d}" if received else "",
+                invoice_date=timezone.localdate(received) if received else None,
+                created_at=created, updated_at=received or created,
+            ))
+            # Lines are added in the app, which submits the order, so drafts are empty.
+            count = 0 if status == "DRAFT" else min(len(by_supplier[s]), int(rng.integers(1, opts["max_order_lines"] + 1)))
+            order_lines.append((status, rng.choice(by_supplier[s], size=count, replace=False).tolist()))
+        orders = PurchaseOrder.objects.bulk_create(orders, batch_size=opts["batch_size"])
+
+        items = []
+        for po, (status, picked) in zip(orders, order_lines):
+            for n, i in enumerate(picked):
+                qty = int(restock[i])
+                if status == "RECEIVED" or (status == "PARTIAL" and n % 2):
+                    got = qty
+                elif status == "PARTIAL":
+                    got = qty // 2  # the first line (at least) is still open
+                else:
+                    got = 0
+                items.append(PurchaseOrderItem(po=po, product=products[i], quantity_ordered=qty,
+                                               quantity_received=got, unit_cost=products[i].price_cost))
+        PurchaseOrderItem.objects.bulk_create(items, batch_size=opts["batch_size"])
+        return len(orders), len(items)
+
+    # Derived tables ------------------------------------------------------
+
+    @staticmethod
+    def rebuild_derived(owner):
+        """bulk_create skips the signals that keep these in step."""
+        InventorySnapshot.rebuild(owner.pk)
+        SupplierSnapshot.rebuild(owner_id=owner.pk)
+        call_command("rebuild_movement_rollup", owner=owner.pk, stdout=io.StringIO())
+        search_backend().rebuild(owner_id=owner.pk)
+        bump_inventory_version(owner.pk)
@@ -1,11 +1,32 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby, islice
+
+import django
+from django.core.mail import get_connection
 from django.core.management.base import BaseCommand
 from django.conf import settings
-from django.utils import timezone
 from datetime import timedelta, date
-from django.db.models import F, Q
+from django.db.models import F, Q, Case, When, BooleanField, Value
 
 from inventory.models import Product
-from inventory.utils.notifications import send_low_stock_digest, send_expiry_digest
+from inventory.utils.notifications import (
+    send_low_stock_digest, send_expiry_digest, render_low_stock_digest, render_expiry_digest, make_message,
+)
+
+DIGEST_FIELDS = ("owner_id", "owner__email", "name", "sku", "quantity_on_hand", "reorder_level", "expiry_date", "is_low")
+RENDER_CHUNK = 64  # owners per task handed to a pool worker
+
+
+def render_owner_digests(job):
+    """Render one owner's digests. Runs in pool workers, so it gets plain rows, not models."""
+    to_email, low, expiring, days = job
+    out = []
+    if low:
+        out.append((*render_low_stock_digest(low), to_email))
+    if expiring:
+        out.append((*render_expiry_digest(expiring, days), to_email))
+    return out
+
 
 class Command(BaseCommand):
     help = "Send daily low-stock and expiry alerts"
@@ -17,19 +38,28 @@ class Command(BaseCommand):
                             help="Recipient email (defaults to settings.MANAGER_EMAIL)")
         parser.add_argument("--only", choices=["low", "expiry", "all"], default="all",
                             help="Send only low, only expiry, or all")
+        parser.add_argument("--per-owner", action="store_true",
+                            help="Send each owner a digest of their own products (to the owner's email; --to is ignored)")
+        parser.add_argument("--workers", type=int, default=1,
+                            help="Processes used to render per-owner digests")
+        parser.add_argument("--batch-size", type=int, default=500,
+                            help="Messages handed to the mail connection per send_messages() call")
 
     def handle(self, *args, **opts):
+        if opts["per_owner"]:
+            return self.handle_per_owner(opts)
+
         days = opts["days"]
         to_email = opts["to"]
         only = opts["only"]
 
-        # Low stock (global across users). If you want per-user emails, scope by owner.
+        # Low stock (global across users). If you want per-user emails, use --per-owner.
         low_qs = Product.objects.filter(quantity_on_hand__lte=F("reorder_level")).order_by("name")
 
         # Expiry (within N days, not null, and not already expired beyond window)
         today = date.today()
         end = today + timedelta(days=days)
-        # Expiry (global across users). If you want per-user emails, scope by owner.
+        # Expiry (global across users). If you want per-user emails, use --per-owner.
         exp_qs = Product.objects.filter(expiry_date__isnull=False, expiry_date__lte=end).order_by("expiry_date", "name")
 
         sent_low = sent_exp = 0
@@ -41,3 +71,69 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS(
             f"Alerts sent • low: {sent_low} items, expiry: {sent_exp} items → {to_email}"
         ))
+
+    def handle_per_owner(self, opts):
+        days, only = opts["days"], opts["only"]
+        end = date.today() + timedelta(days=days)
+        want_low = only in ("all", "low")
+        want_exp = only in ("all", "expiry")
+
+        cond = Q()
+        if want_low:
+            cond |= Q(quantity_on_hand__lte=F("reorder_level"))
+        if want_exp:
+            cond |= Q(expiry_date__isnull=False, expiry_date__lte=end)
+        # One pass over every tenant's candidate rows, grouped by owner.
+        rows = (
+            Product.objects.filter(cond, owner__isnull=False).exclude(owner__email="")
+            .annotate(is_low=Case(When(quantity_on_hand__lte=F("reorder_level"), then=Value(True)),
+                                  default=Value(False), output_field=BooleanField()))
+            .order_by("owner_id", "name")
+            .values(*DIGEST_FIELDS)
+            .iterator(chunk_size=5000)
+        )
+
+        def jobs():
+            for _, group in groupby(rows, key=lambda r: r["owner_id"]):
+                group = list(group)
+                low = [r for r in group if r["is_low"]] if want_low else []
+                expiring = []
+                if want_exp:
+                    expiring = sorted(
+                        (r for r in group if r["expiry_date"] and r["expiry_date"] <= end),
+                        key=lambda r: (r["expiry_date"], r["name"]),
+                    )
+                if low or expiring:
+                    stats["owners"] += 1
+                    stats["low"] += len(low)
+                    stats["expiry"] += len(expiring)
+                    yield group[0]["owner__email"], low, expiring, days
+
+        def rounds():
+            """Rendered digests, a bounded round of owners at a time.
+
+            ``pool.map`` would submit every owner up front and keep all the results
+            until the end; a round is submitted only after the previous one was sent.
+            """
+            pending = jobs()
+            per_round = max(opts["workers"], 1) * RENDER_CHUNK * 4
+            if opts["workers"] <= 1:
+                while batch := list(islice(pending, per_round)):
+                    yield [render_owner_digests(job) for job in batch]
+                return
+            with ProcessPoolExecutor(max_workers=opts["workers"], initializer=django.setup) as pool:
+                while batch := list(islice(pending, per_round)):
+                    yield list(pool.map(render_owner_digests, batch, chunksize=RENDER_CHUNK))
+
+        stats = {"owners": 0, "low": 0, "expiry": 0, "messages": 0}
+        batch_size = opts["batch_size"]
+        with get_connection() as connection:
+            for rendered in rounds():
+                messages = [make_message(*d, connection=connection) for digests in rendered for d in digests]
+                for i in range(0, len(messages), batch_size):
+                    stats["messages"] += connection.send_messages(messages[i:i + batch_size]) or 0
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Alerts sent • {stats['messages']} messages to {stats['owners']} owners "
+            f"(low: {stats['low']} items, expiry: {stats['expiry']} items)"
+        ))
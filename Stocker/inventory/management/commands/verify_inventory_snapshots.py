@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F, Sum, Count, Case, When, IntegerField, DecimalField, ExpressionWrapper
+
+from inventory.models import Product, InventorySnapshot
+
+FIELDS = ("total_products", "total_on_hand", "total_value", "low_stock")
+
+
+class Command(BaseCommand):
+    help = "Recompute inventory snapshots from the product table and report drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true", help="Overwrite drifted snapshots with the recomputed totals")
+
+    def handle(self, *args, **opts):
+        value_expr = ExpressionWrapper(
+            F("quantity_on_hand") * F("price_cost"),
+            output_field=DecimalField(max_digits=16, decimal_places=2),
+        )
+        # One grouped pass over all products instead of one aggregate per owner.
+        actual = {
+            r["owner_id"]: r for r in (
+                Product.objects.filter(owner__isnull=False)
+                .values("owner_id")
+                .annotate(
+                    total_products=Count("id"),
+                    total_on_hand=Sum("quantity_on_hand"),
+                    total_value=Sum(value_expr),
+                    low_stock=Count(Case(When(quantity_on_hand__lte=F("reorder_level"), then=1), output_field=IntegerField())),
+                )
+                .order_by()
+            )
+        }
+
+        checked = drifted = 0
+        for snap in InventorySnapshot.objects.all().iterator():
+            checked += 1
+            row = actual.get(snap.owner_id, {})
+            expected = {f: row.get(f) or 0 for f in FIELDS}
+            diffs = {f: (getattr(snap, f), expected[f]) for f in FIELDS if getattr(snap, f) != expected[f]}
+            if not diffs:
+                continue
+            drifted += 1
+            detail = ", ".join(f"{f}: {have} != {want}" for f, (have, want) in diffs.items())
+            self.stdout.write(self.style.WARNING(f"owner {snap.owner_id}: {detail}"))
+            if opts["fix"]:
+                for f, value in expected.items():
+                    setattr(snap, f, value)
+                snap.save()
+
+        msg = f"Snapshots checked: {checked} • drifted: {drifted}"
+        if drifted and opts["fix"]:
+            msg += " (fixed)"
+        self.stdout.write(self.style.SUCCESS(msg) if not drifted or opts["fix"] else self.style.ERROR(msg))
@@ -0,0 +1,65 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+from .utils import metrics, querylog
+
+
+class RequestMetricsMiddleware:
+    """Time each request's SQL, templates and owner-cache lookups (see ``inventory.utils.metrics``).
+
+    Adds a ``Server-Timing`` header (``SERVER_TIMING``), records the
+    request under its URL name for the metrics view and queues its slow and
+    repeated queries for the query log (``inventory.utils.querylog``). Put it first in
+    MIDDLEWARE so "total" covers the rest of the stack. Streaming bodies are
+    produced after the response leaves, so their queries aren't counted.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        collected, token = metrics.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.stop(token)
+        flush, found = self.finish(request, response, collected)
+        if found:
+            querylog.submit(found, self.view_name(request), request.path)
+        if flush:
+            metrics.flush()
+        return response
+
+    async def __acall__(self, request):
+        collected, token = metrics.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.stop(token)
+        flush, found = self.finish(request, response, collected)
+        if found:
+            querylog.submit(found, self.view_name(request), request.path)
+        if flush:
+            await sync_to_async(metrics.flush)()  # writes to the shared cache
+        return response
+
+    @staticmethod
+    def view_name(request):
+        match = getattr(request, "resolver_match", None)
+        return match.view_name if match else metrics.UNRESOLVED
+
+    def finish(self, request, response, collected):
+        """Stamp and record the request; (flush its histograms?, query-log findings)."""
+        collected.total = time.perf_counter() - collected.started
+        if settings.SERVER_TIMING:
+            response.headers["Server-Timing"] = collected.server_timing()
+        return metrics.record(self.view_name(request), collected), querylog.findings(collected)
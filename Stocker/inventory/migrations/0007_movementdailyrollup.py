@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:04
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_category_owner_product_owner_alter_category_name_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovementDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('in_qty', models.IntegerField(default=0)),
+                ('out_qty', models.IntegerField(default=0)),
+                ('adj_qty', models.IntegerField(default=0)),
+                ('owner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='inventory.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['owner', 'day'], name='rollup_owner_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'day'), name='rollup_product_day_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+from django.db import migrations
+
+# The tables and their contents as of this migration; inventory.utils.search keeps
+# them current from here on, and may change without this migration changing with it.
+TABLES = {
+    "search_product": "name, sku, extra",
+    "search_supplier": "name, contact",
+    "search_category": "name, description",
+}
+
+POPULATE = [
+    "INSERT INTO search_product (rowid, owner, name, sku, extra) "
+    "SELECT p.id, 'o' || p.owner_id, p.name, p.sku, "
+    "COALESCE(c.name, '') || ' ' || COALESCE((SELECT group_concat(s.name, ' ') "
+    "FROM inventory_product_suppliers ps JOIN suppliers_supplier s ON s.id = ps.supplier_id "
+    "WHERE ps.product_id = p.id), '') "
+    "FROM inventory_product p LEFT JOIN inventory_category c ON c.id = p.category_id",
+    "INSERT INTO search_supplier (rowid, owner, name, contact) "
+    "SELECT s.id, 'o' || s.owner_id, s.name, s.email || ' ' || s.phone || ' ' || s.website "
+    "FROM suppliers_supplier s",
+    "INSERT INTO search_category (rowid, owner, name, description) "
+    "SELECT c.id, 'o' || c.owner_id, c.name, c.description FROM inventory_category c",
+]
+
+
+def forwards(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for table, columns in TABLES.items():
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+            f"owner, {columns}, prefix='2 3', tokenize='unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(f"DELETE FROM {table}")
+    for sql in POPULATE:
+        schema_editor.execute(sql)
+
+
+def backwards(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for table in TABLES:
+        schema_editor.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('inventory', '0009_alertoutbox'),
+        ('suppliers', '0005_purchaseorder_purchaseorderitem'),
+    ]
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:17
+
+from django.db import migrations, models
+
+
+def mark_existing_cuts(apps, schema_editor):
+    # Until now only archive_movements wrote checkpoints.
+    apps.get_model("inventory", "MovementCheckpoint").objects.update(is_cut=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0012_archivedmovement_movementcheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movementcheckpoint',
+            name='is_cut',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_existing_cuts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate(apps, schema_editor):
+    Supplier = apps.get_model('suppliers', 'Supplier')
+    SupplierSnapshot = apps.get_model('inventory', 'SupplierSnapshot')
+    value = models.ExpressionWrapper(
+        models.F('products__quantity_on_hand') * models.F('products__price_cost'),
+        output_field=models.DecimalField(max_digits=16, decimal_places=2),
+    )
+    rows = Supplier.objects.annotate(
+        n=models.Count('products'), qoh=models.Sum('products__quantity_on_hand'), value=models.Sum(value),
+    ).values_list('pk', 'n', 'qoh', 'value').order_by()
+    SupplierSnapshot.objects.bulk_create([
+        SupplierSnapshot(supplier_id=pk, product_count=n, total_on_hand=qoh or 0, total_value=value or 0)
+        for pk, n, qoh, value in rows.iterator()
+    ], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0014_reordersuggestion'),
+        ('suppliers', '0007_purchaseorder_received_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SupplierSnapshot',
+            fields=[
+                ('supplier', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='snapshot', serialize=False, to='suppliers.supplier')),
+                ('product_count', models.IntegerField(default=0)),
+                ('total_on_hand', models.BigIntegerField(default=0)),
+                ('total_value', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(populate, migrations.RunPython.noop),
+    ]
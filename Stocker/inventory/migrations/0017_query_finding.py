@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0016_cache_table'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QueryFinding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('slow', 'Slow'), ('repeated', 'Repeated')], max_length=8)),
+                ('view_name', models.CharField(max_length=100)),
+                ('path', models.CharField(max_length=500)),
+                ('fingerprint', models.CharField(max_length=16)),
+                ('sql', models.TextField()),
+                ('example', models.TextField()),
+                ('params', models.TextField(blank=True)),
+                ('count', models.PositiveIntegerField(default=1)),
+                ('duration_ms', models.FloatField()),
+                ('plan', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['fingerprint'], name='finding_fingerprint_idx'), models.Index(fields=['view_name'], name='finding_view_idx')],
+            },
+        ),
+    ]
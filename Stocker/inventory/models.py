@@ -1,6 +1,12 @@
+from decimal import Decimal
+
 from django.db import models, transaction
+from django.db.models.functions import Coalesce
+from django.dispatch import Signal
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 from suppliers.models import Supplier 
+from .utils.cache import bump_inventory_version
 
 User = get_user_model()
 
@@ -42,6 +48,9 @@ class Product(models.Model):
         constraints = [
             models.UniqueConstraint(fields=["owner", "sku"], name="product_owner_sku_unique"),
         ]
+        indexes = [
+            models.Index(fields=["owner", "name"], name="product_owner_name_idx"),
+        ]
         permissions = [
         ]
 
@@ -52,12 +61,52 @@ class Product(models.Model):
     def is_low_stock(self):
         return self.quantity_on_hand <= self.reorder_level
 
+    SNAPSHOT_FIELDS = ("owner_id", "quantity_on_hand", "price_cost", "reorder_level")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what this row contributed to the owner's InventorySnapshot
+        # so saves and deletes can apply a delta instead of a full recount.
+        if all(f in field_names for f in cls.SNAPSHOT_FIELDS):
+            instance._snapshot_loaded = instance.snapshot_contribution()
+        return instance
+
+    def snapshot_contribution(self):
+        """(owner_id, on_hand, cost value, low-stock flag) of this product."""
+        qoh = self.quantity_on_hand or 0
+        return (
+            self.owner_id,
+            qoh,
+            qoh * Decimal(str(self.price_cost or 0)),
+            1 if qoh <= (self.reorder_level or 0) else 0,
+        )
+
 MOVEMENT_TYPES = [
     ("IN", "Stock In"),
     ("OUT", "Stock Out"),
     ("ADJ", "Adjustment"),
 ]
 
+# Sent by StockMovement.apply_many after its bulk_create, since bulk inserts
+# do not fire post_save. ``movements`` carry the locked, updated products.
+movements_bulk_created = Signal()
+
+
+def _next_quantity(current, movement_type, qty):
+    if movement_type == "IN":
+        return current + abs(qty)
+    if movement_type == "OUT":
+        return current - abs(qty)
+    return current + qty  # ADJ
+
+
+def _strict_int(value):
+    """``int(value)``, except that bools and fractional floats are refused rather than truncated."""
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(f"not an integer: {value!r}")
+    return int(value)
+
 class StockMovement(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="movements")
     movement_type = models.CharField(max_length=3, choices=MOVEMENT_TYPES)
@@ -69,6 +118,9 @@ class StockMovement(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["product", "created_at"], name="movement_product_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.movement_type} {self.quantity} on {self.product}"
@@ -78,12 +130,7 @@ class StockMovement(models.Model):
     def apply(product_id, movement_type, qty, reason, user):
         
         prod = Product.objects.select_for_update().get(pk=product_id)
-        if movement_type == "IN":
-            new_q = prod.quantity_on_hand + abs(qty)
-        elif movement_type == "OUT":
-            new_q = prod.quantity_on_hand - abs(qty)
-        else:  # ADJ
-            new_q = prod.quantity_on_hand + qty 
+        new_q = _next_quantity(prod.quantity_on_hand, movement_type, qty)
 
         prod.quantity_on_hand = new_q
         prod.save(update_fields=["quantity_on_hand", "updated_at"])
@@ -96,4 +143,645 @@ class StockMovement(models.Model):
             resulting_quantity=new_q,
             created_by=user if user and user.is_authenticated else None,
         )
+        MovementDailyRollup.add_movements([mv])
+        bump_inventory_version(prod.owner_id)
         return mv
+
+    @staticmethod
+    @transaction.atomic
+    def apply_many(lines, user, owner=None):
+        """Apply a batch of movements in one transaction.
+
+        ``lines`` is a sequence of dicts with ``product_id``, ``movement_type``,
+        ``quantity`` and an optional ``reason``. Products are locked once, in
+        primary-key order, and written back with a single bulk update; the
+        movements go in with a single bulk_create. Lines for the same product
+        are applied in input order. Returns one result dict per line.
+        """
+        valid_types = {code for code, _ in MOVEMENT_TYPES}
+        results = []
+        pending = []
+        for i, line in enumerate(lines):
+            movement_type = line.get("movement_type")
+            if line.get("product_id") is None:
+                results.append({"line": i, "ok": False, "error": "unknown product"})
+                continue
+            try:
+                product_id = _strict_int(line.get("product_id"))
+                qty = _strict_int(line.get("quantity"))
+            except (TypeError, ValueError):
+                results.append({"line": i, "ok": False, "error": "product_id and quantity must be integers"})
+                continue
+            if movement_type not in valid_types:
+                results.append({"line": i, "ok": False, "error": f"unknown movement_type {movement_type!r}"})
+                continue
+            if qty == 0 or (movement_type != "ADJ" and qty < 0):
+                results.append({"line": i, "ok": False, "error": "quantity must be a positive integer"})
+                continue
+            reason = str(line.get("reason") or "")[:200]
+            results.append({"line": i, "ok": True, "product_id": product_id})
+            pending.append((results[-1], product_id, movement_type, qty, reason))
+
+        product_ids = sorted({product_id for _, product_id, _, _, _ in pending})
+        locked = Product.objects.select_for_update().filter(pk__in=product_ids).order_by("pk")
+        if owner is not None:
+            locked = locked.filter(owner=owner)
+        products = {p.pk: p for p in locked}
+
+        created_by = user if user and user.is_authenticated else None
+        movements = []
+        for result, product_id, movement_type, qty, reason in pending:
+            prod = products.get(product_id)
+            if prod is None:
+                result.update(ok=False, error="unknown product")
+                continue
+            prod.quantity_on_hand = _next_quantity(prod.quantity_on_hand, movement_type, qty)
+            result["resulting_quantity"] = prod.quantity_on_hand
+            movements.append(StockMovement(
+                product=prod,
+                movement_type=movement_type,
+                quantity=qty,
+                reason=reason,
+                resulting_quantity=prod.quantity_on_hand,
+                created_by=created_by,
+            ))
+
+        if not movements:
+            return results
+
+        touched = list({mv.product_id: mv.product for mv in movements}.values())
+        now = timezone.now()
+        for prod in touched:
+            prod.updated_at = now
+        Product.objects.bulk_update(touched, ["quantity_on_hand", "updated_at"])
+        StockMovement.objects.bulk_create(movements)
+        InventorySnapshot.apply_product_changes(touched)
+        MovementDailyRollup.add_movements(movements)
+        for owner_id in {prod.owner_id for prod in touched}:
+            bump_inventory_version(owner_id)
+
+        ok_results = (r for r in results if r["ok"])
+        for result, mv in zip(ok_results, movements):
+            result["movement_id"] = mv.pk
+        movements_bulk_created.send(sender=StockMovement, movements=movements)
+        return results
+
+
+class ArchivedMovement(models.Model):
+    """A StockMovement moved out of the live ledger by ``archive_movements``.
+
+    Keeps the original primary key, so live and archived rows can be merged
+    and ordered on (created_at, id) without collisions. Read both through
+    ``inventory.utils.ledger`` rather than querying this table directly.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="archived_movements")
+    movement_type = models.CharField(max_length=3, choices=MOVEMENT_TYPES)
+    quantity = models.IntegerField()
+    reason = models.CharField(max_length=200, blank=True)
+    resulting_quantity = models.IntegerField(default=0)
+    created_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    created_at = models.DateTimeField()
+
+    FIELDS = ("id", "product_id", "movement_type", "quantity", "reason", "resulting_quantity", "created_by_id", "created_at")
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["product", "created_at"], name="archived_product_created_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.movement_type} {self.quantity} on {self.product} (archived)"
+
+    @staticmethod
+    def archive_before(cutoff, owner_id=None, batch_size=2000):
+        """Move live movements created before ``cutoff`` into the archive.
+
+        Writes one MovementCheckpoint per affected product at ``cutoff`` first,
+        then moves rows in batches of ``batch_size``, one transaction each.
+        Returns ``(checkpoints, moved)``.
+        """
+        live = StockMovement.objects.filter(created_at__lt=cutoff)
+        if owner_id is not None:
+            live = live.filter(product__owner_id=owner_id)
+
+        with transaction.atomic():
+            checkpoints = MovementCheckpoint.write(cutoff, live)
+
+        moved = 0
+        while True:
+            with transaction.atomic():
+                # Oldest first, so a run that stops halfway still leaves the archive
+                # strictly older than whatever remains live.
+                rows = list(live.order_by("created_at", "id").values(*ArchivedMovement.FIELDS)[:batch_size])
+                if not rows:
+                    break
+                ArchivedMovement.objects.bulk_create(
+                    [ArchivedMovement(**r) for r in rows], ignore_conflicts=True,
+                )
+                StockMovement.objects.filter(pk__in=[r["id"] for r in rows]).delete()
+            moved += len(rows)
+        return checkpoints, moved
+
+
+class MovementCheckpoint(models.Model):
+    """Quantity on hand of a product just before ``as_of``.
+
+    Equal to the ``resulting_quantity`` of the product's last movement before
+    ``as_of``, so the archived part of the ledger never needs replaying to
+    know the opening balance of the live part. ``archive_movements`` writes
+    one at each cut; ``checkpoint_stock`` writes periodic ones so as-of
+    queries (``ledger.stock_as_of``) stay one indexed lookup per product.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="checkpoints")
+    as_of = models.DateTimeField()
+    quantity = models.IntegerField()
+    # True when written by archive_movements: everything before as_of may be archived.
+    is_cut = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["product", "as_of"], name="checkpoint_product_as_of_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} = {self.quantity} @ {self.as_of}"
+
+    @staticmethod
+    def write(as_of, movements):
+        """Cut checkpoint for every product that has a row in ``movements`` (all before ``as_of``)."""
+        last = (
+            movements.filter(product_id=models.OuterRef("pk"))
+            .order_by("-created_at", "-id")
+            .values("resulting_quantity")[:1]
+        )
+        balances = (
+            Product.objects.filter(pk__in=movements.values("product_id"))
+            .annotate(balance=models.Subquery(last))
+            .values_list("pk", "balance")
+            .order_by()
+        )
+        return MovementCheckpoint.store(as_of, balances, is_cut=True)
+
+    @staticmethod
+    def store(as_of, balances, is_cut=False):
+        """Upsert ``(product_id, quantity)`` pairs as checkpoints at ``as_of``."""
+        rows = [MovementCheckpoint(product_id=pid, as_of=as_of, quantity=qty, is_cut=is_cut) for pid, qty in balances]
+        MovementCheckpoint.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=["product", "as_of"],
+            update_fields=["quantity", "is_cut"] if is_cut else ["quantity"],
+        )
+        return len(rows)
+
+
+class MovementDailyRollup(models.Model):
+    """Per-product daily IN/OUT/ADJ totals, kept in step with StockMovement.
+
+    Written in the same transaction as the movements (see ``add_movements``)
+    so charts and reports can read a handful of rows per day instead of
+    aggregating the raw ledger. Rebuild with ``manage.py rebuild_movement_rollup``.
+    """
+    owner = models.ForeignKey(User, null=True, blank=True, on_delete=models.CASCADE, related_name="+")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="daily_rollups")
+    day = models.DateField()
+    in_qty = models.IntegerField(default=0)
+    out_qty = models.IntegerField(default=0)
+    adj_qty = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["product", "day"], name="rollup_product_day_unique"),
+        ]
+        indexes = [
+            models.Index(fields=["owner", "day"], name="rollup_owner_day_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} @ {self.day}"
+
+    FIELD_BY_TYPE = {"IN": "in_qty", "OUT": "out_qty", "ADJ": "adj_qty"}
+
+    @staticmethod
+    def add_movements(movements):
+        """Fold freshly created movements into their (product, day) rows.
+
+        Callers hold the product row locks, so read-modify-write is safe here.
+        """
+        deltas = {}
+        for mv in movements:
+            key = (mv.product_id, timezone.localdate(mv.created_at))
+            row = deltas.setdefault(key, {"owner_id": mv.product.owner_id, "in_qty": 0, "out_qty": 0, "adj_qty": 0})
+            row[MovementDailyRollup.FIELD_BY_TYPE[mv.movement_type]] += mv.quantity
+        if not deltas:
+            return
+
+        existing = MovementDailyRollup.objects.filter(
+            product_id__in={pid for pid, _ in deltas},
+            day__in={day for _, day in deltas},
+        )
+        to_update = []
+        for r in existing:
+            d = deltas.pop((r.product_id, r.day), None)
+            if d is None:
+                continue
+            r.in_qty += d["in_qty"]
+            r.out_qty += d["out_qty"]
+            r.adj_qty += d["adj_qty"]
+            to_update.append(r)
+        if to_update:
+            MovementDailyRollup.objects.bulk_update(to_update, ["in_qty", "out_qty", "adj_qty"])
+        if deltas:
+            MovementDailyRollup.objects.bulk_create([
+                MovementDailyRollup(product_id=pid, day=day, **d) for (pid, day), d in deltas.items()
+            ])
+
+    @staticmethod
+    def daily_series(owner, start, end):
+        """Per-day totals for an owner between two dates (inclusive)."""
+        return (
+            MovementDailyRollup.objects.filter(owner=owner, day__gte=start, day__lte=end)
+            .values("day")
+            .annotate(in_qty=models.Sum("in_qty"), out_qty=models.Sum("out_qty"), adj_qty=models.Sum("adj_qty"))
+            .order_by("day")
+        )
+
+
+class InventoryVersion(models.Model):
+    """The owner's inventory version, which keys everything ``inventory.utils.cache`` stores for them.
+
+    A row rather than a cache counter so a bump is one atomic
+    ``UPDATE ... SET version = version + 1`` inside the writing transaction.
+    ``owner_id`` is a plain integer, not a foreign key, so cache benchmarks
+    can use an owner that doesn't exist.
+    """
+    owner_id = models.BigIntegerField(primary_key=True)
+    version = models.BigIntegerField()
+
+    def __str__(self):
+        return f"Inventory version {self.version} for {self.owner_id}"
+
+
+class InventorySnapshot(models.Model):
+    """Denormalized headline totals for one owner.
+
+    Adjusted by deltas whenever a product's contribution changes (see
+    ``apply_product_changes`` and the Product signals), so the dashboard and
+    report cards are a primary-key read. ``manage.py verify_inventory_snapshots``
+    recomputes from scratch and reports drift.
+    """
+    owner = models.OneToOneField(User, primary_key=True, on_delete=models.CASCADE, related_name="inventory_snapshot")
+    total_products = models.IntegerField(default=0)
+    total_on_hand = models.BigIntegerField(default=0)
+    total_value = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    low_stock = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Snapshot for {self.owner_id}"
+
+    def as_dict(self):
+        return {
+            "total_products": self.total_products,
+            "total_on_hand": self.total_on_hand,
+            "total_value": self.total_value,
+            "low_stock": self.low_stock,
+        }
+
+    @staticmethod
+    def compute(owner_id):
+        """Totals for ``owner_id`` straight from the product table."""
+        value_expr = models.ExpressionWrapper(
+            models.F("quantity_on_hand") * models.F("price_cost"),
+            output_field=models.DecimalField(max_digits=16, decimal_places=2),
+        )
+        agg = Product.objects.filter(owner_id=owner_id).aggregate(
+            total_products=models.Count("id"),
+            total_on_hand=models.Sum("quantity_on_hand"),
+            total_value=models.Sum(value_expr),
+            low_stock=models.Count(models.Case(
+                models.When(quantity_on_hand__lte=models.F("reorder_level"), then=1),
+                output_field=models.IntegerField(),
+            )),
+        )
+        return {k: v or 0 for k, v in agg.items()}
+
+    @staticmethod
+    def rebuild(owner_id):
+        snap, _ = InventorySnapshot.objects.update_or_create(
+            owner_id=owner_id, defaults=InventorySnapshot.compute(owner_id),
+        )
+        return snap
+
+    @staticmethod
+    def for_owner(owner):
+        snap = InventorySnapshot.objects.filter(owner=owner).first()
+        return snap or InventorySnapshot.rebuild(owner.pk)
+
+    @staticmethod
+    def add(owner_id, products=0, on_hand=0, value=0, low=0):
+        if owner_id is None or not (products or on_hand or value or low):
+            return
+        # No row yet means the snapshot has not been materialized; for_owner()
+        # builds it from the product table on first read.
+        InventorySnapshot.objects.filter(owner_id=owner_id).update(
+            total_products=models.F("total_products") + products,
+            total_on_hand=models.F("total_on_hand") + on_hand,
+            total_value=models.F("total_value") + value,
+            low_stock=models.F("low_stock") + low,
+            updated_at=timezone.now(),
+        )
+
+    @staticmethod
+    def apply_product_changes(products, deleted=False):
+        """Apply the delta between each product's loaded and current state."""
+        deltas = {}
+        by_product = {}
+        for p in products:
+            old = getattr(p, "_snapshot_loaded", None)
+            new = None if deleted else p.snapshot_contribution()
+            for sign, state in ((-1, old), (1, new)):
+                if state is None:
+                    continue
+                owner_id, qoh, value, low = state
+                d = deltas.setdefault(owner_id, [0, 0, Decimal(0), 0])
+                d[0] += sign
+                d[1] += sign * qoh
+                d[2] += sign * value
+                d[3] += sign * low
+            if old is not None and new is not None:
+                by_product[p.pk] = (new[1] - old[1], new[2] - old[2])
+            p._snapshot_loaded = new
+        for owner_id, (n, qoh, value, low) in deltas.items():
+            InventorySnapshot.add(owner_id, products=n, on_hand=qoh, value=value, low=low)
+        # New products have no supplier links yet; deleted ones are handled
+        # by the product delete signals, which still know the links.
+        SupplierSnapshot.apply_product_deltas(by_product)
+
+
+class SupplierSnapshot(models.Model):
+    """Denormalized product count, stock on hand and cost value for one supplier.
+
+    Same idea as InventorySnapshot: stock and cost changes arrive as per-product
+    deltas (``apply_product_deltas``, fed by ``InventorySnapshot.apply_product_changes``)
+    and link changes as (product, supplier) pairs (``add_links``, from the
+    m2m/delete signals), so supplier lists and reports never join through
+    ``Product.suppliers``. ``manage.py rebuild_supplier_snapshots`` recomputes
+    from scratch.
+    """
+    supplier = models.OneToOneField(Supplier, primary_key=True, on_delete=models.CASCADE, related_name="snapshot")
+    product_count = models.IntegerField(default=0)
+    total_on_hand = models.BigIntegerField(default=0)
+    total_value = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Snapshot for supplier {self.supplier_id}"
+
+    @staticmethod
+    def with_totals(qs):
+        """Annotate a Supplier queryset with product_count, on_hand and value."""
+        return qs.annotate(
+            product_count=Coalesce(models.F("snapshot__product_count"), models.Value(0)),
+            on_hand=Coalesce(models.F("snapshot__total_on_hand"), models.Value(0)),
+            value=Coalesce(
+                models.F("snapshot__total_value"), models.Value(Decimal(0)),
+                output_field=models.DecimalField(max_digits=16, decimal_places=2),
+            ),
+        )
+
+    @staticmethod
+    def compute(owner_id=None, supplier_ids=None):
+        """supplier id -> (products, on hand, value) straight from the link table."""
+        value_expr = models.ExpressionWrapper(
+            models.F("products__quantity_on_hand") * models.F("products__price_cost"),
+            output_field=models.DecimalField(max_digits=16, decimal_places=2),
+        )
+        qs = Supplier.objects.all()
+        if owner_id is not None:
+            qs = qs.filter(owner_id=owner_id)
+        if supplier_ids is not None:
+            qs = qs.filter(pk__in=supplier_ids)
+        rows = qs.annotate(
+            n=models.Count("products"),
+            qoh=models.Sum("products__quantity_on_hand"),
+            value=models.Sum(value_expr),
+        ).values_list("pk", "n", "qoh", "value").order_by()
+        return {pk: (n, qoh or 0, value or 0) for pk, n, qoh, value in rows}
+
+    @staticmethod
+    @transaction.atomic
+    def rebuild(owner_id=None, supplier_ids=None):
+        """Recompute every (or one owner's, or the given) supplier rows; returns the new totals."""
+        totals = SupplierSnapshot.compute(owner_id, supplier_ids)
+        now = timezone.now()
+        SupplierSnapshot.objects.bulk_create(
+            [
+                SupplierSnapshot(supplier_id=pk, product_count=n, total_on_hand=qoh, total_value=value, updated_at=now)
+                for pk, (n, qoh, value) in totals.items()
+            ],
+            update_conflicts=True, unique_fields=["supplier"],
+            update_fields=["product_count", "total_on_hand", "total_value", "updated_at"],
+        )
+        return totals
+
+    @staticmethod
+    def add(deltas):
+        """Apply ``{supplier_id: (products, on_hand, value)}`` increments."""
+        now = timezone.now()
+        # Fixed order so concurrent writers take the row locks the same way.
+        for supplier_id in sorted(deltas):
+            n, qoh, value = deltas[supplier_id]
+            if not (n or qoh or value):
+                continue
+            updated = SupplierSnapshot.objects.filter(supplier_id=supplier_id).update(
+                product_count=models.F("product_count") + n,
+                total_on_hand=models.F("total_on_hand") + qoh,
+                total_value=models.F("total_value") + value,
+                updated_at=now,
+            )
+            if not updated:
+                # No row yet: count this supplier from scratch instead.
+                SupplierSnapshot.rebuild(supplier_ids=[supplier_id])
+
+    @staticmethod
+    def apply_product_deltas(deltas):
+        """Spread ``{product_id: (on_hand, value)}`` changes over each product's suppliers."""
+        deltas = {pid: d for pid, d in deltas.items() if d[0] or d[1]}
+        if not deltas:
+            return
+        per_supplier = {}
+        links = Product.suppliers.through.objects.filter(product_id__in=deltas)
+        for product_id, supplier_id in links.values_list("product_id", "supplier_id"):
+            qoh, value = deltas[product_id]
+            d = per_supplier.setdefault(supplier_id, [0, 0, Decimal(0)])
+            d[1] += qoh
+            d[2] += value
+        SupplierSnapshot.add(per_supplier)
+
+    @staticmethod
+    def add_links(pairs, sign, contributions=None):
+        """Add (sign=1) or remove (sign=-1) (product_id, supplier_id) links.
+
+        ``contributions`` maps product id -> (on_hand, value); rows are read
+        from the product table when it is not given.
+        """
+        pairs = list(pairs)
+        if not pairs:
+            return
+        if contributions is None:
+            contributions = {
+                pk: (qoh, qoh * cost)
+                for pk, qoh, cost in Product.objects.filter(pk__in={p for p, _ in pairs})
+                .values_list("pk", "quantity_on_hand", "price_cost")
+            }
+        per_supplier = {}
+        for product_id, supplier_id in pairs:
+            qoh, value = contributions.get(product_id, (0, 0))
+            d = per_supplier.setdefault(supplier_id, [0, 0, Decimal(0)])
+            d[0] += sign
+            d[1] += sign * qoh
+            d[2] += sign * value
+        SupplierSnapshot.add(per_supplier)
+
+
+class AlertOutbox(models.Model):
+    """Pending alert emails, written in the same transaction as the stock change.
+
+    Nothing talks to the mail server while product rows are locked; the
+    ``process_alert_outbox`` command drains this table after commit and
+    deletes sent rows after ``ALERT_OUTBOX_KEEP_DAYS``.
+    """
+    KIND_LOW_STOCK = "LOW_STOCK"
+    KIND_CHOICES = [(KIND_LOW_STOCK, "Low stock")]
+
+    STATUS_PENDING = "PENDING"
+    STATUS_SENDING = "SENDING"
+    STATUS_SENT = "SENT"
+    STATUS_FAILED = "FAILED"
+    STATUS_CHOICES = [
+        (STATUS_PENDING, "Pending"),
+        (STATUS_SENDING, "Sending"),
+        (STATUS_SENT, "Sent"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    kind = models.CharField(max_length=16, choices=KIND_CHOICES, default=KIND_LOW_STOCK)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="alerts")
+    status = models.CharField(max_length=8, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claim_token = models.CharField(max_length=32, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="outbox_status_due_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} for {self.product_id} ({self.status})"
+
+    @staticmethod
+    def enqueue_low_stock(products):
+        AlertOutbox.objects.bulk_create([
+            AlertOutbox(kind=AlertOutbox.KIND_LOW_STOCK, product=p) for p in products
+        ])
+
+
+class ReorderSuggestion(models.Model):
+    """Forecast-based reorder level and order quantity for one product.
+
+    Written by ``manage.py forecast_reorder_points`` (see
+    ``inventory/utils/forecast.py``); the hand-typed ``Product.reorder_level``
+    is only overwritten when the command runs with ``--apply``.
+    """
+    product = models.OneToOneField(Product, primary_key=True, on_delete=models.CASCADE, related_name="reorder_suggestion")
+    method = models.CharField(max_length=16)
+    daily_demand = models.FloatField(default=0)
+    demand_std = models.FloatField(default=0)
+    lead_time_days = models.PositiveIntegerField(default=0)
+    reorder_level = models.PositiveIntegerField(default=0)
+    order_quantity = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField()
+
+    FIELDS = ("method", "daily_demand", "demand_std", "lead_time_days", "reorder_level", "order_quantity", "computed_at")
+
+    def __str__(self):
+        return f"Reorder {self.product_id} at {self.reorder_level}"
+
+    @staticmethod
+    def store(rows, computed_at):
+        """Upsert ``rows`` (dicts with product_id and the forecast fields)."""
+        ReorderSuggestion.objects.bulk_create(
+            [ReorderSuggestion(computed_at=computed_at, **row) for row in rows],
+            update_conflicts=True, unique_fields=["product"], update_fields=list(ReorderSuggestion.FIELDS),
+        )
+
+    @staticmethod
+    @transaction.atomic
+    def apply(owner_ids):
+        """Copy suggested levels onto the owners' products; returns the number changed."""
+        level = ReorderSuggestion.objects.filter(product=models.OuterRef("pk")).values("reorder_level")
+        changed = (
+            Product.objects.filter(owner_id__in=owner_ids, reorder_suggestion__isnull=False)
+            .exclude(reorder_level=models.F("reorder_suggestion__reorder_level"))
+        )
+        owners = set(changed.values_list("owner_id", flat=True).distinct())
+        count = Product.objects.filter(pk__in=changed.values("pk")).update(
+            reorder_level=models.Subquery(level), updated_at=timezone.now(),
+        )
+        # Bulk update skips the Product signals: refresh low-stock totals here.
+        for owner_id in owners:
+            InventorySnapshot.rebuild(owner_id)
+            bump_inventory_version(owner_id)
+        return count
+
+
+class QueryFinding(models.Model):
+    """A slow or repeated (N+1) query seen while serving a request.
+
+    Written by ``inventory.middleware.RequestMetricsMiddleware`` through
+    ``inventory/utils/querylog.py``; a ring buffer of about the newest
+    ``QUERY_LOG_SIZE`` rows, browsed on the staff query-log page.
+    """
+    TRIM_EVERY = 100  # findings between trims; the table may run this far over its size
+    KIND_SLOW = "slow"
+    KIND_REPEATED = "repeated"
+    KIND_CHOICES = [(KIND_SLOW, "Slow"), (KIND_REPEATED, "Repeated")]
+
+    kind = models.CharField(max_length=8, choices=KIND_CHOICES)
+    view_name = models.CharField(max_length=100)
+    path = models.CharField(max_length=500)
+    fingerprint = models.CharField(max_length=16)
+    sql = models.TextField()  # normalized
+    example = models.TextField()  # as executed, with placeholders
+    params = models.TextField(blank=True)
+    count = models.PositiveIntegerField(default=1)  # runs in the request
+    duration_ms = models.FloatField()  # for all of them
+    plan = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-id"]
+        indexes = [
+            models.Index(fields=["fingerprint"], name="finding_fingerprint_idx"),
+            models.Index(fields=["view_name"], name="finding_view_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.fingerprint} in {self.view_name}"
+
+    @staticmethod
+    def store(findings, keep):
+        """Add ``findings``; every ``TRIM_EVERY`` ids, drop all but the newest ``keep`` rows."""
+        if not findings:
+            return
+        created = QueryFinding.objects.bulk_create(findings)
+        newest = created[-1].pk or QueryFinding.objects.order_by("-pk").values_list("pk", flat=True).first()
+        first = newest - len(created) + 1
+        if newest > keep and (first - 1) // QueryFinding.TRIM_EVERY != newest // QueryFinding.TRIM_EVERY:
+            QueryFinding.objects.filter(pk__lte=newest - keep).delete()
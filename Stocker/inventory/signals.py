@@ -1,34 +1,180 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
 from django.dispatch import receiver
 from django.core.cache import cache
 from django.conf import settings
+from django.db import transaction
 from django.db.models import F
 
-from .models import StockMovement
-from .utils.notifications import send_low_stock_single
+from suppliers.models import Supplier, PurchaseOrder
+from .models import (
+    Product, Category, StockMovement, InventorySnapshot, SupplierSnapshot, AlertOutbox, movements_bulk_created,
+)
+from .utils.cache import bump_inventory_version
+from .utils.search import get_backend as search_backend
 
 
 ALERT_COOLDOWN_HOURS = int(getattr(settings, "LOW_STOCK_ALERT_COOLDOWN_HOURS", 12))
 
+def _enqueue_low_stock(products):
+    low = [
+        p for p in products
+        if p.quantity_on_hand is not None and p.reorder_level is not None
+        and p.quantity_on_hand <= p.reorder_level
+    ]
+    if not low:
+        return
+    cooling = cache.get_many([f"low_alert_{p.pk}" for p in low])
+    low = [p for p in low if f"low_alert_{p.pk}" not in cooling]
+    if not low:
+        return
+
+    # Queued in the caller's transaction; the mail itself is sent by
+    # `manage.py process_alert_outbox`, never while the row locks are held.
+    AlertOutbox.enqueue_low_stock(low)
+    keys = {f"low_alert_{p.pk}": True for p in low}
+    transaction.on_commit(lambda: cache.set_many(keys, timeout=ALERT_COOLDOWN_HOURS * 3600))
+
 @receiver(post_save, sender=StockMovement)
 def low_stock_alert_on_movement(sender, instance: StockMovement, created, **kwargs):
     if not created:
         return
-    p = instance.product
-    if p.quantity_on_hand is None or p.reorder_level is None:
+    _enqueue_low_stock([instance.product])
+
+@receiver(movements_bulk_created, sender=StockMovement)
+def low_stock_alert_on_bulk(sender, movements, **kwargs):
+    # One check per product, against its final quantity in the batch.
+    _enqueue_low_stock({mv.product_id: mv.product for mv in movements}.values())
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Supplier)
+@receiver(post_delete, sender=Supplier)
+@receiver(post_save, sender=PurchaseOrder)
+@receiver(post_delete, sender=PurchaseOrder)
+def invalidate_owner_cache(sender, instance, **kwargs):
+    bump_inventory_version(instance.owner_id)
+
+@receiver(m2m_changed, sender=Product.suppliers.through)
+def invalidate_owner_cache_on_links(sender, instance, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        bump_inventory_version(instance.owner_id)
+
+@receiver(post_save, sender=Product)
+def snapshot_on_product_save(sender, instance: Product, created, **kwargs):
+    if created or hasattr(instance, "_snapshot_loaded"):
+        InventorySnapshot.apply_product_changes([instance])
+    else:
+        # Saved without being loaded first, so there is no "before" to diff.
+        if InventorySnapshot.objects.filter(owner_id=instance.owner_id).exists():
+            InventorySnapshot.rebuild(instance.owner_id)
+        SupplierSnapshot.rebuild(supplier_ids=instance.suppliers.values("pk"))
+
+@receiver(post_delete, sender=Product)
+def snapshot_on_product_delete(sender, instance: Product, **kwargs):
+    if hasattr(instance, "_snapshot_loaded"):
+        InventorySnapshot.apply_product_changes([instance], deleted=True)
+    elif InventorySnapshot.objects.filter(owner_id=instance.owner_id).exists():
+        InventorySnapshot.rebuild(instance.owner_id)
+
+# ---- supplier snapshots ---------------------------------------------------
+
+@receiver(post_save, sender=Supplier)
+def supplier_snapshot_on_create(sender, instance: Supplier, created, raw=False, **kwargs):
+    if created and not raw:
+        SupplierSnapshot.objects.get_or_create(supplier=instance)
+
+def _link_pairs(instance, reverse, pk_set=None):
+    """(product_id, supplier_id) pairs that currently exist for an m2m_changed call."""
+    links = Product.suppliers.through.objects
+    if reverse:
+        links = links.filter(supplier_id=instance.pk)
+        if pk_set is not None:
+            links = links.filter(product_id__in=pk_set)
+    else:
+        links = links.filter(product_id=instance.pk)
+        if pk_set is not None:
+            links = links.filter(supplier_id__in=pk_set)
+    return list(links.values_list("product_id", "supplier_id"))
+
+@receiver(m2m_changed, sender=Product.suppliers.through)
+def supplier_snapshot_on_links(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "post_add" and pk_set:
+        # Django only reports the links it actually inserted.
+        pairs = [(pk, instance.pk) if reverse else (instance.pk, pk) for pk in pk_set]
+        SupplierSnapshot.add_links(pairs, 1)
+    elif action in ("pre_remove", "pre_clear"):
+        # Removal may name links that do not exist; record the real ones.
+        instance._supplier_snapshot_pairs = _link_pairs(instance, reverse, pk_set if action == "pre_remove" else None)
+    elif action in ("post_remove", "post_clear"):
+        SupplierSnapshot.add_links(getattr(instance, "_supplier_snapshot_pairs", []), -1)
+
+@receiver(pre_delete, sender=Product)
+def supplier_snapshot_remember_links(sender, instance: Product, **kwargs):
+    # The link rows go with the product, so read them (and the stored stock) now.
+    pairs = _link_pairs(instance, reverse=False)
+    instance._supplier_snapshot_pairs = pairs
+    instance._supplier_snapshot_contribution = {
+        pk: (qoh, qoh * cost)
+        for pk, qoh, cost in Product.objects.filter(pk=instance.pk).values_list("pk", "quantity_on_hand", "price_cost")
+    } if pairs else {}
+
+@receiver(post_delete, sender=Product)
+def supplier_snapshot_on_product_delete(sender, instance: Product, **kwargs):
+    SupplierSnapshot.add_links(
+        getattr(instance, "_supplier_snapshot_pairs", []), -1,
+        contributions=getattr(instance, "_supplier_snapshot_contribution", {}),
+    )
+
+# ---- search index -------------------------------------------------------
+
+PRODUCT_SEARCH_FIELDS = {"name", "sku", "category", "owner"}
+
+@receiver(post_save, sender=Product)
+def search_index_product(sender, instance: Product, update_fields=None, **kwargs):
+    # Stock movements save only quantity_on_hand/updated_at; nothing to reindex.
+    if update_fields and not (set(update_fields) & PRODUCT_SEARCH_FIELDS):
         return
-    if p.quantity_on_hand > p.reorder_level:
+    search_backend().index_products([instance.pk])
+
+@receiver(post_delete, sender=Product)
+def search_unindex_product(sender, instance: Product, **kwargs):
+    search_backend().remove("product", [instance.pk])
+
+@receiver(m2m_changed, sender=Product.suppliers.through)
+def search_index_product_links(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear" and reverse:
+        instance._search_product_ids = list(instance.products.values_list("pk", flat=True))
+    if action not in ("post_add", "post_remove", "post_clear"):
         return
+    if not reverse:
+        search_backend().index_products([instance.pk])
+    else:
+        search_backend().index_products(pk_set if pk_set is not None else getattr(instance, "_search_product_ids", []))
+
+@receiver(post_save, sender=Supplier)
+def search_index_supplier(sender, instance: Supplier, **kwargs):
+    search_backend().index_suppliers([instance.pk])
+    # Product documents carry supplier names.
+    search_backend().index_products(instance.products.values_list("pk", flat=True))
+
+@receiver(post_save, sender=Category)
+def search_index_category(sender, instance: Category, **kwargs):
+    search_backend().index_categories([instance.pk])
+    search_backend().index_products(instance.products.values_list("pk", flat=True))
 
-    key = f"low_alert_{p.pk}"
-    if cache.get(key):
-        return  
+@receiver(pre_delete, sender=Supplier)
+@receiver(pre_delete, sender=Category)
+def search_remember_products(sender, instance, **kwargs):
+    instance._search_product_ids = list(instance.products.values_list("pk", flat=True))
 
- 
-    try:
-        send_low_stock_single(p)
-        cache.set(key, True, timeout=ALERT_COOLDOWN_HOURS * 3600)
-    except Exception:
-        
-        pass
+@receiver(post_delete, sender=Supplier)
+def search_unindex_supplier(sender, instance: Supplier, **kwargs):
+    search_backend().remove("supplier", [instance.pk])
+    search_backend().index_products(getattr(instance, "_search_product_ids", []))
 
+@receiver(post_delete, sender=Category)
+def search_unindex_category(sender, instance: Category, **kwargs):
+    search_backend().remove("category", [instance.pk])
+    search_backend().index_products(getattr(instance, "_search_product_ids", []))
@@ -0,0 +1,51 @@
+"""``{% ownercache %}``: fragment caching tied to the owner's inventory version.
+
+    {% load inventory_cache %}
+    {% ownercache "product_rows" q status cursor %} ... {% endownercache %}
+
+The key is the fragment name, the extra arguments, the active language and
+the current user; entries live under ``cached_for_owner``, so any write that
+bumps the owner's inventory version retires every fragment at once. The
+version is read once per request (``request_inventory_version``), however
+many fragments the page has. Views
+hand these blocks lazy values (querysets, ``SimpleLazyObject``, lazy
+``KeysetPage``), so a hit costs neither the rendering nor the queries behind
+it. Anonymous requests render without caching.
+"""
+import hashlib
+
+from django import template
+from django.utils import translation
+
+from inventory.utils.cache import cached_for_owner, request_inventory_version
+
+register = template.Library()
+
+
+class OwnerCacheNode(template.Node):
+    def __init__(self, nodelist, name, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        request = context.get("request")
+        user = getattr(request, "user", None)
+        if user is None or not user.is_authenticated:
+            return self.nodelist.render(context)
+        vary = "|".join(str(v.resolve(context)) for v in self.vary_on)
+        digest = hashlib.md5(vary.encode()).hexdigest()
+        name = f"frag:{self.name.resolve(context)}:{translation.get_language()}:{digest}"
+        return cached_for_owner(
+            user.pk, name, lambda: self.nodelist.render(context), request_inventory_version(request, user.pk),
+        )
+
+
+@register.tag
+def ownercache(parser, token):
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' tag requires a fragment name.")
+    nodelist = parser.parse(("endownercache",))
+    parser.delete_first_token()
+    return OwnerCacheNode(nodelist, parser.compile_filter(bits[1]), [parser.compile_filter(b) for b in bits[2:]])
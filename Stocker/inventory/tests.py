@@ -1,3 +1,177 @@
+import io
+import json
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from suppliers.models import Supplier
+
+from .models import Category, InventorySnapshot, MovementDailyRollup, Product, StockMovement, SupplierSnapshot
+from .utils.cache import inventory_version
+from .utils.importer import ImportFileError, ProductImporter, read_csv
+from .utils.search import get_backend as search_backend
+
+
+def _csv(text):
+    return read_csv(io.BytesIO(text.encode()))
+
+
+class ProductImporterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        search_backend().rebuild()  # the index tables, however the test database was built
+        cls.owner = get_user_model().objects.create_user("importer", password="pw")
+        cls.category = Category.objects.create(owner=cls.owner, name="Tools")
+        cls.supplier = Supplier.objects.create(owner=cls.owner, name="Acme")
+        cls.product = Product.objects.create(
+            owner=cls.owner, sku="A-1", name="Hammer", category=cls.category, unit="PCS",
+            price_cost=Decimal("2.50"), price_sale=Decimal("4.00"), reorder_level=5, quantity_on_hand=7,
+        )
+        cls.product.suppliers.add(cls.supplier)
+
+    def test_partial_file_keeps_missing_columns(self):
+        result = ProductImporter(self.owner).run(_csv("sku,name\nA-1,Claw hammer\n"))
+
+        self.assertEqual((result["created"], result["updated"], result["errors"]), (0, 1, []))
+        product = Product.objects.get(pk=self.product.pk)
+        self.assertEqual(product.name, "Claw hammer")
+        self.assertEqual(product.price_cost, Decimal("2.50"))
+        self.assertEqual(product.price_sale, Decimal("4.00"))
+        self.assertEqual(product.reorder_level, 5)
+        self.assertEqual(product.quantity_on_hand, 7)
+        self.assertEqual(product.category_id, self.category.pk)
+        self.assertEqual(list(product.suppliers.all()), [self.supplier])
+
+    def test_blank_cells_keep_current_values(self):
+        ProductImporter(self.owner).run(_csv(
+            "sku,name,category,price_cost,price_sale,reorder_level\nA-1,Hammer,,,5.00,\n"
+        ))
+
+        product = Product.objects.get(pk=self.product.pk)
+        self.assertEqual(product.price_sale, Decimal("5.00"))
+        self.assertEqual(product.price_cost, Decimal("2.50"))
+        self.assertEqual(product.reorder_level, 5)
+        self.assertEqual(product.category_id, self.category.pk)
+
+    def test_new_products_get_defaults(self):
+        result = ProductImporter(self.owner).run(_csv("sku,name\nB-1,Saw\n"))
+
+        self.assertEqual(result["created"], 1)
+        product = Product.objects.get(owner=self.owner, sku="B-1")
+        self.assertEqual((product.price_cost, product.reorder_level, product.category_id), (0, 0, None))
+
+    def test_replace_needs_every_column(self):
+        with self.assertRaises(ImportFileError):
+            ProductImporter(self.owner, replace=True).run(_csv("sku,name\nA-1,Hammer\n"))
+        self.assertEqual(Product.objects.get(pk=self.product.pk).price_cost, Decimal("2.50"))
+
+    def test_replace_resets_blank_cells(self):
+        ProductImporter(self.owner, replace=True).run(_csv(
+            "sku,name,category,suppliers,description,unit,price_cost,price_sale,reorder_level,"
+            "quantity_on_hand,expiry_date\n"
+            "A-1,Hammer,,,,,,3.00,,,\n"
+        ))
+
+        product = Product.objects.get(pk=self.product.pk)
+        self.assertEqual((product.price_cost, product.price_sale), (Decimal("0"), Decimal("3.00")))
+        self.assertEqual((product.reorder_level, product.category_id), (0, None))
+        self.assertEqual(product.quantity_on_hand, 7)
+        self.assertFalse(product.suppliers.exists())
+
+
+class ApplyManyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        search_backend().rebuild()  # the index tables, however the test database was built
+        User = get_user_model()
+        cls.owner = User.objects.create_user("stock", password="pw")
+        cls.other = User.objects.create_user("other", password="pw")
+        InventorySnapshot.rebuild(cls.owner.pk)  # snapshot rows exist, so the batch keeps them current
+        cls.supplier = Supplier.objects.create(owner=cls.owner, name="Acme")
+        SupplierSnapshot.rebuild(owner_id=cls.owner.pk)
+        cls.a = Product.objects.create(
+            owner=cls.owner, sku="A", name="Bolts", price_cost=Decimal("1.50"), reorder_level=5, quantity_on_hand=10,
+        )
+        cls.b = Product.objects.create(
+            owner=cls.owner, sku="B", name="Nuts", price_cost=Decimal("0.25"), reorder_level=2, quantity_on_hand=4,
+        )
+        cls.a.suppliers.add(cls.supplier)
+        cls.b.suppliers.add(cls.supplier)
+        cls.foreign = Product.objects.create(owner=cls.other, sku="X", name="Not yours", quantity_on_hand=3)
+
+    def apply(self, lines):
+        return StockMovement.apply_many(lines, user=self.owner, owner=self.owner)
+
+    def assert_snapshots_match(self):
+        snapshot = InventorySnapshot.objects.get(owner=self.owner)
+        self.assertEqual(snapshot.as_dict(), InventorySnapshot.compute(self.owner.pk))
+        stored = {
+            s.supplier_id: (s.product_count, s.total_on_hand, s.total_value)
+            for s in SupplierSnapshot.objects.filter(supplier__owner=self.owner)
+        }
+        self.assertEqual(stored, SupplierSnapshot.compute(owner_id=self.owner.pk))
+
+    def test_mixed_batch(self):
+        version = inventory_version(self.owner.pk)
+        results = self.apply([
+            {"product_id": self.a.pk, "movement_type": "IN", "quantity": 5},
+            {"product_id": self.a.pk, "movement_type": "OUT", "quantity": 12},
+            {"product_id": self.b.pk, "movement_type": "ADJ", "quantity": -1},
+            {"product_id": self.b.pk, "movement_type": "ADJ", "quantity": 3.0},
+            {"product_id": self.a.pk, "movement_type": "IN", "quantity": 2, "reason": "recount"},
+        ])
+
+        self.assertTrue(all(r["ok"] for r in results))
+        self.assertEqual([r["resulting_quantity"] for r in results], [15, 3, 3, 6, 5])
+        self.assertEqual(Product.objects.get(pk=self.a.pk).quantity_on_hand, 5)
+        self.assertEqual(Product.objects.get(pk=self.b.pk).quantity_on_hand, 6)
+        self.assertEqual(StockMovement.objects.filter(product__owner=self.owner).count(), 5)
+        self.assert_snapshots_match()
+        self.assertEqual(InventorySnapshot.objects.get(owner=self.owner).low_stock, 1)
+
+        today = timezone.localdate()
+        rollup = {
+            r.product_id: (r.in_qty, r.out_qty, r.adj_qty)
+            for r in MovementDailyRollup.objects.filter(owner=self.owner, day=today)
+        }
+        self.assertEqual(rollup, {self.a.pk: (7, 12, 0), self.b.pk: (0, 0, 2)})
+        self.assertGreater(inventory_version(self.owner.pk), version)
+
+    def test_bad_lines_are_rejected_and_the_rest_applied(self):
+        results = self.apply([
+            {"product_id": self.a.pk, "movement_type": "IN", "quantity": True},
+            {"product_id": self.a.pk, "movement_type": "IN", "quantity": 1.5},
+            {"product_id": self.a.pk, "movement_type": "OUT", "quantity": 0},
+            {"product_id": self.a.pk, "movement_type": "OUT", "quantity": -2},
+            {"product_id": self.a.pk, "movement_type": "MOVE", "quantity": 1},
+            {"product_id": self.foreign.pk, "movement_type": "OUT", "quantity": 1},
+            {"product_id": None, "movement_type": "IN", "quantity": 1},
+            {"product_id": self.b.pk, "movement_type": "OUT", "quantity": "2"},
+        ])
+
+        self.assertEqual([r["ok"] for r in results], [False] * 7 + [True])
+        self.assertEqual(Product.objects.get(pk=self.a.pk).quantity_on_hand, 10)
+        self.assertEqual(Product.objects.get(pk=self.b.pk).quantity_on_hand, 2)
+        self.assertEqual(Product.objects.get(pk=self.foreign.pk).quantity_on_hand, 3)
+        self.assert_snapshots_match()
+
+    def test_batch_endpoint(self):
+        self.client.force_login(self.owner)
+        self.owner.user_permissions.add(Permission.objects.get(codename="add_stockmovement"))
+        url = reverse("inventory:adjust_stock_batch")
+
+        response = self.client.post(url, json.dumps({"lines": [
+            {"sku": "A", "movement_type": "OUT", "quantity": 4},
+            {"sku": "B", "movement_type": "IN", "quantity": False},
+        ]}), content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["applied"], 1)
+        self.assertEqual(Product.objects.get(pk=self.a.pk).quantity_on_hand, 6)
 
-# Create your tests here.
+        response = self.client.post(url, json.dumps({"lines": [{"sku": ["A"], "quantity": 1}]}),
+                                    content_type="application/json")
+        self.assertEqual(response.status_code, 400)
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
@@ -6,15 +7,23 @@ app_name = "inventory"
 urlpatterns = [
     path("products/", views.ProductListView.as_view(), name="product_list"),
     path("products/new/", views.ProductCreateView.as_view(), name="product_create"),
+    path("products/import/", views.product_import, name="product_import"),
+    path("products/import/errors/<slug:report>.csv", views.product_import_errors, name="product_import_errors"),
     path("products/<int:pk>/", views.ProductDetailView.as_view(), name="product_detail"),
     path("products/<int:pk>/edit/", views.ProductUpdateView.as_view(), name="product_update"),
     path("products/<int:pk>/delete/", views.ProductDeleteView.as_view(), name="product_delete"),
     path("products/<int:pk>/adjust-stock/", views.adjust_stock, name="adjust_stock"),
+    path("products/adjust-stock/batch/", views.adjust_stock_batch, name="adjust_stock_batch"),
     path("categories/", views.CategoryListView.as_view(), name="category_list"),
     path("categories/new/", views.CategoryCreateView.as_view(), name="category_create"),
     path("categories/<int:pk>/edit/", views.CategoryUpdateView.as_view(), name="category_update"),
     path("categories/<int:pk>/delete/", views.CategoryDeleteView.as_view(), name="category_delete"),
-    path("reports/", views.ReportsView.as_view(), name="reports"),
+    path("reports/", views.reports_async if settings.ASYNC_VIEWS else views.ReportsView.as_view(), name="reports"),
     path("reports/inventory.csv", views.inventory_report_csv, name="inventory_report_csv"),
     path("reports/suppliers.csv", views.supplier_report_csv, name="supplier_report_csv"),
+    path("reports/movements.csv", views.movement_report_csv, name="movement_report_csv"),
+    path("reports/movements/export/", views.movement_export, name="movement_export"),
+    path("reports/analytics/", views.analytics_report, name="analytics_report"),
+    path("reports/as-of/", views.stock_as_of_report, name="stock_as_of_report"),
+    path("query-log/", views.query_log, name="query_log"),
 ]
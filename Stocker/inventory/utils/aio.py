@@ -0,0 +1,60 @@
+"""Run independent ORM reads concurrently from async views.
+
+Django's async ORM methods (``aget``, ``acount``, ...) all hop onto one shared
+thread (``sync_to_async(thread_sensitive=True)``), so awaiting several of them
+with ``asyncio.gather`` still runs the queries one after another. ``gather``
+runs each callable on a bounded thread pool instead (``ASYNC_QUERY_WORKERS``
+threads, each keeping its own database connection) and awaits them together, so
+a page waits for its slowest query rather than the sum of them. SQLite in WAL
+mode serves these readers in parallel; the driver releases the GIL while a
+query runs.
+
+Callables see the caller's context (active language and other
+context-local state), as with ``sync_to_async``, and must only read; there
+is no shared transaction across them.
+"""
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _executor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=settings.ASYNC_QUERY_WORKERS, thread_name_prefix="stocker-query",
+            )
+    return _pool
+
+
+def _run(fn):
+    try:
+        return fn()
+    finally:
+        # Pool threads live as long as the process, so their connections stay
+        # open between calls (a new SQLite connection starts with a cold page
+        # cache); only one that broke is dropped.
+        for conn in connections.all(initialized_only=True):
+            if conn.errors_occurred:
+                if conn.is_usable():
+                    conn.errors_occurred = False
+                else:
+                    conn.close()
+
+
+async def gather(*fns):
+    """Results of ``fns`` (zero-argument callables), run concurrently, in order."""
+    pool = _executor()
+    return await asyncio.gather(*(
+        sync_to_async(functools.partial(_run, fn), thread_sensitive=False, executor=pool)()
+        for fn in fns
+    ))
@@ -0,0 +1,154 @@
+"""Vectorised inventory analytics: ABC classes, turnover, days of cover, dead stock.
+
+``analyse`` reads an owner's products and one grouped pass over their daily
+movement rollups (raw cursor rows, no model instances), turns them into NumPy
+arrays and computes every metric with whole-array operations. The rollup is
+used instead of the ledger, so archived movements are included.
+
+Definitions, for the window ``start``..``end`` (D days):
+
+* consumption: units moved OUT, valued at the current cost price;
+* ABC: products sorted by consumption value; A until 80% of the total,
+  B until 95%, C for the rest (and anything with no consumption);
+* average daily usage: consumption / D; days of cover: closing stock / usage;
+* turnover: consumption / average stock, (opening + closing) / 2, with both
+  balances rebuilt backwards from today's quantity;
+* dead stock: stock on hand at the end of the window but no consumption in it.
+"""
+import numpy as np
+from django.db import connection
+from django.db.models import F, Q, Sum
+from django.utils import timezone
+
+ABC_LIMITS = (0.80, 0.95)
+CLASSES = np.array(["A", "B", "C"])
+
+
+def _fetch(qs):
+    sql, params = qs.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def analyse(owner, start, end):
+    """Metrics for all of ``owner``'s products; dict of equally long arrays plus ``days``."""
+    from inventory.models import MovementDailyRollup, Product
+
+    end = min(end, timezone.localdate())
+    days = max((end - start).days + 1, 1)
+
+    products = _fetch(
+        Product.objects.filter(owner=owner).order_by("pk")
+        .values_list("pk", "sku", "name", "quantity_on_hand", "price_cost")
+    )
+    pk, sku, name, qoh, cost = (list(col) for col in zip(*products)) if products else ([],) * 5
+    n = len(pk)
+    pk = np.array(pk, dtype=np.int64)
+    qoh = np.array(qoh, dtype=float)
+    cost = np.array(cost, dtype=float)
+
+    # One grouped pass: the (product, day) unique index already orders the rows.
+    net = F("in_qty") - F("out_qty") + F("adj_qty")
+    totals = _fetch(
+        MovementDailyRollup.objects
+        .filter(product_id__in=Product.objects.filter(owner=owner).values("pk"), day__gte=start)
+        .values("product_id").order_by("product_id")
+        .annotate(
+            consumed=Sum("out_qty", filter=Q(day__lte=end)),
+            net_in=Sum(net, filter=Q(day__lte=end)),
+            net_after=Sum(net, filter=Q(day__gt=end)),
+        )
+        .values_list("product_id", "consumed", "net_in", "net_after")
+    )
+    consumed = np.zeros(n)
+    net_in = np.zeros(n)
+    net_after = np.zeros(n)
+    if totals and n:
+        cols = np.nan_to_num(np.array(totals, dtype=float))  # empty FILTERed sums are NULL
+        idx = np.searchsorted(pk, cols[:, 0].astype(np.int64))
+        consumed[idx], net_in[idx], net_after[idx] = cols[:, 1], cols[:, 2], cols[:, 3]
+
+    closing = qoh - net_after
+    opening = closing - net_in
+    avg_stock = (opening + closing) / 2
+    usage = consumed / days
+    value = consumed * cost
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cover = np.where(usage > 0, closing / usage, np.nan)
+        turnover = np.where(avg_stock > 0, consumed / avg_stock, np.nan)
+
+    order = np.argsort(-value, kind="stable")
+    total = value.sum()
+    abc = np.full(n, 2)
+    if total > 0:
+        # Share of the total held by the products ranked above each one.
+        before = (np.cumsum(value[order]) - value[order]) / total
+        ranked = np.searchsorted(np.array(ABC_LIMITS), before, side="right")
+        abc[order] = np.where(value[order] > 0, ranked, 2)
+
+    return {
+        "days": days,
+        "start": start,
+        "end": end,
+        "pk": pk,
+        "sku": sku,
+        "name": name,
+        "closing": closing,
+        "consumed": consumed,
+        "value": value,
+        "usage": usage,
+        "cover": cover,
+        "turnover": turnover,
+        "abc": CLASSES[abc],
+        "dead": (closing > 0) & (consumed == 0),
+        "stock_value": np.clip(closing, 0, None) * cost,
+    }
+
+
+def summary(result):
+    """Per ABC class: product count and share of consumption value; dead-stock totals."""
+    total = result["value"].sum()
+    classes = []
+    for cls in CLASSES:
+        mask = result["abc"] == cls
+        classes.append({
+            "abc": str(cls),
+            "products": int(mask.sum()),
+            "value": float(result["value"][mask].sum()),
+            "share": float(result["value"][mask].sum() / total * 100) if total else 0.0,
+        })
+    dead = result["dead"]
+    return {
+        "classes": classes,
+        "dead_products": int(dead.sum()),
+        "dead_value": float(result["stock_value"][dead].sum()),
+    }
+
+
+def _num(x, digits=2):
+    return None if np.isnan(x) else round(float(x), digits)
+
+
+def rows(result, limit=None, dead_only=False, key="value"):
+    """Dicts ordered by ``key`` ("value" = consumption value, or "stock_value"), highest first."""
+    order = np.argsort(-result[key], kind="stable")
+    if dead_only:
+        order = order[result["dead"][order]]
+    if limit is not None:
+        order = order[:limit]
+    for i in order:
+        yield {
+            "product_id": int(result["pk"][i]),
+            "sku": result["sku"][i],
+            "name": result["name"][i],
+            "abc": str(result["abc"][i]),
+            "on_hand": int(result["closing"][i]),
+            "consumed": int(result["consumed"][i]),
+            "value": round(float(result["value"][i]), 2),
+            "daily_usage": round(float(result["usage"][i]), 3),
+            "days_of_cover": _num(result["cover"][i], 1),
+            "turnover": _num(result["turnover"][i]),
+            "dead": bool(result["dead"][i]),
+        }
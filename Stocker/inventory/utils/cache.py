@@ -0,0 +1,163 @@
+"""Per-owner versioned cache for dashboard/report aggregates.
+
+Every owner has an "inventory version" counter. Cached values are keyed by
+owner + version + name, so bumping the counter (on any write that can change
+the numbers) makes every old entry unreachable at once; nothing has to be
+deleted. Hits and misses are counted in the cache itself so the ratio is
+shared by all workers that share the backend.
+
+The version counters are rows of ``InventoryVersion``, bumped with an atomic
+``UPDATE`` in the writing transaction: the shared cache may be a
+``DatabaseCache``, whose ``incr`` is a get and a set, and two bumps committing
+together there could both write N+1. Readers see the new version exactly when
+they can see the write.
+
+With the two-tier backend (``inventory.utils.tiered_cache``) the hit/miss
+counts live only in the shared tier; the values themselves are read through
+the process-local tier. Hit/miss counts are added up in memory
+and written to the shared tier every ``STATS_FLUSH_EVERY`` lookups, so a hit
+doesn't cost a shared-cache write.
+"""
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+
+from . import metrics
+
+VALUE_KEY = "inv:{owner_id}:{version}:{name}"
+HITS_KEY = "inv_cache_hits"
+MISSES_KEY = "inv_cache_misses"
+STATS_FLUSH_EVERY = 50
+
+_MISSING = object()
+_pending = {HITS_KEY: 0, MISSES_KEY: 0}
+_pending_lock = threading.Lock()
+
+
+def _shared():
+    """The cache tier every worker sees (the cache itself if it has only one)."""
+    return getattr(cache, "shared", cache)
+
+
+def _timeout():
+    return getattr(settings, "INVENTORY_CACHE_TIMEOUT", 3600)
+
+
+def _incr(key, delta=1):
+    shared = _shared()
+    try:
+        shared.incr(key, delta)
+    except ValueError:
+        # First count, or the key was just evicted. If another worker created
+        # it meanwhile add() fails and incr() applies; losing a count to a
+        # failed add only skews the stats.
+        if not shared.add(key, delta, timeout=None):
+            try:
+                shared.incr(key, delta)
+            except ValueError:
+                pass
+
+
+def _count(key):
+    with _pending_lock:
+        _pending[key] += 1
+        if sum(_pending.values()) < STATS_FLUSH_EVERY:
+            return
+    flush_cache_stats()
+
+
+def flush_cache_stats():
+    """Write this process's pending hit/miss counts to the shared tier."""
+    with _pending_lock:
+        counts = dict(_pending)
+        _pending.update(dict.fromkeys(_pending, 0))
+    for key, delta in counts.items():
+        if delta:
+            _incr(key, delta)
+
+
+def inventory_version(owner_id):
+    from ..models import InventoryVersion  # models imports this module
+
+    versions = InventoryVersion.objects.filter(owner_id=owner_id).values_list("version", flat=True)
+    version = versions.first()
+    if version is None:
+        # Seeded from the clock so a new (or deleted) row never starts lower
+        # than a version that may still have entries cached under it.
+        InventoryVersion.objects.bulk_create(
+            [InventoryVersion(owner_id=owner_id, version=int(time.time() * 1000))], ignore_conflicts=True,
+        )
+        version = versions.first()
+    return version
+
+
+def request_inventory_version(request, owner_id):
+    """``inventory_version`` read once per request and remembered on it.
+
+    For pages with several owner-cached fragments; a bump made while the
+    request runs is seen by the next request.
+    """
+    versions = request.__dict__.setdefault("_inventory_versions", {})
+    if owner_id not in versions:
+        versions[owner_id] = inventory_version(owner_id)
+    return versions[owner_id]
+
+
+def bump_inventory_version(owner_id):
+    """Invalidate everything cached for ``owner_id``, as part of the current transaction."""
+    from ..models import InventoryVersion
+
+    if owner_id is None:
+        return
+    if not InventoryVersion.objects.filter(owner_id=owner_id).update(version=F("version") + 1):
+        inventory_version(owner_id)  # no row yet: a fresh clock-seeded one is newer than any old entry
+
+
+def _lookup(owner_id, name, version=None):
+    if version is None:
+        version = inventory_version(owner_id)
+    key = VALUE_KEY.format(owner_id=owner_id, version=version, name=name)
+    value = cache.get(key, _MISSING)
+    _count(MISSES_KEY if value is _MISSING else HITS_KEY)
+    metrics.count_cache(value is not _MISSING)
+    return key, value
+
+
+def cached_for_owner(owner_id, name, compute, version=None):
+    """Return the cached value of ``compute()`` for the owner's current inventory version.
+
+    Pass ``version`` when the caller already has it (``request_inventory_version``).
+    """
+    key, value = _lookup(owner_id, name, version)
+    if value is _MISSING:
+        value = compute()
+        cache.set(key, value, timeout=_timeout())
+    return value
+
+
+async def acached_for_owner(owner_id, name, compute):
+    """``cached_for_owner`` for async views; ``compute`` is a coroutine function."""
+    key, value = await sync_to_async(_lookup)(owner_id, name)
+    if value is _MISSING:
+        value = await compute()
+        await sync_to_async(cache.set)(key, value, timeout=_timeout())
+    return value
+
+
+def cache_stats():
+    flush_cache_stats()
+    shared = _shared()
+    hits = shared.get(HITS_KEY, 0)
+    misses = shared.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {"hits": hits, "misses": misses, "hit_ratio": (hits / total) if total else 0.0}
+
+
+def reset_cache_stats():
+    with _pending_lock:
+        _pending.update(dict.fromkeys(_pending, 0))
+    _shared().delete_many([HITS_KEY, MISSES_KEY])
@@ -0,0 +1,249 @@
+"""Demand forecasts and suggested reorder points.
+
+``forecast_batch`` takes a batch of product ids, loads their daily OUT totals
+from the movement rollup in one query (so archived movements count too), lays
+them out as a products × days matrix and fits every product at once:
+
+* ``ma``: mean of the last ``window`` days;
+* ``ses``: simple exponential smoothing with factor ``alpha``;
+* ``seasonal``: either model on weekday-adjusted demand, re-multiplied by the
+  weekday index of each day in the lead time.
+
+Days before a product was created are left out rather than counted as zero.
+
+Lead time is taken per supplier from purchase orders: order date to
+``received_at`` when the supplier has received orders, otherwise order date
+to ``expected_date``, otherwise ``settings.REORDER_DEFAULT_LEAD_DAYS``. A
+product with several suppliers uses the slowest one.
+
+reorder level = forecast demand over the lead time + safety stock, where
+safety stock is z · sqrt(L·σd² + d²·σL²) for the requested service level;
+the suggested order quantity tops stock up to the reorder level plus
+``cover_days`` of demand.
+"""
+import warnings
+from contextlib import contextmanager
+from datetime import timedelta
+from statistics import NormalDist
+
+import numpy as np
+from django.db.models import CharField, Q
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .analytics import _fetch
+
+METHODS = ("ma", "ses")
+DEFAULT_BATCH_SIZE = 2000
+
+# Options shared by every batch of a run (see ``configure``), set once per
+# process so pool jobs only carry product ids.
+_params = {}
+
+
+def configure(params):
+    """Set the run's options for ``forecast_batch``.
+
+    Keys: start, end, method, alpha, window, seasonal, z, cover_days,
+    default_lead, leads (from ``supplier_lead_times``).
+    """
+    _params.clear()
+    _params.update(params)
+
+
+def service_factor(level):
+    """z for a cycle service level such as 0.95."""
+    return NormalDist().inv_cdf(level)
+
+
+def supplier_lead_times(since, owner_ids=None):
+    """supplier id -> (mean lead days, std) from purchase orders placed since ``since``."""
+    from suppliers.models import PurchaseOrder
+
+    qs = PurchaseOrder.objects.filter(order_date__gte=since).exclude(status=PurchaseOrder.STATUS_CANCELLED)
+    qs = qs.filter(Q(received_at__isnull=False) | Q(expected_date__isnull=False))
+    if owner_ids is not None:
+        qs = qs.filter(owner_id__in=owner_ids)
+
+    observed, planned = {}, {}
+    for supplier_id, ordered, expected, received in qs.values_list(
+        "supplier_id", "order_date", "expected_date", "received_at",
+    ).iterator(chunk_size=5000):
+        if received is not None:
+            observed.setdefault(supplier_id, []).append((timezone.localdate(received) - ordered).days)
+        else:
+            planned.setdefault(supplier_id, []).append((expected - ordered).days)
+
+    leads = {}
+    for supplier_id, days in planned.items():
+        leads[supplier_id] = (max(float(np.mean(days)), 0.0), 0.0)
+    for supplier_id, days in observed.items():
+        days = np.clip(np.array(days, dtype=float), 0, None)
+        leads[supplier_id] = (float(days.mean()), float(days.std()))
+    return leads
+
+
+def _matrix(pk, born, start, days, rows):
+    """products × days OUT quantities; NaN before each product existed."""
+    x = np.zeros((len(pk), days))
+    if rows:
+        cols = np.array(rows, dtype=[("pk", np.int64), ("day", "datetime64[D]"), ("qty", float)])
+        day = (cols["day"] - np.datetime64(start, "D")).astype(np.int64)
+        x[np.searchsorted(pk, cols["pk"]), day] = cols["qty"]
+    x[np.arange(days)[None, :] < born[:, None]] = np.nan
+    return x
+
+
+@contextmanager
+def _nan_reductions():
+    """Silence nanmean/nanstd on all-NaN rows (no history yet); callers replace the NaNs.
+
+    ``np.errstate`` covers the arithmetic, but the "Mean of empty slice"
+    RuntimeWarning comes from ``warnings.warn``.
+    """
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        yield
+
+
+def _weekday_index(x, start):
+    """products × 7 multiplicative weekday factors (mean 1), columns Monday..Sunday."""
+    weekday = (np.arange(x.shape[1]) + start.weekday()) % 7
+    with _nan_reductions():
+        by_day = np.stack([np.nanmean(x[:, weekday == w], axis=1) for w in range(7)], axis=1)
+        index = by_day / np.nanmean(by_day, axis=1, keepdims=True)
+    return np.where(np.isfinite(index), index, 1.0)
+
+
+def moving_average(x, window):
+    """Level and one-step error std per product from the last ``window`` days."""
+    recent = x[:, -window:]
+    with _nan_reductions():
+        level = np.nanmean(recent, axis=1)
+        std = np.nanstd(recent, axis=1)
+    return np.nan_to_num(level), np.nan_to_num(std)
+
+
+def exponential_smoothing(x, alpha):
+    """Final smoothed level and one-step forecast error std per product.
+
+    One pass over the days, each step a whole-column update; a product's level
+    starts at its first observed day.
+    """
+    n, days = x.shape
+    level = np.zeros(n)
+    started = np.zeros(n, dtype=bool)
+    sq_err = np.zeros(n)
+    count = np.zeros(n)
+    for t in range(days):
+        col = x[:, t]
+        alive = ~np.isnan(col)
+        seen = alive & started
+        err = col[seen] - level[seen]
+        sq_err[seen] += err * err
+        count[seen] += 1
+        level[seen] += alpha * err
+        first = alive & ~started
+        level[first] = col[first]
+        started |= first
+    std = np.sqrt(np.divide(sq_err, count, out=np.zeros(n), where=count > 0))
+    return level, std
+
+
+def fit(x, start, method="ses", alpha=0.3, window=28, seasonal=False):
+    """(level, std, weekday index or None) for every row of ``x``."""
+    index = None
+    if seasonal:
+        index = _weekday_index(x, start)
+        weekday = (np.arange(x.shape[1]) + start.weekday()) % 7
+        factors = index[:, weekday]
+        # A weekday that never sells carries no information about the level.
+        with np.errstate(invalid="ignore", divide="ignore"):
+            x = np.where(factors > 0, x / factors, np.nan)
+    if method == "ma":
+        level, std = moving_average(x, window)
+    else:
+        level, std = exponential_smoothing(x, alpha)
+    return np.clip(level, 0, None), std, index
+
+
+def lead_demand(level, lead, index=None, first_day=None):
+    """Forecast demand over each product's lead time (``lead`` in whole days)."""
+    if index is None:
+        return level * lead
+    horizon = int(lead.max()) if len(lead) else 0
+    weekday = (np.arange(horizon) + first_day.weekday()) % 7
+    within = np.arange(horizon)[None, :] < lead[:, None]
+    return level * (index[:, weekday] * within).sum(axis=1)
+
+
+def forecast_batch(product_ids):
+    """Suggestion dicts for one batch of products, using the ``configure``d options.
+
+    Runs in pool workers, so it takes and returns plain data.
+    """
+    from inventory.models import MovementDailyRollup, Product
+
+    opts = _params
+    start, end = opts["start"], opts["end"]
+    days = (end - start).days + 1
+    products = sorted(
+        Product.objects.filter(pk__in=product_ids).values_list("pk", "quantity_on_hand", "created_at")
+    )
+    if not products:
+        return []
+    pk = np.array([p[0] for p in products], dtype=np.int64)
+    on_hand = np.array([p[1] for p in products], dtype=float)
+    born = np.array([(timezone.localdate(p[2]) - start).days for p in products])
+
+    rows = _fetch(
+        MovementDailyRollup.objects
+        .filter(product_id__in=product_ids, day__gte=start, day__lte=end, out_qty__gt=0)
+        # Days as ISO text: NumPy parses those far faster than date objects.
+        .annotate(day_text=Cast("day", CharField()))
+        .values_list("product_id", "day_text", "out_qty")
+    )
+    x = _matrix(pk, born, start, days, rows)
+    level, std, index = fit(x, start, opts["method"], opts["alpha"], opts["window"], opts["seasonal"])
+
+    # Slowest supplier per product.
+    leads, default = opts["leads"], opts["default_lead"]
+    lead = np.full(len(pk), float(default))
+    lead_std = np.zeros(len(pk))
+    found = np.zeros(len(pk), dtype=bool)
+    links = Product.suppliers.through.objects.filter(product_id__in=product_ids)
+    for product_id, supplier_id in links.values_list("product_id", "supplier_id"):
+        if supplier_id not in leads:
+            continue
+        i = np.searchsorted(pk, product_id)
+        mean, sd = leads[supplier_id]
+        if not found[i] or mean > lead[i]:
+            lead[i], lead_std[i] = mean, sd
+        found[i] = True
+    lead = np.maximum(np.ceil(lead), 1)
+
+    demand = lead_demand(level, lead, index, end + timedelta(days=1))
+    daily = demand / lead
+    safety = opts["z"] * np.sqrt(lead * std ** 2 + daily ** 2 * lead_std ** 2)
+    reorder = np.ceil(demand + safety)
+    order = np.clip(np.ceil(reorder + daily * opts["cover_days"] - on_hand), 0, None)
+
+    method = opts["method"] + ("+seasonal" if opts["seasonal"] else "")
+    return [
+        {
+            "product_id": int(pk[i]),
+            "method": method,
+            "daily_demand": round(float(daily[i]), 4),
+            "demand_std": round(float(std[i]), 4),
+            "lead_time_days": int(lead[i]),
+            "reorder_level": int(reorder[i]),
+            "order_quantity": int(order[i]),
+        }
+        for i in range(len(pk))
+    ]
+
+
+def batches(product_ids, size):
+    for i in range(0, len(product_ids), size):
+        yield product_ids[i:i + size]
+
@@ -0,0 +1,276 @@
+"""Bulk product import from CSV or XLSX.
+
+Rows are read lazily and processed in chunks. Each chunk costs a fixed handful
+of queries whatever its size: one lookup per related model (categories,
+suppliers, existing SKUs), one upsert on ``(owner, sku)``, and one
+delete/insert for the supplier links. Bulk writes skip model signals, so the
+importer itself refreshes the search index, the inventory snapshot and the
+owner's cache version, and recounts the owner's supplier totals.
+
+Columns (header names, case-insensitive): sku, name (required), category,
+suppliers (separated by ";"), description, unit, price_cost, price_sale,
+reorder_level, quantity_on_hand, expiry_date. ``quantity_on_hand`` only
+applies to new products; existing stock changes go through stock movements.
+
+Updates only touch the columns the file has, and a blank cell keeps the
+product's current value. With ``replace=True`` the file must have every
+column, and blank cells reset fields to their defaults (and clear the
+category and supplier links).
+"""
+import csv
+import io
+from itertools import chain
+
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+
+from .cache import bump_inventory_version
+from .search import get_backend as search_backend
+
+COLUMNS = (
+    "sku", "name", "category", "suppliers", "description", "unit",
+    "price_cost", "price_sale", "reorder_level", "quantity_on_hand", "expiry_date",
+)
+PRODUCT_FIELDS = (
+    "name", "description", "unit", "price_cost", "price_sale",
+    "reorder_level", "quantity_on_hand", "expiry_date",
+)
+UPDATE_FIELDS = [f for f in PRODUCT_FIELDS if f != "quantity_on_hand"] + ["category"]
+SUPPLIER_SEPARATOR = ";"
+DEFAULT_CHUNK_SIZE = 2000
+
+
+class ImportFileError(Exception):
+    """The file as a whole cannot be read (bad format, missing columns)."""
+
+
+def _normalise(header):
+    return [(h or "").strip().lower().replace(" ", "_") for h in header]
+
+
+def _check_header(header):
+    missing = {"sku", "name"} - set(header)
+    if missing:
+        raise ImportFileError(f"Missing required column(s): {', '.join(sorted(missing))}")
+
+
+def read_csv(fileobj):
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    reader = csv.reader(text)
+    header = _normalise(next(reader, []))
+    _check_header(header)
+    for row in reader:
+        if any(cell.strip() for cell in row):
+            yield dict(zip(header, row + [""] * (len(header) - len(row))))
+
+
+def read_xlsx(fileobj):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFileError("XLSX import needs the openpyxl package; upload a CSV file instead.")
+    try:
+        sheet = load_workbook(fileobj, read_only=True, data_only=True).active
+    except Exception:
+        raise ImportFileError("Could not read the XLSX file.")
+    rows = sheet.iter_rows(values_only=True)
+    header = _normalise(next(rows, []))
+    _check_header(header)
+    for row in rows:
+        if any(cell not in (None, "") for cell in row):
+            yield {h: "" if v is None else v for h, v in zip(header, row)}
+
+
+def read_rows(fileobj, filename):
+    """Yield one dict per data row; the first sheet row / CSV line is the header."""
+    if filename.lower().endswith(".xlsx"):
+        return read_xlsx(fileobj)
+    if filename.lower().endswith(".csv"):
+        return read_csv(fileobj)
+    raise ImportFileError("Unsupported file type; use .csv or .xlsx.")
+
+
+class ProductImporter:
+    """Upsert products for one owner from an iterable of row dicts.
+
+    ``run`` returns ``{"created", "updated", "errors"}`` where errors is a list
+    of ``(line, sku, message)``; line 1 is the header. Each chunk commits on
+    its own, so a bad row never discards the rows around it. ``replace``
+    overwrites every field of existing products (see the module docstring).
+    """
+
+    def __init__(self, owner, chunk_size=DEFAULT_CHUNK_SIZE, replace=False):
+        from inventory.models import Product
+
+        self.owner = owner
+        self.chunk_size = chunk_size
+        self.replace = replace
+        self.update_fields = UPDATE_FIELDS
+        self.fields = {name: Product._meta.get_field(name) for name in PRODUCT_FIELDS}
+        self.fields["sku"] = Product._meta.get_field("sku")
+        self.created = 0
+        self.updated = 0
+        self.errors = []
+
+    def run(self, rows):
+        from inventory.models import InventorySnapshot, SupplierSnapshot
+
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is not None:
+            self._set_columns(set(first))
+            rows = chain([first], rows)
+
+        chunk = []
+        for line, row in enumerate(rows, start=2):
+            chunk.append((line, row))
+            if len(chunk) >= self.chunk_size:
+                self._import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self._import_chunk(chunk)
+
+        if self.created or self.updated:
+            InventorySnapshot.rebuild(self.owner.pk)
+            SupplierSnapshot.rebuild(owner_id=self.owner.pk)
+            bump_inventory_version(self.owner.pk)
+        return {"created": self.created, "updated": self.updated, "errors": self.errors}
+
+    def _set_columns(self, columns):
+        """Update only the fields the file has columns for, unless replacing."""
+        if self.replace:
+            missing = set(COLUMNS) - columns
+            if missing:
+                raise ImportFileError(f"Replacing products needs every column; missing: {', '.join(sorted(missing))}")
+        else:
+            self.update_fields = [f for f in UPDATE_FIELDS if f in columns]
+
+    def _clean(self, line, row):
+        """Validated field values for one row, or None after recording errors.
+
+        ``data["given"]`` names the fields that had a value in the row.
+        """
+        data = {}
+        given = set()
+        problems = []
+        for name in ("sku", *PRODUCT_FIELDS):
+            raw = row.get(name, "")
+            raw = raw.strip() if isinstance(raw, str) else raw
+            field = self.fields[name]
+            if raw in ("", None):
+                if name in ("sku", "name"):
+                    problems.append(f"{name}: this field is required")
+                elif field.has_default():
+                    data[name] = field.get_default()
+                else:
+                    data[name] = None if field.null else ""
+                continue
+            given.add(name)
+            try:
+                data[name] = field.clean(raw, None)
+            except ValidationError as e:
+                problems.append(f"{name}: {' '.join(e.messages)}")
+        if problems:
+            self.errors.append((line, row.get("sku", ""), "; ".join(problems)))
+            return None
+        data["category"] = str(row.get("category") or "").strip()
+        if data["category"]:
+            given.add("category")
+        suppliers = str(row.get("suppliers") or "")
+        data["suppliers"] = [s.strip() for s in suppliers.split(SUPPLIER_SEPARATOR) if s.strip()]
+        data["given"] = given
+        return data
+
+    def _product(self, sku, data, category_id, current):
+        """The Product to upsert; fields the row left blank keep ``current``'s values."""
+        from inventory.models import Product
+
+        product = Product(
+            owner=self.owner, sku=sku, category_id=category_id, **{name: data[name] for name in PRODUCT_FIELDS},
+        )
+        if current is not None and not self.replace:
+            for name in self.update_fields:
+                if name not in data["given"]:
+                    attname = Product._meta.get_field(name).attname
+                    setattr(product, attname, getattr(current, attname))
+        return product
+
+    def _resolve(self, model, names, index):
+        """name -> id for the owner's ``model`` rows, creating (and indexing) missing ones."""
+        if not names:
+            return {}
+        qs = model.objects.filter(owner=self.owner, name__in=names)
+        found = dict(qs.values_list("name", "id"))
+        missing = [n for n in names if n not in found]
+        if missing:
+            model.objects.bulk_create([model(owner=self.owner, name=n) for n in missing], ignore_conflicts=True)
+            found = dict(qs.values_list("name", "id"))
+            index([found[n] for n in missing])
+        return found
+
+    def _import_chunk(self, chunk):
+        from inventory.models import Category, Product
+        from suppliers.models import Supplier
+
+        # Last occurrence of a SKU in the chunk wins; earlier ones are reported.
+        by_sku = {}
+        for line, row in chunk:
+            data = self._clean(line, row)
+            if data is None:
+                continue
+            if data["sku"] in by_sku:
+                self.errors.append((by_sku[data["sku"]][0], data["sku"], f"duplicate SKU, replaced by line {line}"))
+            by_sku[data["sku"]] = (line, data)
+        if not by_sku:
+            return
+
+        with transaction.atomic():
+            backend = search_backend()
+            categories = self._resolve(
+                Category, {d["category"] for _, d in by_sku.values() if d["category"]}, backend.index_categories,
+            )
+            suppliers = self._resolve(
+                Supplier, {s for _, d in by_sku.values() for s in d["suppliers"]}, backend.index_suppliers,
+            )
+            existing = {
+                p.sku: p
+                for p in Product.objects.filter(owner=self.owner, sku__in=by_sku).only("sku", *self.update_fields)
+            }
+
+            products = [
+                self._product(sku, data, categories.get(data["category"]), existing.get(sku))
+                for sku, (_, data) in by_sku.items()
+            ]
+            Product.objects.bulk_create(
+                products, update_conflicts=True, unique_fields=["owner", "sku"],
+                update_fields=[*self.update_fields, "updated_at"],
+            )
+
+            # Rows that list suppliers replace the product's links (every row does when replacing).
+            through = Product.suppliers.through
+            linked = [
+                (p, by_sku[p.sku][1]["suppliers"]) for p in products if self.replace or by_sku[p.sku][1]["suppliers"]
+            ]
+            if linked:
+                through.objects.filter(product_id__in=[p.pk for p, _ in linked]).delete()
+                links = [(p.pk, suppliers[name]) for p, names in linked for name in dict.fromkeys(names)]
+                if links:
+                    # Plain executemany: two integer columns do not need model instances.
+                    with connection.cursor() as cursor:
+                        cursor.executemany(
+                            f"INSERT INTO {through._meta.db_table} (product_id, supplier_id) VALUES (%s, %s)", links,
+                        )
+
+            backend.index_products([p.pk for p in products])
+
+        self.updated += len(existing)
+        self.created += len(products) - len(existing)
+
+
+def error_report(errors):
+    """CSV text for ``ProductImporter`` errors."""
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["Line", "SKU", "Error"])
+    writer.writerows(errors)
+    return out.getvalue()
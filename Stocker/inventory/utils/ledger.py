@@ -0,0 +1,153 @@
+"""One read API over the live and archived movement ledger.
+
+``manage.py archive_movements`` moves old StockMovement rows into
+ArchivedMovement and leaves a MovementCheckpoint per product at the cut.
+Callers ask for a date range and get back only the tables that can hold rows
+in it, so recent reports and product pages never touch the archive.
+"""
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db.models import Max, OuterRef, Subquery
+from django.utils import timezone
+
+HORIZON_KEY = "ledger_archive_horizon"
+
+
+def archive_horizon():
+    """Latest checkpoint cut (everything archived is older), or None."""
+    from inventory.models import MovementCheckpoint
+
+    horizon = cache.get(HORIZON_KEY)
+    if horizon is None:
+        horizon = MovementCheckpoint.objects.filter(is_cut=True).aggregate(h=Max("as_of"))["h"] or False
+        cache.set(HORIZON_KEY, horizon, None)
+    return horizon or None
+
+
+def forget_archive_horizon():
+    cache.delete(HORIZON_KEY)
+
+
+def needs_archive(start=None):
+    horizon = archive_horizon()
+    if horizon is None:
+        return False
+    return start is None or start <= timezone.localdate(horizon)
+
+
+def _day_start(day):
+    """Midnight starting ``day`` in the current time zone."""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def sources(owner=None, product=None, start=None, end=None):
+    """Querysets that together hold the movements dated ``start``..``end`` (inclusive), live first."""
+    from inventory.models import ArchivedMovement, StockMovement
+
+    models = [StockMovement, ArchivedMovement] if needs_archive(start) else [StockMovement]
+    result = []
+    for model in models:
+        qs = model.objects.all()
+        if owner is not None:
+            qs = qs.filter(product__owner=owner)
+        if product is not None:
+            qs = qs.filter(product=product)
+        # Bounds on the column itself rather than created_at__date: on SQLite
+        # the date cast is a Python function called per row, which can't use
+        # an index and holds the GIL (so concurrent readers can't overlap).
+        if start is not None:
+            qs = qs.filter(created_at__gte=_day_start(start))
+        if end is not None:
+            qs = qs.filter(created_at__lt=_day_start(end + timedelta(days=1)))
+        result.append(qs)
+    return result
+
+
+def iter_values(querysets, *fields, chunk_size=2000):
+    """values_list rows across ``sources()`` output, oldest first.
+
+    Archived rows are all older than live ones, so this is a concatenation.
+    """
+    for qs in reversed(querysets):
+        yield from qs.order_by("created_at", "id").values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+def _opening_quantity(movement_type, qty, resulting):
+    """Balance just before a movement, undoing models._next_quantity."""
+    if movement_type == "IN":
+        return resulting - abs(qty)
+    if movement_type == "OUT":
+        return resulting + abs(qty)
+    return resulting - qty  # ADJ
+
+
+def _annotate_edge(qs, prefix, base, fields):
+    """Annotate ``qs`` (products) with ``fields`` of the first row of ``base`` for each product."""
+    sub = base.filter(product_id=OuterRef("pk"))
+    return qs.annotate(**{f"{prefix}_{f}": Subquery(sub.values(f)[:1]) for f in fields})
+
+
+def stock_as_of(owner, at):
+    """Quantity on hand and cost valuation of each of ``owner``'s products at the instant ``at``.
+
+    Counts movements stamped strictly before ``at``. The balance is the newest
+    of: the last live movement, the last checkpoint, and (only when ``at`` is
+    before the archive horizon) the last archived movement, each one indexed
+    lookup per product in a single query. Products with no ledger rows before
+    ``at`` are resolved from the first movement after it, or their current
+    quantity if they have none. Valuation uses the current cost price.
+    """
+    from inventory.models import ArchivedMovement, MovementCheckpoint, Product, StockMovement
+
+    horizon = archive_horizon()
+    use_archive = horizon is not None and at < horizon
+
+    # (prefix, ordered candidates, timestamp field, quantity field, tie-break rank)
+    before = [
+        ("live", StockMovement.objects.filter(created_at__lt=at).order_by("-created_at", "-id"),
+         "created_at", "resulting_quantity", 1),
+        ("cp", MovementCheckpoint.objects.filter(as_of__lte=at).order_by("-as_of"), "as_of", "quantity", 0),
+    ]
+    if use_archive:
+        before.append(("arch", ArchivedMovement.objects.filter(created_at__lt=at).order_by("-created_at", "-id"),
+                       "created_at", "resulting_quantity", 1))
+
+    qs = Product.objects.filter(owner=owner, created_at__lt=at).order_by("name", "pk")
+    for prefix, base, ts, qty, _ in before:
+        qs = _annotate_edge(qs, prefix, base, (ts, qty))
+    rows = list(qs.values(
+        "pk", "sku", "name", "price_cost", "quantity_on_hand",
+        *[f"{prefix}_{f}" for prefix, _, ts, qty, _ in before for f in (ts, qty)],
+    ))
+
+    quantities = {}
+    for r in rows:
+        # A checkpoint at T excludes movements stamped exactly T, hence the rank.
+        found = [(r[f"{p}_{ts}"], rank, r[f"{p}_{qty}"]) for p, _, ts, qty, rank in before if r[f"{p}_{ts}"] is not None]
+        if found:
+            quantities[r["pk"]] = max(found, key=lambda c: c[:2])[2]
+
+    missing = [r["pk"] for r in rows if r["pk"] not in quantities]
+    after = ([ArchivedMovement] if use_archive else []) + [StockMovement]
+    fields = ("movement_type", "quantity", "resulting_quantity")
+    for i in range(0, len(missing), 500):
+        chunk = Product.objects.filter(pk__in=missing[i:i + 500])
+        for n, model in enumerate(after):
+            chunk = _annotate_edge(chunk, f"a{n}", model.objects.filter(created_at__gte=at).order_by("created_at", "id"), fields)
+        for r in chunk.values("pk", *[f"a{n}_{f}" for n in range(len(after)) for f in fields]):
+            for n in range(len(after)):
+                if r[f"a{n}_movement_type"] is not None:
+                    quantities[r["pk"]] = _opening_quantity(*(r[f"a{n}_{f}"] for f in fields))
+                    break
+
+    return [
+        {
+            "product_id": r["pk"],
+            "sku": r["sku"],
+            "name": r["name"],
+            "quantity": quantities.get(r["pk"], r["quantity_on_hand"]),
+            "value": quantities.get(r["pk"], r["quantity_on_hand"]) * r["price_cost"],
+        }
+        for r in rows
+    ]
@@ -0,0 +1,280 @@
+"""Per-request instrumentation: SQL, template and cache timings per URL name.
+
+``inventory.middleware.RequestMetricsMiddleware`` opens a ``RequestMetrics``
+for each request in a context variable. Three hooks add to it:
+
+* an execute wrapper installed on every database connection as it opens
+  (``install_query_wrapper``), so queries are counted on whichever thread
+  runs them: the request thread, the async ORM's thread or the
+  ``inventory.utils.aio`` pool, which all inherit the request's context;
+* ``TimedTemplates``, the template backend, for top-level renders (includes
+  render inside them and aren't counted twice);
+* ``count_cache`` from ``inventory.utils.cache`` for owner-cache lookups.
+
+The same wrapper feeds the slow-query and N+1 log (``inventory.utils.querylog``):
+queries over ``QUERY_LOG_SLOW_MS`` are kept, and every query is counted by
+its fingerprint when ``QUERY_LOG_REPEAT_THRESHOLD`` is set.
+
+SQL time is time spent in ``execute``; rows a cursor fetches afterwards
+aren't in it. Template time includes any queries a template triggers while
+rendering, so the Server-Timing metrics may overlap.
+
+Each process keeps per-view histograms in memory and writes a snapshot of
+them to the shared cache tier every ``METRICS_FLUSH_SECONDS``, so the
+metrics view can add up every worker's numbers. Snapshots expire a day
+after their process last wrote one.
+"""
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.backends.django import DjangoTemplates
+
+from . import querylog
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+HISTOGRAMS = (
+    # (name, RequestMetrics value, buckets, help)
+    ("stocker_request_duration_seconds", "total", DURATION_BUCKETS,
+     "Time spent in the middleware stack and view, per URL name."),
+    ("stocker_request_sql_seconds", "sql", DURATION_BUCKETS,
+     "Time spent executing SQL while handling the request."),
+    ("stocker_request_queries", "queries", QUERY_BUCKETS,
+     "SQL queries executed while handling the request."),
+)
+COUNTERS = (
+    ("stocker_request_template_seconds_total", "template", "Time spent rendering top-level templates."),
+    ("stocker_owner_cache_hits_total", "hits", "Owner-cache lookups served from the cache."),
+    ("stocker_owner_cache_misses_total", "misses", "Owner-cache lookups that had to compute the value."),
+)
+PROCESSES_KEY = "metrics:processes"
+SNAPSHOT_KEY = "metrics:process:{}"
+SNAPSHOT_TIMEOUT = 24 * 3600
+UNRESOLVED = "unresolved"  # 404s, so unknown paths can't blow up the label set
+
+_current = ContextVar("stocker_request_metrics", default=None)
+_process = uuid.uuid4().hex[:12]
+_views = {}
+_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+class RequestMetrics:
+    __slots__ = (
+        "started", "total", "queries", "sql", "template", "hits", "misses",
+        "slow_after", "repeat_over", "slow", "seen", "_lock",
+    )
+
+    def __init__(self, slow_after=0.0, repeat_over=0):
+        self.started = time.perf_counter()
+        self.total = self.sql = self.template = 0.0
+        self.queries = self.hits = self.misses = 0
+        self.slow_after = slow_after  # seconds; 0 keeps no slow queries
+        self.repeat_over = repeat_over  # 0 doesn't count fingerprints
+        self.slow = []  # (seconds, querylog.Query)
+        self.seen = {}  # fingerprint digest -> [count, seconds, first querylog.Query]
+        self._lock = threading.Lock()  # queries may run on several pool threads at once
+
+    def add_query(self, seconds, sql="", params=None, many=False, alias="default"):
+        with self._lock:
+            self.queries += 1
+            self.sql += seconds
+        if not (self.slow_after or self.repeat_over):
+            return
+        fingerprint = querylog.fingerprint(sql)
+        if fingerprint is None:
+            return
+        query = querylog.Query(sql, params, many, alias)
+        with self._lock:
+            if self.slow_after and seconds >= self.slow_after:
+                self.slow.append((seconds, query))
+            if self.repeat_over:
+                seen = self.seen.get(fingerprint[0])
+                if seen is None:
+                    self.seen[fingerprint[0]] = [1, seconds, query]
+                else:
+                    seen[0] += 1
+                    seen[1] += seconds
+
+    def add_template(self, seconds):
+        with self._lock:
+            self.template += seconds
+
+    def add_cache_lookup(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def server_timing(self):
+        return (
+            f'db;dur={self.sql * 1000:.1f};desc="{self.queries} queries", '
+            f"tpl;dur={self.template * 1000:.1f}, "
+            f'cache;desc="{self.hits} hits, {self.misses} misses", '
+            f"total;dur={self.total * 1000:.1f}"
+        )
+
+
+def start():
+    """Begin collecting for the current request; returns (metrics, token for ``stop``)."""
+    metrics = RequestMetrics(settings.QUERY_LOG_SLOW_MS / 1000, settings.QUERY_LOG_REPEAT_THRESHOLD)
+    return metrics, _current.set(metrics)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    t0 = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(time.perf_counter() - t0, sql, params, many, context["connection"].alias)
+
+
+def install_query_wrapper(sender, connection, **kwargs):
+    """``connection_created`` receiver; the wrapper list outlives reconnects, so add it once."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def count_cache(hit):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.add_cache_lookup(hit)
+
+
+class TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return self.template.render(context, request)
+        t0 = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            metrics.add_template(time.perf_counter() - t0)
+
+
+class TimedTemplates(DjangoTemplates):
+    """The Django template backend, timing each render for the request metrics."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+# Aggregation -------------------------------------------------------------
+
+def _empty():
+    view = {"count": 0}
+    for name, _, buckets, _ in HISTOGRAMS:
+        view[name] = [0] * (len(buckets) + 1)  # the last slot is +Inf
+        view[f"{name}_sum"] = 0
+    for name, _, _ in COUNTERS:
+        view[name] = 0
+    return view
+
+
+def record(view_name, metrics):
+    """Add a finished request to this process's histograms; True when a flush is due."""
+    with _lock:
+        view = _views.get(view_name)
+        if view is None:
+            view = _views[view_name] = _empty()
+        view["count"] += 1
+        for name, attr, buckets, _ in HISTOGRAMS:
+            value = getattr(metrics, attr)
+            view[name][bisect_left(buckets, value)] += 1
+            view[f"{name}_sum"] += value
+        for name, attr, _ in COUNTERS:
+            view[name] += getattr(metrics, attr)
+    return time.monotonic() - _last_flush >= settings.METRICS_FLUSH_SECONDS
+
+
+def _shared():
+    return getattr(cache, "shared", cache)
+
+
+def flush():
+    """Write this process's cumulative histograms to the shared cache tier."""
+    global _last_flush
+    with _lock:
+        _last_flush = time.monotonic()
+        snapshot = {view: {k: list(v) if isinstance(v, list) else v for k, v in data.items()}
+                    for view, data in _views.items()}
+    shared = _shared()
+    shared.set(SNAPSHOT_KEY.format(_process), snapshot, timeout=SNAPSHOT_TIMEOUT)
+    processes = shared.get(PROCESSES_KEY, [])
+    if _process not in processes:
+        # Two processes registering at once can drop one; it re-registers on its next flush.
+        shared.set(PROCESSES_KEY, [*processes, _process], timeout=None)
+
+
+def collect():
+    """Every live process's histograms added together, per view."""
+    flush()
+    shared = _shared()
+    processes = shared.get(PROCESSES_KEY, [])
+    snapshots = shared.get_many([SNAPSHOT_KEY.format(p) for p in processes])
+    live = [p for p in processes if SNAPSHOT_KEY.format(p) in snapshots]
+    if len(live) < len(processes):
+        shared.set(PROCESSES_KEY, live, timeout=None)
+
+    merged = {}
+    for snapshot in snapshots.values():
+        for view, data in snapshot.items():
+            into = merged.setdefault(view, _empty())
+            for key, value in data.items():
+                if isinstance(value, list):
+                    into[key] = [a + b for a, b in zip(into[key], value)]
+                else:
+                    into[key] += value
+    return merged
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def prometheus_text():
+    """``collect()`` in the Prometheus text exposition format (version 0.0.4)."""
+    views = sorted(collect().items())
+    lines = []
+    for name, _, buckets, help_text in HISTOGRAMS:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for view, data in views:
+            label = f'view="{_label(view)}"'
+            running = 0
+            for bound, n in zip((*buckets, "+Inf"), data[name]):
+                running += n
+                lines.append(f'{name}_bucket{{{label},le="{bound}"}} {running}')
+            lines.append(f"{name}_sum{{{label}}} {_number(data[f'{name}_sum'])}")
+            lines.append(f"{name}_count{{{label}}} {data['count']}")
+    for name, _, help_text in COUNTERS:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for view, data in views:
+            lines.append(f'{name}{{view="{_label(view)}"}} {_number(data[name])}')
+    return "\n".join(lines) + "\n"
@@ -2,30 +2,41 @@ from django.conf import settings
 from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
 
-def send_low_stock_digest(products, to_email=None):
-    to_email = to_email or settings.MANAGER_EMAIL
-    if not products:
-        return 0
+def render_low_stock_digest(products):
+    """(subject, text, html) for a low-stock digest; products may be models or value dicts."""
     ctx = {"products": products}
     subject = "Stocker • Low stock alert"
     text = render_to_string("email/low_stock.txt", ctx)
     html = render_to_string("email/low_stock.html", ctx)
-    msg = EmailMultiAlternatives(subject, text, settings.DEFAULT_FROM_EMAIL, [to_email])
+    return subject, text, html
+
+def render_expiry_digest(products, days):
+    ctx = {"products": products, "days": days}
+    subject = f"Stocker • Items expiring in ≤ {days} days"
+    text = render_to_string("email/expiry.txt", ctx)
+    html = render_to_string("email/expiry.html", ctx)
+    return subject, text, html
+
+def make_message(subject, text, html, to_email, connection=None):
+    msg = EmailMultiAlternatives(subject, text, settings.DEFAULT_FROM_EMAIL, [to_email], connection=connection)
     msg.attach_alternative(html, "text/html")
-    msg.send()
+    return msg
+
+def build_low_stock_message(products, to_email=None, connection=None):
+    to_email = to_email or settings.MANAGER_EMAIL
+    return make_message(*render_low_stock_digest(products), to_email, connection=connection)
+
+def send_low_stock_digest(products, to_email=None):
+    if not products:
+        return 0
+    build_low_stock_message(products, to_email).send()
     return len(products)
 
 def send_expiry_digest(products, days, to_email=None):
     to_email = to_email or settings.MANAGER_EMAIL
     if not products:
         return 0
-    ctx = {"products": products, "days": days}
-    subject = f"Stocker • Items expiring in ≤ {days} days"
-    text = render_to_string("email/expiry.txt", ctx)
-    html = render_to_string("email/expiry.html", ctx)
-    msg = EmailMultiAlternatives(subject, text, settings.DEFAULT_FROM_EMAIL, [to_email])
-    msg.attach_alternative(html, "text/html")
-    msg.send()
+    make_message(*render_expiry_digest(products, days), to_email).send()
     return len(products)
 
 def send_low_stock_single(product, to_email=None):
@@ -0,0 +1,174 @@
+"""Keyset (cursor) pagination.
+
+Pages are addressed by the last row seen, ``(sort value, pk)``, instead of an
+OFFSET, so page N costs the same as page 1 and no COUNT(*) is needed to move
+around. Cursors are signed, opaque tokens; a token minted for another sort key
+(or tampered with) silently falls back to the first page.
+"""
+import datetime
+import decimal
+import hashlib
+
+from django.core import signing
+from django.db.models import Q
+from django.utils.functional import SimpleLazyObject, cached_property
+
+from .cache import cached_for_owner
+
+SALT = "stocker.keyset"
+
+
+class KeysetPage:
+    """Quacks enough like django.core.paginator.Page for ListView and templates.
+
+    Rows are fetched on first use (and ``total`` may be a callable), so a page
+    whose markup comes from the fragment cache never touches the database.
+    """
+
+    def __init__(self, load, total=None):
+        self._load = load
+        self._total = total
+
+    @cached_property
+    def _loaded(self):
+        return self._load()
+
+    @property
+    def object_list(self):
+        return self._loaded[0]
+
+    @property
+    def next_token(self):
+        return self._loaded[1]
+
+    @property
+    def previous_token(self):
+        return self._loaded[2]
+
+    @cached_property
+    def total(self):
+        return self._total() if callable(self._total) else self._total
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_token is not None
+
+    def has_previous(self):
+        return self.previous_token is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def _dump(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+def _field(qs, name):
+    if name in qs.query.annotations:
+        return qs.query.annotations[name].output_field
+    return qs.model._meta.get_field(name)
+
+
+def _token(key, obj, name, direction):
+    return signing.dumps({"k": key, "v": _dump(getattr(obj, name)), "i": obj.pk, "d": direction}, salt=SALT)
+
+
+def keyset_paginate(qs, key, per_page, token=None, total=None, owner_id=None):
+    """Return one KeysetPage of ``qs`` ordered by ``key`` (e.g. "name", "-created_at") then pk.
+
+    ``qs`` may also be a list of querysets with the same sort field and
+    disjoint primary keys (e.g. live and archived movements); each is read
+    with the same cursor and the results are merged. ``total`` may be a
+    number or a callable. Nothing is queried until the page is used. With
+    ``owner_id`` the page is cached until that owner's inventory version
+    changes.
+    """
+    sources = list(qs) if isinstance(qs, (list, tuple)) else [qs]
+
+    def load():
+        return _fetch_page(sources, key, per_page, token)
+
+    if owner_id is None:
+        return KeysetPage(load, total)
+
+    def cached_load():
+        query = "|".join([str(s.query) for s in sources] + [key, str(per_page), token or ""])
+        digest = hashlib.md5(query.encode()).hexdigest()
+        return cached_for_owner(owner_id, f"page:{sources[0].model._meta.label_lower}:{digest}", load)
+
+    return KeysetPage(cached_load, total)
+
+
+def _fetch_page(sources, key, per_page, token):
+    desc = key.startswith("-")
+    name = key.lstrip("-")
+
+    cursor = None
+    if token:
+        try:
+            cursor = signing.loads(token, salt=SALT)
+        except signing.BadSignature:
+            cursor = None
+        if cursor and cursor.get("k") != key:
+            cursor = None
+
+    forward = cursor is None or cursor["d"] == "n"
+    ascending = (not desc) if forward else desc
+    if cursor:
+        value = _field(sources[0], name).to_python(cursor["v"])
+        op = "gt" if ascending else "lt"
+        after = Q(**{f"{name}__{op}": value}) | Q(**{name: value, f"pk__{op}": cursor["i"]})
+        sources = [s.filter(after) for s in sources]
+
+    order = [name, "pk"] if ascending else [f"-{name}", "-pk"]
+    rows = []
+    for s in sources:
+        rows.extend(s.order_by(*order)[:per_page + 1])
+    if len(sources) > 1:
+        rows.sort(key=lambda o: (getattr(o, name), o.pk), reverse=not ascending)
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if not forward:
+        rows.reverse()
+
+    has_next = more if forward else cursor is not None
+    has_prev = cursor is not None if forward else more
+    return (
+        rows,
+        _token(key, rows[-1], name, "n") if rows and has_next else None,
+        _token(key, rows[0], name, "p") if rows and has_prev else None,
+    )
+
+
+def cached_count(qs, owner_id):
+    """COUNT(*) of ``qs``, cached until the owner's inventory version changes."""
+    digest = hashlib.md5(str(qs.query).encode()).hexdigest()
+    return cached_for_owner(owner_id, f"count:{qs.model._meta.label_lower}:{digest}", qs.count)
+
+
+class KeysetPaginationMixin:
+    """ListView mixin: paginate with keyset cursors (``?cursor=``) instead of ?page=."""
+
+    keyset_key = "pk"
+    paginate_by = 20
+
+    def get_keyset_key(self):
+        return self.keyset_key
+
+    def paginate_queryset(self, queryset, page_size):
+        page = keyset_paginate(
+            queryset, self.get_keyset_key(), page_size, self.request.GET.get("cursor"),
+            total=lambda: cached_count(queryset, self.request.user.pk),
+        )
+        # Lazy, like the page itself, for templates that cache the list markup.
+        return None, page, SimpleLazyObject(lambda: page.object_list), SimpleLazyObject(page.has_other_pages)
@@ -0,0 +1,177 @@
+"""Slow-query and repeated-query (N+1) findings, with query plans.
+
+The execute wrapper in ``inventory.utils.metrics`` hands every query a
+request runs to its ``RequestMetrics``, which keeps the ones slower than
+``QUERY_LOG_SLOW_MS`` and a count per normalized statement
+(``fingerprint``). When the request is done the middleware asks
+``findings`` for:
+
+* slow queries, one finding each;
+* fingerprints that ran more than ``QUERY_LOG_REPEAT_THRESHOLD`` times,
+  which is what a template looking up ``p.category`` per row looks like.
+
+``submit`` hands them to a single writer thread, so the response never
+waits on the log. The writer (``save``) adds the query plan (``EXPLAIN
+QUERY PLAN`` on SQLite, ``EXPLAIN`` elsewhere) and stores them in
+``QueryFinding``, which keeps about the newest ``QUERY_LOG_SIZE`` rows.
+The writer thread is outside any request, so its own queries are neither
+timed nor logged. Parameters of queries on the session and auth tables
+aren't stored.
+"""
+import hashlib
+import logging
+import re
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connections
+
+logger = logging.getLogger(__name__)
+
+KIND_SLOW = "slow"
+KIND_REPEATED = "repeated"
+MAX_PER_REQUEST = 20  # a runaway loop shouldn't turn into thousands of rows
+MAX_PARAMS = 500  # characters of repr(params) kept with a finding
+LOGGED = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")  # not SAVEPOINT, PRAGMA, ...
+REDACTED_TABLES = ('"django_session"', '"auth_')  # session keys, password hashes
+MAX_PENDING = 100  # requests waiting for the writer; findings past that are dropped
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDERS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")  # IN (?, ?, ?) and VALUES (?, ?)
+_ROWS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")  # bulk VALUES (...), (...)
+_SPACE = re.compile(r"\s+")
+
+Query = namedtuple("Query", "sql params many alias")
+
+_plans = {}  # fingerprint -> plan; the plan rarely changes with the parameters
+_PLANS_KEPT = 500
+_writer = None
+_writer_lock = threading.Lock()
+_pending = 0
+
+
+@lru_cache(maxsize=2048)
+def fingerprint(sql):
+    """(digest, normalized SQL) for a logged statement; None for anything else.
+
+    Literals and placeholders become ``?`` and lists of them ``(...)``, so
+    the same query with other values (or another number of IN values) has
+    the same fingerprint.
+    """
+    head = sql.lstrip()[:6].upper()
+    if not head.startswith(LOGGED):
+        return None
+    normalized = sql.replace("%s", "?")
+    normalized = _STRING.sub("?", normalized)
+    normalized = _NUMBER.sub("?", normalized)
+    normalized = _PLACEHOLDERS.sub("(...)", normalized)
+    normalized = _ROWS.sub("(...)", normalized)
+    normalized = _SPACE.sub(" ", normalized).strip()
+    return hashlib.sha1(normalized.encode()).hexdigest()[:16], normalized
+
+
+def findings(collected):
+    """Slow and repeated queries from a finished request's ``RequestMetrics``, worst first."""
+    found = [
+        {"kind": KIND_SLOW, "count": 1, "seconds": seconds, "query": query}
+        for seconds, query in sorted(collected.slow, key=lambda item: -item[0])
+    ]
+    if collected.repeat_over:
+        found += sorted(
+            ({"kind": KIND_REPEATED, "count": count, "seconds": seconds, "query": query}
+             for count, seconds, query in collected.seen.values() if count > collected.repeat_over),
+            key=lambda item: -item["seconds"],
+        )
+    return found[:MAX_PER_REQUEST]
+
+
+def _format_plan(rows, vendor):
+    if vendor != "sqlite":
+        return "\n".join(" ".join(str(col) for col in row) for row in rows)
+    # EXPLAIN QUERY PLAN rows are (id, parent, notused, detail): indent by depth.
+    depth, lines = {0: -1}, []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node] + detail)
+    return "\n".join(lines)
+
+
+def explain(alias, sql, params, many):
+    """The query plan for ``sql``, or the error that stopped us getting one."""
+    connection = connections[alias]
+    if many:
+        params = next(iter(params), None)
+    prefix = "EXPLAIN QUERY PLAN " if connection.vendor == "sqlite" else "EXPLAIN "
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return _format_plan(cursor.fetchall(), connection.vendor)
+    except Exception as exc:  # a plan is best effort; keep the finding anyway
+        return f"(no plan: {exc})"
+
+
+def _plan(digest, query):
+    plan = _plans.get(digest)
+    if plan is None:
+        if len(_plans) >= _PLANS_KEPT:
+            _plans.clear()
+        plan = _plans[digest] = explain(query.alias, query.sql, query.params, query.many)
+    return plan
+
+
+def _params(query):
+    if any(table in query.sql for table in REDACTED_TABLES):
+        return "(redacted)"
+    return repr(query.params)[:MAX_PARAMS]
+
+
+def save(found, view_name, path):
+    """Store ``findings`` for a request with their plans; never raises."""
+    from ..models import QueryFinding  # models -> cache -> metrics -> here
+
+    try:
+        rows = []
+        for item in found:
+            query = item["query"]
+            digest, normalized = fingerprint(query.sql)
+            rows.append(QueryFinding(
+                kind=item["kind"],
+                view_name=view_name,
+                path=path[:500],
+                fingerprint=digest,
+                sql=normalized,
+                example=query.sql,
+                params=_params(query),
+                count=item["count"],
+                duration_ms=item["seconds"] * 1000,
+                plan=_plan(digest, query),
+            ))
+        QueryFinding.store(rows, settings.QUERY_LOG_SIZE)
+    except DatabaseError as exc:
+        logger.warning("Could not save query findings for %s: %s", path, exc)
+
+
+def _write(found, view_name, path):
+    global _pending
+    try:
+        close_old_connections()  # the writer thread's connection outlives requests
+        save(found, view_name, path)
+    finally:
+        with _writer_lock:
+            _pending -= 1
+
+
+def submit(found, view_name, path):
+    """Queue a request's findings for the writer thread; a Future, or None if they were dropped."""
+    global _writer, _pending
+    with _writer_lock:
+        if _pending >= MAX_PENDING:
+            return None
+        _pending += 1
+        if _writer is None:
+            _writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="stocker-querylog")
+    return _writer.submit(_write, found, view_name, path)
@@ -0,0 +1,200 @@
+"""The Reports page, computed in one place.
+
+``build_report`` reads every section inside one read transaction, so the
+totals, tables and charts all describe the same moment even while stock is
+moving. It makes one grouped pass over the owner's products (per-category
+rows and the headline totals together), reads the suppliers with their
+precomputed totals (``SupplierSnapshot``), one grouped pass over the daily
+movement rollup, plus the two short lists (latest movements and
+low stock).
+
+The result only holds dicts, lists, strings, numbers, dates and Decimals. It
+pickles into any cache backend and dumps with ``DjangoJSONEncoder``.
+``report_for`` caches it per (owner, start, end) under the owner's inventory
+version, so any stock or catalogue change retires it. ``areport_for`` is the
+same for async views, reading the sections concurrently on a miss.
+"""
+from contextlib import contextmanager
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum, Value as V
+from django.db.models.functions import Coalesce
+
+from . import aio, ledger
+from .cache import acached_for_owner, cached_for_owner, inventory_version
+from .pagination import keyset_paginate
+
+RECENT_MOVEMENTS = 20
+LOW_STOCK_ROWS = 20
+TOP_SUPPLIERS = 8
+
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+
+
+@contextmanager
+def read_transaction():
+    """One consistent snapshot for every query inside the block."""
+    outermost = not connection.in_atomic_block
+    mode = None
+    if outermost and connection.vendor == "sqlite":
+        connection.ensure_connection()
+        if connection.transaction_mode == "IMMEDIATE":
+            # The "production" profile makes every atomic block BEGIN
+            # IMMEDIATE so writers can't deadlock upgrading their lock; a
+            # report only reads, and a deferred BEGIN gets its WAL snapshot
+            # without queueing behind (and blocking) the writers.
+            mode, connection.transaction_mode = connection.transaction_mode, None
+    try:
+        with transaction.atomic():
+            if outermost and connection.vendor == "postgresql":
+                # Read committed would give each statement its own snapshot.
+                with connection.cursor() as cursor:
+                    cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY")
+            yield
+    finally:
+        if mode is not None:
+            connection.transaction_mode = mode
+
+
+def _categories(owner):
+    value = ExpressionWrapper(F("quantity_on_hand") * F("price_cost"), output_field=MONEY)
+    return list(
+        owner.products.values("category__id", "category__name")
+        .annotate(
+            product_count=Count("id"),
+            on_hand=Coalesce(Sum("quantity_on_hand"), V(0)),
+            value=Coalesce(Sum(value), V(0), output_field=MONEY),
+            low_stock=Count("id", filter=Q(quantity_on_hand__lte=F("reorder_level"))),
+        )
+        .order_by("category__name")
+    )
+
+
+def _suppliers(owner):
+    from inventory.models import SupplierSnapshot
+    from suppliers.models import Supplier
+
+    return list(
+        SupplierSnapshot.with_totals(Supplier.objects.filter(owner=owner))
+        .order_by("name")
+        .values("pk", "name", "product_count", "on_hand", "value")
+    )
+
+
+def _recent_movements(owner, start, end):
+    page = keyset_paginate(
+        [qs.select_related("product") for qs in ledger.sources(owner, start=start, end=end)],
+        "-created_at", RECENT_MOVEMENTS,
+    )
+    return [
+        {
+            "created_at": m.created_at,
+            "product_id": m.product_id,
+            "product_name": m.product.name,
+            "movement_type": m.movement_type,
+            "movement_type_display": m.get_movement_type_display(),
+            "quantity": m.quantity,
+            "resulting_quantity": m.resulting_quantity,
+            "reason": m.reason,
+        }
+        for m in page.object_list
+    ]
+
+
+def _low_stock(owner):
+    return list(
+        owner.products.filter(quantity_on_hand__lte=F("reorder_level"))
+        .order_by("name")
+        .values("pk", "name", "sku", "category__name", "quantity_on_hand", "reorder_level")[:LOW_STOCK_ROWS]
+    )
+
+
+def _daily(owner, start, end):
+    from inventory.models import MovementDailyRollup
+
+    return list(MovementDailyRollup.daily_series(owner, start, end))
+
+
+def _sections(owner, start, end):
+    """Zero-argument readers for every section, in ``_assemble``'s argument order."""
+    return (
+        lambda: _categories(owner),
+        lambda: _suppliers(owner),
+        lambda: _daily(owner, start, end),
+        lambda: _recent_movements(owner, start, end),
+        lambda: _low_stock(owner),
+    )
+
+
+def _assemble(start, end, categories, suppliers, daily, recent, low_stock):
+    inv = {
+        "total_products": sum(r["product_count"] for r in categories),
+        "total_on_hand": sum(r["on_hand"] for r in categories),
+        "total_value": sum((r["value"] for r in categories), Decimal(0)).quantize(Decimal("0.01")),
+        "low_stock": sum(r["low_stock"] for r in categories),
+    }
+
+    chart_in = [int(row["in_qty"] or 0) for row in daily]
+    chart_out = [int(row["out_qty"] or 0) for row in daily]
+    chart_adj = [int(row["adj_qty"] or 0) for row in daily]
+    mv = {"in_qty": sum(chart_in), "out_qty": sum(chart_out), "adj_qty": sum(chart_adj)}
+    mv["net_change"] = mv["in_qty"] - mv["out_qty"] + mv["adj_qty"]
+
+    top_suppliers = sorted(suppliers, key=lambda s: s["value"], reverse=True)[:TOP_SUPPLIERS]
+    return {
+        "start": start,
+        "end": end,
+        "inv": inv,
+        "mv": mv,
+        "category_rows": categories,
+        "supplier_rows": suppliers,
+        "recent_movements": recent,
+        "low_stock_list": low_stock,
+        "chart_mov_labels": [row["day"].strftime("%Y-%m-%d") for row in daily],
+        "chart_mov_in": chart_in,
+        "chart_mov_out": chart_out,
+        "chart_mov_adj": chart_adj,
+        "chart_mov_net": [i - o + a for i, o, a in zip(chart_in, chart_out, chart_adj)],
+        "chart_cat_labels": [r["category__name"] or "Uncategorized" for r in categories],
+        "chart_cat_values": [float(r["value"]) for r in categories],
+        "chart_sup_labels": [s["name"] for s in top_suppliers],
+        "chart_sup_values": [float(s["value"]) for s in top_suppliers],
+    }
+
+
+def build_report(owner, start, end):
+    """Every section of the Reports page for ``owner`` between two dates (inclusive)."""
+    with read_transaction():
+        sections = [read() for read in _sections(owner, start, end)]
+    return _assemble(start, end, *sections)
+
+
+async def abuild_report(owner, start, end):
+    """``build_report`` with the sections read concurrently (``aio.gather``).
+
+    Each section reads on its own connection, so there is no shared snapshot.
+    If the owner's inventory version moved while they ran, a write landed in
+    between and the sections may disagree, so the report is rebuilt in one
+    read transaction.
+    """
+    version = await sync_to_async(inventory_version)(owner.pk)
+    sections = await aio.gather(*_sections(owner, start, end))
+    if await sync_to_async(inventory_version)(owner.pk) != version:
+        return await sync_to_async(build_report)(owner, start, end)
+    return _assemble(start, end, *sections)
+
+
+def report_for(owner, start, end):
+    """``build_report``, cached until the owner's inventory version changes."""
+    return cached_for_owner(
+        owner.pk, f"report:{start:%Y-%m-%d}:{end:%Y-%m-%d}", lambda: build_report(owner, start, end),
+    )
+
+
+async def areport_for(owner, start, end):
+    """``report_for`` for async views, built with ``abuild_report`` on a miss."""
+    return await acached_for_owner(
+        owner.pk, f"report:{start:%Y-%m-%d}:{end:%Y-%m-%d}", lambda: abuild_report(owner, start, end),
+    )
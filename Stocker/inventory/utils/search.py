@@ -0,0 +1,229 @@
+"""Search index for products, suppliers and categories.
+
+List views call ``get_backend().filter(qs, kind, owner_id, q)`` instead of
+OR-ing ``icontains`` across joins. The index is kept current by the signals in
+``inventory/signals.py`` and can be rebuilt with ``manage.py rebuild_search_index``.
+
+``SQLiteFTSBackend`` keeps one FTS5 table per kind whose rowid is the object's
+primary key, so a search is a single indexed MATCH used as a subquery.
+``DatabaseSearchBackend`` is the portable fallback (plain ``icontains``); other
+engines can plug in by subclassing ``SearchBackend`` and pointing
+``settings.STOCKER_SEARCH_BACKEND`` at the class.
+"""
+import re
+from abc import ABC, abstractmethod
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+# kind -> (FTS table, indexed columns, bm25 weights for those columns)
+INDEXES = {
+    "product": ("search_product", ("name", "sku", "extra"), (10.0, 5.0, 1.0)),
+    "supplier": ("search_supplier", ("name", "contact"), (10.0, 2.0)),
+    "category": ("search_category", ("name", "description"), (10.0, 1.0)),
+}
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_CHUNK = 500
+
+
+def tokenize(q):
+    return _TOKEN_RE.findall(q or "")
+
+
+class SearchBackend(ABC):
+    """Interface the views and signals talk to; the index hooks default to doing nothing."""
+
+    @abstractmethod
+    def filter(self, qs, kind, owner_id, q, ranked=False):
+        """``qs`` narrowed to ``owner_id``'s objects of ``kind`` matching ``q``."""
+
+    def index_products(self, ids):
+        pass
+
+    def index_suppliers(self, ids):
+        pass
+
+    def index_categories(self, ids):
+        pass
+
+    def remove(self, kind, ids):
+        pass
+
+    def rebuild(self, owner_id=None):
+        pass
+
+
+class DatabaseSearchBackend(SearchBackend):
+    """No index: the previous icontains lookups, for engines without FTS."""
+
+    LOOKUPS = {
+        "product": ("name", "sku", "category__name", "suppliers__name"),
+        "supplier": ("name", "email", "phone", "website"),
+        "category": ("name", "description"),
+    }
+
+    def filter(self, qs, kind, owner_id, q, ranked=False):
+        cond = Q()
+        for field in self.LOOKUPS[kind]:
+            cond |= Q(**{f"{field}__icontains": q})
+        qs = qs.filter(cond)
+        return qs.distinct() if kind == "product" else qs
+
+
+class SQLiteFTSBackend(SearchBackend):
+    """FTS5 tables with prefix indexes and bm25 ranking."""
+
+    @staticmethod
+    def ensure_tables(schema_connection=None):
+        with (schema_connection or connection).cursor() as cursor:
+            for table, columns, _ in INDEXES.values():
+                cursor.execute(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+                    f"owner, {', '.join(columns)}, prefix='2 3', tokenize='unicode61 remove_diacritics 2')"
+                )
+
+    @staticmethod
+    def match_expression(owner_id, q, kind):
+        tokens = tokenize(q)
+        if not tokens:
+            return None
+        _, columns, _ = INDEXES[kind]
+        terms = " AND ".join('"%s"*' % t.replace('"', '""') for t in tokens)
+        return f'owner:"o{owner_id}" AND {{{" ".join(columns)}}}: ({terms})'
+
+    def filter(self, qs, kind, owner_id, q, ranked=False):
+        match = self.match_expression(owner_id, q, kind)
+        if match is None:
+            return qs
+        table, _, weights = INDEXES[kind]
+        qs = qs.filter(pk__in=RawSQL(f"SELECT rowid FROM {table} WHERE {table} MATCH %s", [match]))
+        if ranked:
+            pk_col = f"{qs.model._meta.db_table}.{qs.model._meta.pk.column}"
+            rank = RawSQL(
+                f"(SELECT bm25({table}, 0, {', '.join(map(str, weights))}) FROM {table} "
+                f"WHERE {table} MATCH %s AND rowid = {pk_col})",
+                [match],
+                output_field=FloatField(),
+            )
+            # bm25 is lower-is-better.
+            qs = qs.annotate(search_rank=rank).order_by("search_rank", *qs.query.order_by)
+        return qs
+
+    def _write(self, kind, rows, ids):
+        table, columns, _ = INDEXES[kind]
+        ids = list(ids)
+        placeholders = ", ".join(["%s"] * (len(columns) + 2))
+        with connection.cursor() as cursor:
+            for i in range(0, len(ids), _CHUNK):
+                chunk = ids[i:i + _CHUNK]
+                cursor.execute(
+                    f"DELETE FROM {table} WHERE rowid IN ({', '.join(['%s'] * len(chunk))})", chunk,
+                )
+            if rows:
+                cursor.executemany(
+                    f"INSERT INTO {table} (rowid, owner, {', '.join(columns)}) VALUES ({placeholders})", rows,
+                )
+
+    def index_products(self, ids):
+        from inventory.models import Product
+
+        ids = list(ids)
+        for i in range(0, len(ids), _CHUNK):
+            chunk = ids[i:i + _CHUNK]
+            sup_names = {}
+            links = Product.suppliers.through.objects.filter(product_id__in=chunk).values_list("product_id", "supplier__name")
+            for pid, name in links:
+                sup_names.setdefault(pid, []).append(name)
+            rows = [
+                (pk, f"o{owner_id}", name, sku, " ".join([cat or "", *sup_names.get(pk, [])]))
+                for pk, owner_id, name, sku, cat in
+                Product.objects.filter(pk__in=chunk).values_list("pk", "owner_id", "name", "sku", "category__name")
+            ]
+            self._write("product", rows, chunk)
+
+    def index_suppliers(self, ids):
+        from suppliers.models import Supplier
+
+        ids = list(ids)
+        for i in range(0, len(ids), _CHUNK):
+            chunk = ids[i:i + _CHUNK]
+            rows = [
+                (pk, f"o{owner_id}", name, " ".join([email, phone, website]))
+                for pk, owner_id, name, email, phone, website in
+                Supplier.objects.filter(pk__in=chunk).values_list("pk", "owner_id", "name", "email", "phone", "website")
+            ]
+            self._write("supplier", rows, chunk)
+
+    def index_categories(self, ids):
+        from inventory.models import Category
+
+        ids = list(ids)
+        for i in range(0, len(ids), _CHUNK):
+            chunk = ids[i:i + _CHUNK]
+            rows = [
+                (pk, f"o{owner_id}", name, description)
+                for pk, owner_id, name, description in
+                Category.objects.filter(pk__in=chunk).values_list("pk", "owner_id", "name", "description")
+            ]
+            self._write("category", rows, chunk)
+
+    def remove(self, kind, ids):
+        self._write(kind, [], ids)
+
+    # Set-based (re)population, used by the migration and the rebuild command.
+    # Each statement aliases its base table by the kind's first letter.
+    POPULATE_SQL = {
+        "product": (
+            "INSERT INTO search_product (rowid, owner, name, sku, extra) "
+            "SELECT p.id, 'o' || p.owner_id, p.name, p.sku, "
+            "COALESCE(c.name, '') || ' ' || COALESCE((SELECT group_concat(s.name, ' ') "
+            "FROM inventory_product_suppliers ps JOIN suppliers_supplier s ON s.id = ps.supplier_id "
+            "WHERE ps.product_id = p.id), '') "
+            "FROM inventory_product p LEFT JOIN inventory_category c ON c.id = p.category_id {where}"
+        ),
+        "supplier": (
+            "INSERT INTO search_supplier (rowid, owner, name, contact) "
+            "SELECT s.id, 'o' || s.owner_id, s.name, s.email || ' ' || s.phone || ' ' || s.website "
+            "FROM suppliers_supplier s {where}"
+        ),
+        "category": (
+            "INSERT INTO search_category (rowid, owner, name, description) "
+            "SELECT c.id, 'o' || c.owner_id, c.name, c.description FROM inventory_category c {where}"
+        ),
+    }
+
+    @classmethod
+    def populate(cls, owner_id=None, schema_connection=None):
+        with (schema_connection or connection).cursor() as cursor:
+            for kind, sql in cls.POPULATE_SQL.items():
+                table = INDEXES[kind][0]
+                if owner_id is None:
+                    cursor.execute(f"DELETE FROM {table}")
+                    cursor.execute(sql.format(where=""))
+                else:
+                    cursor.execute(f"DELETE FROM {table} WHERE {table} MATCH %s", [f'owner:"o{owner_id}"'])
+                    cursor.execute(sql.format(where=f"WHERE {kind[0]}.owner_id = %s"), [owner_id])
+
+    def rebuild(self, owner_id=None):
+        self.ensure_tables()
+        self.populate(owner_id)
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        path = getattr(settings, "STOCKER_SEARCH_BACKEND", None)
+        if path:
+            _backend = import_string(path)()
+        elif connection.vendor == "sqlite":
+            _backend = SQLiteFTSBackend()
+        else:
+            _backend = DatabaseSearchBackend()
+    return _backend
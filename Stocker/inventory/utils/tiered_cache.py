@@ -0,0 +1,165 @@
+"""Two-tier cache backend: a small per-process LRU in front of a shared cache.
+
+    CACHES = {
+        "default": {
+            "BACKEND": "inventory.utils.tiered_cache.TieredCache",
+            "LOCATION": "shared",  # alias of the L2 cache
+            "OPTIONS": {"L1_TIMEOUT": 5, "L1_MAX_ENTRIES": 1000},
+        },
+        "shared": {"BACKEND": "django.core.cache.backends.db.DatabaseCache", ...},
+    }
+
+Reads try L1 (this process's memory) first, then L2, and copy L2 hits into
+L1 for at most ``L1_TIMEOUT`` seconds. Writes go to L2 and refresh this
+process's L1. Other processes may keep serving their L1 copy until it
+expires, so anything that has to be current everywhere (counters, version
+keys, cooldowns claimed with ``add``) should go straight to ``shared``.
+``incr``/``decr``/``add`` always do. Values cached under a versioned key
+never change, so a stale L1 copy of one is harmless: bumping the version
+moves every reader to new keys.
+
+L1 pickles values the way LocMemCache does, so callers can't mutate a cached
+object through the reference they got back.
+"""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.functional import cached_property
+
+_MISSING = object()
+
+
+class TieredCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get("OPTIONS", {})
+        self._shared_alias = location or "shared"
+        self.l1_timeout = float(options.get("L1_TIMEOUT", 5))
+        self.l1_max_entries = int(options.get("L1_MAX_ENTRIES", 1000))
+        self._l1 = OrderedDict()
+        self._lock = threading.Lock()
+
+    @cached_property
+    def shared(self):
+        """The L2 cache every process sees."""
+        return caches[self._shared_alias]
+
+    # L1 ------------------------------------------------------------------
+
+    def _l1_key(self, key, version):
+        return key, self.shared.version if version is None else version
+
+    def _l1_get(self, key):
+        with self._lock:
+            entry = self._l1.get(key)
+            if entry is None:
+                return _MISSING
+            expires, data = entry
+            if expires <= time.monotonic():
+                del self._l1[key]
+                return _MISSING
+            self._l1.move_to_end(key)
+        return pickle.loads(data)
+
+    def _l1_set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        ttl = self.l1_timeout
+        if timeout is not DEFAULT_TIMEOUT and timeout is not None:
+            ttl = min(ttl, timeout)
+        if ttl <= 0:
+            self._l1_delete(key)
+            return
+        data = pickle.dumps(value, self.pickle_protocol)
+        with self._lock:
+            self._l1[key] = (time.monotonic() + ttl, data)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self.l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def _l1_delete(self, key):
+        with self._lock:
+            self._l1.pop(key, None)
+
+    def clear_local(self):
+        """Drop this process's L1 copies only."""
+        with self._lock:
+            self._l1.clear()
+
+    # Cache API -----------------------------------------------------------
+
+    def get(self, key, default=None, version=None):
+        local = self._l1_key(key, version)
+        value = self._l1_get(local)
+        if value is not _MISSING:
+            return value
+        value = self.shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            return default
+        self._l1_set(local, value)
+        return value
+
+    def get_many(self, keys, version=None):
+        found, remote = {}, []
+        for key in keys:
+            value = self._l1_get(self._l1_key(key, version))
+            if value is _MISSING:
+                remote.append(key)
+            else:
+                found[key] = value
+        if remote:
+            fetched = self.shared.get_many(remote, version=version)
+            for key, value in fetched.items():
+                self._l1_set(self._l1_key(key, version), value)
+            found.update(fetched)
+        return found
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout=timeout, version=version)
+        self._l1_set(self._l1_key(key, version), value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout=timeout, version=version)
+        for key, value in data.items():
+            if key not in failed:
+                self._l1_set(self._l1_key(key, version), value, timeout)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        local = self._l1_key(key, version)
+        if self.shared.add(key, value, timeout=timeout, version=version):
+            self._l1_set(local, value, timeout)
+            return True
+        self._l1_delete(local)
+        return False
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout=timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        self._l1_delete(self._l1_key(key, version))
+        return self.shared.incr(key, delta, version=version)
+
+    def decr(self, key, delta=1, version=None):
+        self._l1_delete(self._l1_key(key, version))
+        return self.shared.decr(key, delta, version=version)
+
+    def delete(self, key, version=None):
+        self._l1_delete(self._l1_key(key, version))
+        return self.shared.delete(key, version=version)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self._l1_delete(self._l1_key(key, version))
+        self.shared.delete_many(keys, version=version)
+
+    def clear(self):
+        self.clear_local()
+        self.shared.clear()
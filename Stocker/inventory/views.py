@@ -1,38 +1,51 @@
+from asgiref.sync import sync_to_async
 from django.contrib.auth.decorators import login_required, permission_required
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
-from django.http import HttpResponse
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_POST
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, TemplateView
 from datetime import timedelta
 from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+from django.core.exceptions import PermissionDenied
 from django.db.models import (
-    Q, Count, F, Sum, Case, When, IntegerField, DecimalField, ExpressionWrapper, Value as V
+    Count, F, Case, When, DecimalField, ExpressionWrapper, Max, Sum, Value as V
 )
-from django.db.models.functions import Coalesce, TruncDate
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse_lazy
 from django.views.generic import TemplateView
 
-from .models import Product, StockMovement, Category
-from .forms import ProductForm, StockAdjustForm, CategoryForm
+from .models import Product, StockMovement, Category, QueryFinding, SupplierSnapshot
+from .forms import ProductForm, StockAdjustForm, CategoryForm, ProductImportForm
+from .utils import ledger
+from .utils.export import FORMATS as EXPORT_FORMATS, export_movements, resolve_format
+from .utils.importer import COLUMNS as IMPORT_COLUMNS, ImportFileError, ProductImporter, error_report, read_rows
+from .utils.pagination import KeysetPaginationMixin, keyset_paginate
+from .utils.reports import areport_for, report_for
+from .utils.search import get_backend as search_backend
 from suppliers.models import Supplier  # for supplier summaries in reports
 
 import csv
+import json
+import uuid
 
-class ProductListView(LoginRequiredMixin, ListView):
+class ProductListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Product
     template_name = "inventory/product_list.html"
     context_object_name = "products"
     paginate_by = 20
 
+    def get_keyset_key(self):
+        return "search_rank" if self.request.GET.get("q") else "name"
+
     def get_queryset(self):
         qs = Product.objects.select_related("category").filter(owner=self.request.user).order_by("name")
         q = self.request.GET.get("q")
         if q:
-            qs = qs.filter(
-                Q(name__icontains=q) |
-                Q(sku__icontains=q) |
-                Q(category__name__icontains=q)
-            )
+            qs = search_backend().filter(qs, "product", self.request.user.pk, q, ranked=True)
         status = self.request.GET.get("status")
         if status == "low":
             qs = qs.filter(quantity_on_hand__lte=F("reorder_level"))
@@ -51,7 +64,10 @@ class ProductDetailView(LoginRequiredMixin, DetailView):
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        ctx["movements"] = self.object.movements.all()[:20]
+        ctx["movements"] = keyset_paginate(
+            [qs.select_related("created_by") for qs in ledger.sources(product=self.object)],
+            "-created_at", 20, self.request.GET.get("cursor"),
+        )
         ctx["form"] = StockAdjustForm()
         return ctx
 
@@ -95,6 +111,46 @@ class ProductDeleteView(LoginRequiredMixin, PermissionRequiredMixin, DeleteView)
     def get_queryset(self):
         return Product.objects.filter(owner=self.request.user)
 
+def _import_report_path(user, report):
+    return f"import_reports/{user.pk}/{report}.csv"
+
+
+@login_required
+@permission_required("inventory.add_product", raise_exception=True)
+def product_import(request):
+    """Upload a CSV/XLSX of products and upsert them by SKU."""
+    result = None
+    form = ProductImportForm(request.POST or None, request.FILES or None)
+    if request.method == "POST" and form.is_valid():
+        upload = form.cleaned_data["file"]
+        try:
+            importer = ProductImporter(request.user, replace=form.cleaned_data["replace"])
+            result = importer.run(read_rows(upload.file, upload.name))
+        except ImportFileError as e:
+            form.add_error("file", str(e))
+        else:
+            if result["errors"]:
+                report = uuid.uuid4().hex
+                default_storage.save(
+                    _import_report_path(request.user, report),
+                    ContentFile(error_report(result["errors"]).encode()),
+                )
+                result["report"] = report
+    return render(request, "inventory/product_import.html", {
+        "form": form,
+        "result": result,
+        "columns": IMPORT_COLUMNS,
+    })
+
+
+@login_required
+def product_import_errors(request, report):
+    path = _import_report_path(request.user, report)
+    if not default_storage.exists(path):
+        raise Http404
+    return FileResponse(default_storage.open(path, "rb"), as_attachment=True, filename="import_errors.csv")
+
+
 @login_required
 @permission_required("inventory.add_stockmovement", raise_exception=True)
 def adjust_stock(request, pk):
@@ -114,6 +170,37 @@ def adjust_stock(request, pk):
         form = StockAdjustForm()
     return render(request, "inventory/stock_adjust_form.html", {"product": product, "form": form})
 
+@login_required
+@permission_required("inventory.add_stockmovement", raise_exception=True)
+@require_POST
+def adjust_stock_batch(request):
+    """Apply a burst of movements (scanner / POS sync) in one transaction.
+
+    Body: {"lines": [{"product_id": 1 | "sku": "A-1", "movement_type": "OUT",
+    "quantity": 2, "reason": "..."}, ...]}. Responds with per-line results.
+    """
+    try:
+        lines = json.loads(request.body or b"{}").get("lines")
+    except (ValueError, AttributeError):
+        return JsonResponse({"error": "invalid JSON body"}, status=400)
+    if not isinstance(lines, list) or not all(isinstance(l, dict) for l in lines):
+        return JsonResponse({"error": "lines must be a list of objects"}, status=400)
+    if len(lines) > settings.STOCK_BATCH_MAX_LINES:
+        return JsonResponse({"error": f"at most {settings.STOCK_BATCH_MAX_LINES} lines per batch"}, status=400)
+    for i, l in enumerate(lines):
+        if not isinstance(l.get("sku", ""), (str, type(None))):
+            return JsonResponse({"error": f"line {i}: sku must be a string"}, status=400)
+
+    # Resolve SKUs to ids with one lookup for the whole batch.
+    skus = {l["sku"] for l in lines if "product_id" not in l and l.get("sku")}
+    if skus:
+        by_sku = dict(Product.objects.filter(owner=request.user, sku__in=skus).values_list("sku", "id"))
+        lines = [l if "product_id" in l else {**l, "product_id": by_sku.get(l.get("sku"))} for l in lines]
+
+    results = StockMovement.apply_many(lines, user=request.user, owner=request.user)
+    applied = sum(1 for r in results if r["ok"])
+    return JsonResponse({"applied": applied, "failed": len(results) - applied, "results": results})
+
 class CategoryListView(LoginRequiredMixin, ListView):
     model = Category
     template_name = "inventory/category_list.html"
@@ -122,11 +209,13 @@ class CategoryListView(LoginRequiredMixin, ListView):
 
     def get_queryset(self):
         q = self.request.GET.get("q", "")
-        return (Category.objects
-                .annotate(product_count=Count("products"))
-                .filter(owner=self.request.user)
-                .filter(Q(name__icontains=q) | Q(description__icontains=q))
-                .order_by("name"))
+        qs = (Category.objects
+              .annotate(product_count=Count("products"))
+              .filter(owner=self.request.user)
+              .order_by("name"))
+        if q:
+            qs = search_backend().filter(qs, "category", self.request.user.pk, q)
+        return qs
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
@@ -189,162 +278,223 @@ class ReportsView(TemplateView):
             return redirect_to_login(next=request.get_full_path())
         return super().dispatch(request, *args, **kwargs)
 
+    def get(self, request, *args, **kwargs):
+        if request.GET.get("format") == "json":
+            start, end = _parse_dates(request)
+            return JsonResponse(report_for(request.user, start, end))
+        return super().get(request, *args, **kwargs)
+
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
         start, end = _parse_dates(self.request)
+        # Lazy so blocks served by {% ownercache %} skip the report entirely.
+        ctx.update(start=start, end=end, report=SimpleLazyObject(lambda: report_for(self.request.user, start, end)))
+        return ctx
 
-        # INVENTORY SUMMARY
-        value_expr = ExpressionWrapper(
-            F("quantity_on_hand") * F("price_cost"),
-            output_field=DecimalField(max_digits=14, decimal_places=2),
-        )
-        inv_agg = Product.objects.filter(owner=self.request.user).aggregate(
-            total_products=Count("id"),
-            total_on_hand=Coalesce(Sum("quantity_on_hand"), V(0)),
-            total_value=Coalesce(Sum(value_expr), V(0), output_field=DecimalField(max_digits=14, decimal_places=2)),
-            low_stock=Count(
-                Case(
-                    When(quantity_on_hand__lte=F("reorder_level"), then=1),
-                    output_field=IntegerField(),
-                )
-            ),
-        )
 
-        category_rows = (
-            Product.objects.filter(owner=self.request.user)
-            .values("category__id", "category__name")
-            .annotate(
-                product_count=Count("id"),
-                on_hand=Coalesce(Sum("quantity_on_hand"), V(0)),
-                value=Coalesce(Sum(value_expr), V(0), output_field=DecimalField(max_digits=14, decimal_places=2)),
-            )
-            .order_by("category__name")
-        )
+@login_required
+async def reports_async(request):
+    """``ReportsView`` for ASGI: a report miss reads its sections concurrently."""
+    user = await request.auser()
+    start, end = _parse_dates(request)
+    report = await areport_for(user, start, end)
+    if request.GET.get("format") == "json":
+        return JsonResponse(report)
+    return await sync_to_async(render)(
+        request, "inventory/reports.html", {"start": start, "end": end, "report": report},
+    )
 
-        mvs = StockMovement.objects.filter(product__owner=self.request.user, created_at__date__gte=start, created_at__date__lte=end)
-        mv_agg = mvs.aggregate(
-            in_qty=Coalesce(Sum(Case(When(movement_type="IN", then=F("quantity")), output_field=IntegerField())), V(0)),
-            out_qty=Coalesce(Sum(Case(When(movement_type="OUT", then=F("quantity")), output_field=IntegerField())), V(0)),
-            adj_qty=Coalesce(Sum(Case(When(movement_type="ADJ", then=F("quantity")), output_field=IntegerField())), V(0)),
-        )
-        mv_agg["net_change"] = mv_agg["in_qty"] - mv_agg["out_qty"] + mv_agg["adj_qty"]
 
-        recent_movements = (
-            mvs.select_related("product")
-               .order_by("-created_at")[:20]
-        )
+CSV_CHUNK_SIZE = 2000
 
-        p_val_expr = ExpressionWrapper(
-            F("products__quantity_on_hand") * F("products__price_cost"),
-            output_field=DecimalField(max_digits=14, decimal_places=2),
-        )
-        supplier_rows = (
-            Supplier.objects.filter(owner=self.request.user)
-            .annotate(
-                product_count=Count("products", distinct=True),
-                on_hand=Coalesce(Sum("products__quantity_on_hand"), V(0)),
-                value=Coalesce(Sum(p_val_expr), V(0), output_field=DecimalField(max_digits=14, decimal_places=2)),
-            )
-            .order_by("name")
-        )
 
-        daily = (
-            mvs.annotate(d=TruncDate("created_at"))
-               .values("d")
-               .annotate(
-                   in_qty=Coalesce(Sum(Case(When(movement_type="IN", then=F("quantity")), output_field=IntegerField())), V(0)),
-                   out_qty=Coalesce(Sum(Case(When(movement_type="OUT", then=F("quantity")), output_field=IntegerField())), V(0)),
-                   adj_qty=Coalesce(Sum(Case(When(movement_type="ADJ", then=F("quantity")), output_field=IntegerField())), V(0)),
-               )
-               .order_by("d")
-        )
-        
-        chart_mov_labels = [row["d"].strftime("%Y-%m-%d") for row in daily]
-        chart_mov_in  = [int(row["in_qty"] or 0)  for row in daily]
-        chart_mov_out = [int(row["out_qty"] or 0) for row in daily]
-        chart_mov_adj = [int(row["adj_qty"] or 0) for row in daily]
-        chart_mov_net = [i - o + a for i, o, a in zip(chart_mov_in, chart_mov_out, chart_mov_adj)]
-        
-        cat_labels = []
-        cat_values = []
-        for r in category_rows:
-            cat_labels.append(r["category__name"] or "Uncategorized")
-            cat_values.append(float(r["value"] or 0))
-        
-        top_suppliers = list(supplier_rows[:8])
-        sup_labels = [s.name for s in top_suppliers]
-        sup_values = [float(s.value or 0) for s in top_suppliers]
-        
-        ctx.update({
-            "chart_mov_labels": chart_mov_labels,
-            "chart_mov_in": chart_mov_in,
-            "chart_mov_out": chart_mov_out,
-            "chart_mov_adj": chart_mov_adj,
-            "chart_mov_net": chart_mov_net,
-            "chart_cat_labels": cat_labels,
-            "chart_cat_values": cat_values,
-            "chart_sup_labels": sup_labels,
-            "chart_sup_values": sup_values,
-        })
-
-        low_stock_list = (
-            Product.objects.filter(owner=self.request.user)
-            .filter(quantity_on_hand__lte=F("reorder_level"))
-            .select_related("category")
-            .order_by("name")[:20]
-        )
+class _Echo:
+    """File-like object whose write() just hands the row back to the caller."""
+    def write(self, value):
+        return value
 
-        ctx.update({
-            "start": start, "end": end,
-            "inv": inv_agg,
-            "category_rows": category_rows,
-            "mv": mv_agg,
-            "recent_movements": recent_movements,
-            "supplier_rows": supplier_rows,
-            "low_stock_list": low_stock_list,
-        })
-        return ctx
+
+def _stream_csv(filename, header, rows):
+    """Stream ``rows`` as CSV without ever building the file in memory."""
+    writer = csv.writer(_Echo())
+
+    def lines():
+        yield writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(lines(), content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
 
 
 @login_required
 def inventory_report_csv(request):
     """Export products inventory CSV."""
-    response = HttpResponse(content_type="text/csv")
-    response["Content-Disposition"] = 'attachment; filename="inventory_report.csv"'
-    writer = csv.writer(response)
-    writer.writerow(["SKU","Name","Category","On hand","Reorder level","Cost","Valuation","Low stock?"])
-    qs = Product.objects.select_related("category").filter(owner=request.user).order_by("name")
-    for p in qs:
-        valuation = (p.quantity_on_hand or 0) * (p.price_cost or 0)
-        writer.writerow([
-            p.sku, p.name, getattr(p.category, "name", "") or "",
-            p.quantity_on_hand, p.reorder_level,
-            p.price_cost, f"{valuation:.2f}",
-            "Yes" if p.quantity_on_hand <= p.reorder_level else "No",
-        ])
-    return response
+    qs = (
+        Product.objects.filter(owner=request.user)
+        .annotate(
+            valuation=ExpressionWrapper(
+                F("quantity_on_hand") * F("price_cost"),
+                output_field=DecimalField(max_digits=14, decimal_places=2),
+            ),
+            low=Case(When(quantity_on_hand__lte=F("reorder_level"), then=V("Yes")), default=V("No")),
+        )
+        .order_by("name")
+        .values_list(
+            "sku", "name", "category__name", "quantity_on_hand", "reorder_level",
+            "price_cost", "valuation", "low",
+        )
+    )
+    rows = (
+        (sku, name, cat or "", on_hand, reorder, cost, f"{valuation or 0:.2f}", low)
+        for sku, name, cat, on_hand, reorder, cost, valuation, low in qs.iterator(chunk_size=CSV_CHUNK_SIZE)
+    )
+    return _stream_csv(
+        "inventory_report.csv",
+        ["SKU","Name","Category","On hand","Reorder level","Cost","Valuation","Low stock?"],
+        rows,
+    )
 
 
 @login_required
 def supplier_report_csv(request):
     """Export supplier summary CSV."""
-    response = HttpResponse(content_type="text/csv")
-    response["Content-Disposition"] = 'attachment; filename="supplier_report.csv"'
-    writer = csv.writer(response)
-    writer.writerow(["Supplier","Products","On hand (sum)","Valuation (cost)"])
-    p_val_expr = ExpressionWrapper(
-        F("products__quantity_on_hand") * F("products__price_cost"),
-        output_field=DecimalField(max_digits=14, decimal_places=2),
-    )
     qs = (
-        Supplier.objects.filter(owner=request.user)
+        SupplierSnapshot.with_totals(Supplier.objects.filter(owner=request.user))
+        .order_by("name")
+        .values_list("name", "product_count", "on_hand", "value")
+    )
+    rows = (
+        (name, count, on_hand, f"{value:.2f}")
+        for name, count, on_hand, value in qs.iterator(chunk_size=CSV_CHUNK_SIZE)
+    )
+    return _stream_csv("supplier_report.csv", ["Supplier","Products","On hand (sum)","Valuation (cost)"], rows)
+
+
+@login_required
+def movement_report_csv(request):
+    """Export the movement history for ?start=&end= (defaults to last 30 days)."""
+    start, end = _parse_dates(request)
+    values = ledger.iter_values(
+        ledger.sources(request.user, start=start, end=end),
+        "created_at", "product__sku", "product__name", "movement_type", "quantity",
+        "resulting_quantity", "created_by__username", "reason",
+        chunk_size=CSV_CHUNK_SIZE,
+    )
+    rows = (
+        (created_at.strftime("%Y-%m-%d %H:%M:%S"), sku, name, mtype, qty, resulting, by or "", reason)
+        for created_at, sku, name, mtype, qty, resulting, by, reason in values
+    )
+    return _stream_csv(
+        f"movements_{start:%Y%m%d}_{end:%Y%m%d}.csv",
+        ["When","SKU","Product","Type","Qty","Resulting","By","Reason"],
+        rows,
+    )
+
+
+@login_required
+def analytics_report(request):
+    """ABC classes, turnover, days of cover and dead stock for ?start=&end=; ?format=csv for every product."""
+    from .utils import analytics
+
+    start, end = _parse_dates(request)
+    result = analytics.analyse(request.user, start, end)
+
+    if request.GET.get("format") == "csv":
+        rows = (
+            (r["sku"], r["name"], r["abc"], r["on_hand"], r["consumed"], f'{r["value"]:.2f}', r["daily_usage"],
+             "" if r["days_of_cover"] is None else r["days_of_cover"],
+             "" if r["turnover"] is None else r["turnover"], "yes" if r["dead"] else "")
+            for r in analytics.rows(result)
+        )
+        return _stream_csv(
+            f"analytics_{start:%Y%m%d}_{result['end']:%Y%m%d}.csv",
+            ["SKU","Name","Class","On hand","Used","Value used","Daily usage","Days of cover","Turnover","Dead stock"],
+            rows,
+        )
+
+    return render(request, "inventory/analytics.html", {
+        "start": start,
+        "end": result["end"],
+        "days": result["days"],
+        "summary": analytics.summary(result),
+        "top_rows": list(analytics.rows(result, limit=50)),
+        "dead_rows": list(analytics.rows(result, limit=20, dead_only=True, key="stock_value")),
+    })
+
+
+@login_required
+def movement_export(request):
+    """Movements for ?start=&end= as Parquet (or gzip NDJSON without pyarrow); ?format= to choose."""
+    start, end = _parse_dates(request)
+    fmt = resolve_format(request.GET.get("format"))
+    ext, content_type = EXPORT_FORMATS[fmt]
+    response = StreamingHttpResponse(
+        export_movements(request.user, start, end, fmt), content_type=content_type,
+    )
+    response["Content-Disposition"] = f'attachment; filename="movements_{start:%Y%m%d}_{end:%Y%m%d}.{ext}"'
+    return response
+
+
+@login_required
+def stock_as_of_report(request):
+    """Stock and valuation per product at the end of ?date=YYYY-MM-DD; ?format=csv to download."""
+    today = timezone.localdate()
+    try:
+        day = timezone.datetime.fromisoformat(request.GET["date"]).date()
+    except Exception:
+        day = today
+    at = timezone.make_aware(timezone.datetime.combine(day + timedelta(days=1), timezone.datetime.min.time()))
+    rows = ledger.stock_as_of(request.user, at)
+
+    if request.GET.get("format") == "csv":
+        return _stream_csv(
+            f"stock_as_of_{day:%Y%m%d}.csv",
+            ["SKU","Name","On hand","Valuation (current cost)"],
+            ((r["sku"], r["name"], r["quantity"], f'{r["value"]:.2f}') for r in rows),
+        )
+    return render(request, "inventory/stock_as_of.html", {
+        "day": day,
+        "rows": rows,
+        "total_quantity": sum(r["quantity"] for r in rows),
+        "total_value": sum((r["value"] for r in rows), 0),
+    })
+
+
+@login_required
+def query_log(request):
+    """Slow and repeated (N+1) queries from the query log, hottest first; staff only.
+
+    ?kind=, ?view= and ?fingerprint= narrow both the summary and the recent findings.
+    """
+    if not request.user.is_staff:
+        raise PermissionDenied
+    findings = QueryFinding.objects.all()
+    filters = {key: request.GET[key] for key in ("kind", "view", "fingerprint") if request.GET.get(key)}
+    if "kind" in filters:
+        findings = findings.filter(kind=filters["kind"])
+    if "view" in filters:
+        findings = findings.filter(view_name=filters["view"])
+    if "fingerprint" in filters:
+        findings = findings.filter(fingerprint=filters["fingerprint"])
+
+    hot = (
+        findings.order_by()
+        .values("fingerprint", "kind", "view_name")
         .annotate(
-            product_count=Count("products", distinct=True),
-            on_hand=Coalesce(Sum("products__quantity_on_hand"), V(0)),
-            value=Coalesce(Sum(p_val_expr), V(0), output_field=DecimalField(max_digits=14, decimal_places=2)),
+            seen=Count("id"), total_ms=Sum("duration_ms"), worst_ms=Max("duration_ms"),
+            most=Max("count"), last=Max("created_at"), sql=Max("sql"),
         )
-        .order_by("name")
+        .order_by("-total_ms")[:50]
     )
-    for s in qs:
-        writer.writerow([s.name, s.product_count, s.on_hand, f"{s.value:.2f}"])
-    return response
\ No newline at end of file
+    return render(request, "inventory/query_log.html", {
+        "hot": hot,
+        "recent": findings[:50],
+        "filters": filters,
+        "kinds": QueryFinding.KIND_CHOICES,
+        "views": QueryFinding.objects.order_by("view_name").values_list("view_name", flat=True).distinct(),
+        "size": settings.QUERY_LOG_SIZE,
+        "slow_ms": settings.QUERY_LOG_SLOW_MS,
+        "repeat_threshold": settings.QUERY_LOG_REPEAT_THRESHOLD,
+    })
@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
@@ -5,6 +6,7 @@ app_name = "main"
 
 urlpatterns = [
     path("", views.home, name="home"),               
-    path("dashboard/", views.dashboard, name="dashboard"),
+    path("dashboard/", views.dashboard_async if settings.ASYNC_VIEWS else views.dashboard, name="dashboard"),
     path("settings/", views.settings_view, name="settings"),
+    path("metrics/", views.metrics, name="metrics"),
 ]
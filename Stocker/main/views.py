@@ -2,13 +2,21 @@ from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import TemplateView
-from django.db.models import Sum, Count, F, Case, When, IntegerField, DecimalField, ExpressionWrapper, Value 
-from django.db.models.functions import Coalesce,TruncDate
 from datetime import date, timedelta
-from django.core.paginator import Paginator
-from django.db.models import Q
 
-from inventory.models import Product, StockMovement
+import base64
+import binascii
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import authenticate
+from django.http import HttpResponse, HttpResponseForbidden
+
+from inventory.models import Product, StockMovement, MovementDailyRollup, InventorySnapshot
+from inventory.utils import aio, metrics as request_metrics
+from inventory.utils.cache import cached_for_owner
+from inventory.utils.pagination import cached_count, keyset_paginate
+from inventory.utils.search import get_backend as search_backend
+from django.utils.functional import SimpleLazyObject
 from django.utils.translation import gettext as _
 from .forms import UserProfileForm, PreferencesForm
 
@@ -47,92 +55,124 @@ def home(request):
     ]
     return render(request, "main/home.html", {"features": features})
 
-@login_required
-def dashboard(request):
-    value_expr = ExpressionWrapper(
-        F("quantity_on_hand") * F("price_cost"),
-        output_field=DecimalField(max_digits=14, decimal_places=2),
-    )
+DASHBOARD_ORDERS = {
+    f"{sign}{field}" for sign in ("", "-")
+    for field in ("name", "sku", "quantity_on_hand", "reorder_level", "created_at")
+}
 
-    agg = Product.objects.filter(owner=request.user).aggregate(
-        total_products=Coalesce(Count("id"), Value(0)),
-        total_on_hand=Coalesce(Sum("quantity_on_hand"), Value(0)),
-        total_value=Coalesce(Sum(value_expr), Value(0), output_field=DecimalField(max_digits=14, decimal_places=2)),
-        low_stock=Coalesce(
-            Count(Case(When(quantity_on_hand__lte=F("reorder_level"), then=1), output_field=IntegerField())),
-            Value(0),
-        ),
-    )
 
-    stat_cards = [
+def _stat_cards(user):
+    agg = InventorySnapshot.for_owner(user).as_dict()
+    return [
         {"label": _("Total Products"),  "value": int(agg["total_products"] or 0)},
         {"label": _("On Hand (Sum)"),   "value": int(agg["total_on_hand"] or 0)},
         {"label": _("Inventory Value"), "value": f'{float(agg["total_value"] or 0):.2f}'},
         {"label": _("Low Stock"),       "value": int(agg["low_stock"] or 0)},
     ]
 
-    recent_rows = (
-        StockMovement.objects.select_related("product").filter(product__owner=request.user)
-        .order_by("-created_at")[:6]
-    )
 
-   
+def _movement_chart(user):
     end = date.today()
     start = end - timedelta(days=29)
-    mvs30 = StockMovement.objects.filter(product__owner=request.user, created_at__date__range=(start, end))
-    daily = (
-        mvs30.annotate(d=TruncDate("created_at"))
-             .values("d")
-             .annotate(
-                 in_qty=Coalesce(Sum(Case(When(movement_type="IN",  then=F("quantity")), output_field=IntegerField())), Value(0)),
-                 out_qty=Coalesce(Sum(Case(When(movement_type="OUT", then=F("quantity")), output_field=IntegerField())), Value(0)),
-                 adj_qty=Coalesce(Sum(Case(When(movement_type="ADJ", then=F("quantity")), output_field=IntegerField())), Value(0)),
-             )
-             .order_by("d")
-    )
-    chart_labels = [row["d"].strftime("%Y-%m-%d") for row in daily]
+    daily = MovementDailyRollup.daily_series(user, start, end)
     chart_in  = [int(row["in_qty"] or 0) for row in daily]
     chart_out = [int(row["out_qty"] or 0) for row in daily]
     chart_adj = [int(row["adj_qty"] or 0) for row in daily]
-    chart_net = [i - o + a for i, o, a in zip(chart_in, chart_out, chart_adj)]
+    return {
+        "labels": [row["day"].strftime("%Y-%m-%d") for row in daily],
+        "in_qty": chart_in,
+        "out_qty": chart_out,
+        "adj_qty": chart_adj,
+        "net": [i - o + a for i, o, a in zip(chart_in, chart_out, chart_adj)],
+    }
 
 
+def _recent_rows(user):
+    return (
+        StockMovement.objects.select_related("product").filter(product__owner=user)
+        .order_by("-created_at")[:6]
+    )
+
+
+def _product_table(request, user, per_page, cached=False):
+    """(page, q, order) for the dashboard's product table; the page loads lazily.
+
+    ``cached`` keeps the rows by inventory version too (see ``keyset_paginate``).
+    """
     q = (request.GET.get("q") or "").strip()
     qs = (
         Product.objects.select_related("category")
         .prefetch_related("suppliers")
-        .filter(owner=request.user)
+        .filter(owner=user)
     )
+  
+    order = request.GET.get("o", "")
+    if order not in DASHBOARD_ORDERS:
+        order = ""
+    key = order or "-quantity_on_hand"
     if q:
-        qs = qs.filter(
-            Q(name__icontains=q) |
-            Q(sku__icontains=q) |
-            Q(category__name__icontains=q) |
-            Q(suppliers__name__icontains=q)
-        ).distinct()
+        # Relevance first only when the user did not pick a sort column.
+        qs = search_backend().filter(qs, "product", user.pk, q, ranked=not order)
+        if not order:
+            key = "search_rank"
+
+    page_obj = keyset_paginate(
+        qs, key, per_page, request.GET.get("cursor"), total=lambda: cached_count(qs, user.pk),
+        owner_id=user.pk if cached else None,
+    )
+    return page_obj, q, order
 
-  
-    order = request.GET.get("o") or "-quantity_on_hand"
-    qs = qs.order_by(order)
 
+@login_required
+def dashboard(request):
+    # Everything below is lazy: the template caches each block with
+    # {% ownercache %}, and a cached block never evaluates its data.
     per_page = int(request.session.get("items_per_page", 10))
-    paginator = Paginator(qs, per_page)  
-    page_obj = paginator.get_page(request.GET.get("page"))
+    page_obj, q, order = _product_table(request, request.user, per_page)
+    context = {
+        "stat_cards": SimpleLazyObject(lambda: _stat_cards(request.user)),
+        "recent_rows": _recent_rows(request.user),
+        "chart": SimpleLazyObject(lambda: _movement_chart(request.user)),
+        # table context
+        "page_obj": page_obj,
+        "per_page": per_page,
+        "q": q,
+        "order": order,
+    }
+    return render(request, "main/dashboard.html", context)
+
 
+@login_required
+async def dashboard_async(request):
+    """``dashboard`` for ASGI: every section is read at once, then rendered once.
+
+    The view can't tell which template blocks {% ownercache %} will serve, so
+    the sections it reads up front are cached by inventory version as data
+    too: a warm page costs the stat row plus a few cache reads, side by side.
+    """
+    user = await request.auser()
+    per_page = int(await request.session.aget("items_per_page", 10))
+    page_obj, q, order = _product_table(request, user, per_page, cached=True)
+    today = date.today()
+    # The last two only load the page (rows and count) so render() doesn't query; their
+    # results live on page_obj. Sliced off rather than unpacked into ``_``, which is gettext here.
+    stat_cards, chart, recent_rows = (await aio.gather(
+        lambda: _stat_cards(user),
+        lambda: cached_for_owner(user.pk, f"dashboard_chart:{today:%Y-%m-%d}", lambda: _movement_chart(user)),
+        lambda: cached_for_owner(user.pk, "dashboard_recent", lambda: list(_recent_rows(user))),
+        lambda: page_obj.object_list,
+        lambda: page_obj.total,
+    ))[:3]
     context = {
         "stat_cards": stat_cards,
         "recent_rows": recent_rows,
-        "chart_labels": chart_labels,
-        "chart_in": chart_in,
-        "chart_out": chart_out,
-        "chart_adj": chart_adj,
-        "chart_net": chart_net,
-        # table context
+        "chart": chart,
         "page_obj": page_obj,
+        "per_page": per_page,
         "q": q,
         "order": order,
     }
-    return render(request, "main/dashboard.html", context)
+    return await sync_to_async(render)(request, "main/dashboard.html", context)
 
 
 @login_required
@@ -154,4 +194,32 @@ def settings_view(request):
     return render(request, "main/settings.html", {
         "profile_form": profile_form,
         "prefs_form": prefs_form,
-    })
\ No newline at end of file
+    })
+
+
+def _basic_auth_user(request):
+    """The user named in an HTTP Basic ``Authorization`` header, if the password checks out."""
+    scheme, _, credentials = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "basic":
+        return None
+    try:
+        username, _, password = base64.b64decode(credentials).decode().partition(":")
+    except (binascii.Error, UnicodeDecodeError):
+        return None
+    return authenticate(request, username=username, password=password)
+
+
+def metrics(request):
+    """Per-view request histograms in the Prometheus text format; staff only.
+
+    Browsers use their session; scrapers send a staff user's credentials
+    with HTTP Basic auth.
+    """
+    user = request.user if request.user.is_authenticated else _basic_auth_user(request)
+    if user is None:
+        response = HttpResponse("Log in as staff or use HTTP Basic auth.\n", status=401, content_type="text/plain")
+        response.headers["WWW-Authenticate"] = 'Basic realm="metrics"'
+        return response
+    if not user.is_staff:
+        return HttpResponseForbidden("Staff only.\n", content_type="text/plain")
+    return HttpResponse(request_metrics.prometheus_text(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -54,3 +54,31 @@ class ReceiveItemForm(forms.Form):
         super().__init__(*args, **kwargs)
         cls = self.fields["quantity"].widget.attrs.get("class", "")
         self.fields["quantity"].widget.attrs["class"] = (cls + " w-full rounded-lg border px-3 py-2 text-sm").strip()
+
+
+class ReceiveItemsForm(forms.Form):
+    """One quantity input per open PO line, named ``qty_<item id>``.
+
+    With ``only_item`` the form is just that line's input, which is then
+    required: the other lines' inputs don't matter to a one-line receive.
+    """
+
+    def __init__(self, *args, items=(), only_item=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.items = [it for it in items if it.remaining > 0 and only_item in (None, it.id)]
+        for it in self.items:
+            self.fields[f"qty_{it.id}"] = forms.IntegerField(
+                min_value=0 if only_item is None else 1, max_value=it.remaining, required=only_item is not None,
+                widget=forms.NumberInput(attrs={"class": "w-24 rounded-lg border px-2 py-1 text-sm"}),
+            )
+
+    def clean(self):
+        cleaned = super().clean()
+        if self.items and not self.errors and not any(cleaned.get(f"qty_{it.id}") for it in self.items):
+            raise forms.ValidationError("Enter a quantity for at least one line.")
+        return cleaned
+
+    def quantities(self, receive_all=False):
+        if receive_all:
+            return {it.id: it.remaining for it in self.items}
+        return {it.id: self.cleaned_data.get(f"qty_{it.id}") or 0 for it in self.items}
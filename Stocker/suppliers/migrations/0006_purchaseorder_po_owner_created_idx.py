@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('suppliers', '0005_purchaseorder_purchaseorderitem'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['owner', 'created_at'], name='po_owner_created_idx'),
+        ),
+    ]
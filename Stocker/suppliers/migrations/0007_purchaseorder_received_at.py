@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:35
+
+from django.db import migrations, models
+
+
+def backfill_received_at(apps, schema_editor):
+    # Best available guess for orders received before the field existed.
+    PurchaseOrder = apps.get_model('suppliers', 'PurchaseOrder')
+    PurchaseOrder.objects.filter(status='RECEIVED', received_at__isnull=True).update(received_at=models.F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('suppliers', '0006_purchaseorder_po_owner_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='purchaseorder',
+            name='received_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_received_at, migrations.RunPython.noop),
+    ]
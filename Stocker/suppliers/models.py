@@ -1,5 +1,6 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
 User = get_user_model()
 
@@ -42,6 +43,8 @@ class PurchaseOrder(models.Model):
     status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=STATUS_DRAFT)
     order_date = models.DateField(auto_now_add=True)
     expected_date = models.DateField(null=True, blank=True)
+    # Set when the last line is received; order_date -> received_at is the observed lead time.
+    received_at = models.DateTimeField(null=True, blank=True)
     invoice_number = models.CharField(max_length=80, blank=True)
     invoice_date = models.DateField(null=True, blank=True)
     notes = models.TextField(blank=True)
@@ -50,6 +53,9 @@ class PurchaseOrder(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["owner", "created_at"], name="po_owner_created_idx"),
+        ]
 
     def __str__(self):
         return f"PO#{self.pk} - {self.supplier.name}"
@@ -58,14 +64,16 @@ class PurchaseOrder(models.Model):
     def is_closed(self):
         return self.status in {self.STATUS_RECEIVED, self.STATUS_CANCELLED}
 
-    def recompute_status(self):
-        items = list(self.items.all())
+    def recompute_status(self, items=None):
+        items = list(self.items.all()) if items is None else items
         if not items:
             self.status = self.STATUS_DRAFT
             return
         all_recv = all((it.quantity_received or 0) >= (it.quantity_ordered or 0) for it in items)
         any_recv = any((it.quantity_received or 0) > 0 for it in items)
         if all_recv:
+            if self.status != self.STATUS_RECEIVED:
+                self.received_at = timezone.now()
             self.status = self.STATUS_RECEIVED
         elif any_recv:
             self.status = self.STATUS_PARTIAL
@@ -74,6 +82,34 @@ class PurchaseOrder(models.Model):
             if self.status not in (self.STATUS_SUBMITTED,):
                 self.status = self.STATUS_DRAFT
 
+    @transaction.atomic
+    def receive(self, quantities, user):
+        """Receive several lines in one transaction.
+
+        ``quantities`` maps item id -> quantity; each is clamped to the line's
+        remaining amount. Stock goes in through StockMovement.apply_many, the
+        received counts are written with one bulk update and the status is
+        computed once from the already-loaded items. Returns units received.
+        """
+        from inventory.models import StockMovement
+
+        items = list(self.items.select_for_update().order_by("pk"))
+        lines, received = [], []
+        for it in items:
+            qty = max(0, min(int(quantities.get(it.pk) or 0), it.remaining))
+            if qty <= 0:
+                continue
+            it.quantity_received = (it.quantity_received or 0) + qty
+            received.append(it)
+            lines.append({"product_id": it.product_id, "movement_type": "IN", "quantity": qty, "reason": f"PO#{self.pk}"})
+
+        if lines:
+            StockMovement.apply_many(lines, user=user)
+            PurchaseOrderItem.objects.bulk_update(received, ["quantity_received"])
+            self.recompute_status(items)
+            self.save(update_fields=["status", "received_at", "updated_at"])
+        return sum(l["quantity"] for l in lines)
+
 
 class PurchaseOrderItem(models.Model):
     po = models.ForeignKey(PurchaseOrder, on_delete=models.CASCADE, related_name="items")
@@ -14,5 +14,6 @@ urlpatterns = [
     path("po/new/", views.PurchaseOrderCreateView.as_view(), name="purchaseorder_create"),
     path("po/<int:pk>/", views.purchaseorder_detail, name="purchaseorder_detail"),
     path("po/<int:pk>/receive/", views.receive_item, name="purchaseorder_receive"),
+    path("po/<int:pk>/receive-all/", views.receive_items, name="purchaseorder_receive_all"),
 ]
 
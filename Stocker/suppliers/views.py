@@ -1,26 +1,28 @@
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
-from django.db.models import Count, Q
 from django.urls import reverse_lazy
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.shortcuts import get_object_or_404, redirect, render
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
 from .models import Supplier, PurchaseOrder, PurchaseOrderItem
-from .forms import SupplierForm, PurchaseOrderForm, PurchaseOrderItemAddForm, ReceiveItemForm 
-from inventory.models import Product, StockMovement
+from .forms import SupplierForm, PurchaseOrderForm, PurchaseOrderItemAddForm, ReceiveItemForm, ReceiveItemsForm
+from inventory.models import Product, StockMovement, SupplierSnapshot
+from inventory.utils.pagination import KeysetPaginationMixin
+from inventory.utils.search import get_backend as search_backend
 
-class SupplierListView(LoginRequiredMixin, ListView):
+class SupplierListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Supplier
     template_name = "suppliers/supplier_list.html"
     context_object_name = "suppliers"
     paginate_by = 20
+    keyset_key = "name"
 
     def get_queryset(self):
         q = self.request.GET.get("q", "")
-        return (Supplier.objects.filter(owner=self.request.user)
-                .annotate(product_count=Count("products"))
-                .filter(Q(name__icontains=q) | Q(email__icontains=q) | Q(phone__icontains=q) | Q(website__icontains=q))
-                .order_by("name"))
+        qs = SupplierSnapshot.with_totals(Supplier.objects.filter(owner=self.request.user)).order_by("name")
+        if q:
+            qs = search_backend().filter(qs, "supplier", self.request.user.pk, q)
+        return qs
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
@@ -71,11 +73,12 @@ class SupplierDeleteView(LoginRequiredMixin, PermissionRequiredMixin, DeleteView
         return Supplier.objects.filter(owner=self.request.user)
 
 @method_decorator(login_required, name='dispatch')
-class PurchaseOrderListView(ListView):
+class PurchaseOrderListView(KeysetPaginationMixin, ListView):
     model = PurchaseOrder
     template_name = "suppliers/purchaseorder_list.html"
     context_object_name = "orders"
     paginate_by = 20
+    keyset_key = "-created_at"
 
     def get_queryset(self):
         qs = PurchaseOrder.objects.select_related("supplier").filter(owner=self.request.user)
@@ -84,6 +87,11 @@ class PurchaseOrderListView(ListView):
             qs = qs.filter(status=status)
         return qs.order_by("-created_at")
 
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        ctx["status"] = self.request.GET.get("status", "")
+        return ctx
+
 
 @method_decorator(login_required, name='dispatch')
 class PurchaseOrderCreateView(CreateView):
@@ -120,14 +128,23 @@ def purchaseorder_detail(request, pk):
             po.status = PurchaseOrder.STATUS_SUBMITTED
             po.save(update_fields=["status", "updated_at"])
             return redirect("suppliers:purchaseorder_detail", pk=po.pk)
+    return _render_detail(request, po, add_form)
+
 
-    items = po.items.select_related("product").all()
-    receive_forms = [ReceiveItemForm(initial={"item_id": it.id}) for it in items if it.remaining > 0]
+def _render_detail(request, po, add_form, receive_form=None):
+    """The PO page; ``receive_form`` re-shows a rejected receive with its errors."""
+    items = list(po.items.select_related("product").all())
+    # Unbound, so only the lines receive_form validated show errors; the entered values stay.
+    receive_all_form = ReceiveItemsForm(items=items, initial=receive_form.data if receive_form else None)
+    for it in receive_all_form.items:
+        name = f"qty_{it.id}"
+        it.receive_field = (receive_form if receive_form and name in receive_form.fields else receive_all_form)[name]
     return render(request, "suppliers/purchaseorder_detail.html", {
         "po": po,
         "items": items,
         "add_form": add_form,
-        "receive_forms": receive_forms,
+        "receive_all_form": receive_all_form,
+        "receive_form": receive_form,
     })
 
 
@@ -152,7 +169,21 @@ def receive_item(request, pk):
                 item.quantity_received = (item.quantity_received or 0) + qty
                 item.save(update_fields=["quantity_received"])
                 po.recompute_status()
-                po.save(update_fields=["status", "updated_at"])
+                po.save(update_fields=["status", "received_at", "updated_at"])
     return redirect("suppliers:purchaseorder_detail", pk=po.pk)
 
 
+@login_required
+def receive_items(request, pk):
+    """Receive every line (or the entered quantities) of a PO in one request."""
+    po = get_object_or_404(PurchaseOrder.objects.select_related("supplier"), pk=pk, owner=request.user)
+    if request.method == "POST" and not po.is_closed:
+        only_item = request.POST.get("only_item", "")
+        only_item = int(only_item) if only_item.isdigit() else None
+        form = ReceiveItemsForm(request.POST, items=po.items.all(), only_item=only_item)
+        receive_all = "receive_all" in request.POST
+        if not (receive_all or form.is_valid()):
+            return _render_detail(request, po, PurchaseOrderItemAddForm(user=request.user), form)
+        po.receive(form.quantities(receive_all=receive_all), user=request.user)
+    return redirect("suppliers:purchaseorder_detail", pk=po.pk)
+